@@ -1,6 +1,6 @@
 # Initialize Flask app with proper error handling
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import logging
@@ -99,9 +99,58 @@ except Exception as e:
     parser_service = MinimalParserService()
     logger.info("Fallback parser service initialized")
 
+try:
+    from services.parser_session import ParserSessionManager
+    parser_sessions = ParserSessionManager(parser_service, data_manager)
+    logger.info("Parser session manager initialized successfully")
+except Exception as e:
+    logger.error(f"Error initializing parser session manager: {str(e)}")
+    logger.error(traceback.format_exc())
+    parser_sessions = None
+
+try:
+    from services.analytics import RoutineAnalytics
+    routine_analytics = RoutineAnalytics(data_manager)
+    logger.info("Routine analytics initialized successfully")
+except Exception as e:
+    logger.error(f"Error initializing routine analytics: {str(e)}")
+    logger.error(traceback.format_exc())
+    routine_analytics = None
+
+try:
+    from services.predictor import RoutinePredictor
+    routine_predictor = RoutinePredictor(data_manager, routine_analytics)
+    logger.info("Routine predictor initialized successfully")
+except Exception as e:
+    logger.error(f"Error initializing routine predictor: {str(e)}")
+    logger.error(traceback.format_exc())
+    routine_predictor = None
+
+try:
+    from services.assistant_context import AssistantContext
+    assistant_context = AssistantContext(
+        data_manager,
+        routine_analytics,
+        max_tokens=int(os.getenv('ASSISTANT_CONTEXT_TOKENS', '300'))
+    )
+    logger.info("Assistant context initialized successfully")
+except Exception as e:
+    logger.error(f"Error initializing assistant context: {str(e)}")
+    logger.error(traceback.format_exc())
+    assistant_context = None
+
+try:
+    from services.update_search import UpdateSearchIndex
+    update_search = UpdateSearchIndex(data_manager)
+    logger.info("Update search index initialized successfully")
+except Exception as e:
+    logger.error(f"Error initializing update search index: {str(e)}")
+    logger.error(traceback.format_exc())
+    update_search = None
+
 try:
     from sms_service import SMSService
-    sms_service = SMSService(data_manager)
+    sms_service = SMSService(data_manager, parser_sessions, routine_predictor)
     logger.info("SMS service initialized successfully")
 except Exception as e:
     logger.error(f"Error initializing SMS service: {str(e)}")
@@ -124,7 +173,7 @@ except Exception as e:
     logger.error(traceback.format_exc())
     # Create a minimal OpenAI service
     class MinimalOpenAIService:
-        def get_response(self, message, user_data, routines):
+        def get_response(self, message, user_data=None, routines=None, **kwargs):
             return "I'm sorry, the AI assistant is currently unavailable. Please try again later."
         def get_suggestions(self, prompt):
             return ["AI suggestions are currently unavailable. Please try again later."]
@@ -149,6 +198,85 @@ except Exception as e:
     socket_service = MinimalSocketService(app, data_manager)
     logger.info("Fallback Socket.IO service initialized")
 
+# Initialize reminders for predicted naps and feedings. Every gunicorn worker
+# imports the app, so they run only in the worker holding the reminders lock
+reminder_scheduler = None
+routine_reminders = None
+reminders_lock = None
+if os.getenv('REMINDERS_ENABLED', 'False').lower() == 'true':
+    try:
+        from services.file_lock import acquire_process_lock
+        from services.reminders import ReminderScheduler, RoutineReminders
+        
+        reminders_path = os.path.join(os.path.dirname(ROUTINES_FILE), os.getenv('REMINDERS_FILE', 'reminders.jsonl'))
+        reminders_lock = acquire_process_lock(reminders_path + '.lock')
+        if reminders_lock is None:
+            logger.info("Reminder scheduler runs in another process")
+        else:
+            def send_reminder_sms(reminder):
+                user = data_manager.get_user(reminder.user_id)
+                if user and user.get('phone_number') and hasattr(sms_service, '_send_sms'):
+                    sms_service._send_sms(reminder.message, user['phone_number'])
+            
+            def emit_reminder(reminder):
+                if hasattr(socket_service, 'emit_to_user'):
+                    socket_service.emit_to_user(reminder.user_id, 'reminder', reminder.to_dict())
+            
+            reminder_scheduler = ReminderScheduler(reminders_path, [send_reminder_sms, emit_reminder])
+            if routine_predictor is not None:
+                # Follows the stored data, so updates handled by other workers are seen too
+                routine_reminders = RoutineReminders(
+                    reminder_scheduler,
+                    routine_predictor,
+                    data_manager,
+                    int(os.getenv('REMINDER_LEAD_MINUTES', '15')),
+                    poll_seconds=float(os.getenv('REMINDER_POLL_SECONDS', '5'))
+                )
+                routine_reminders.start()
+            reminder_scheduler.start()
+            logger.info(f"Reminder scheduler started with {len(reminder_scheduler)} pending reminders")
+    except Exception as e:
+        logger.error(f"Error initializing reminder scheduler: {str(e)}")
+        logger.error(traceback.format_exc())
+        reminder_scheduler = None
+
+# Precomputed suggestions, regenerated nightly for users whose routines changed
+try:
+    from services.suggestions import SuggestionStore, SuggestionPrecomputer, routine_version
+    suggestion_store = SuggestionStore(
+        data_manager,
+        os.path.join(os.path.dirname(ROUTINES_FILE), os.getenv('SUGGESTIONS_FILE', 'suggestions.json'))
+    )
+    logger.info("Suggestion store initialized successfully")
+except Exception as e:
+    logger.error(f"Error initializing suggestion store: {str(e)}")
+    logger.error(traceback.format_exc())
+    suggestion_store = None
+
+# Run the precompute job in a single process only, like the reminders
+suggestion_precomputer = None
+suggestion_precompute_lock = None
+if suggestion_store is not None and os.getenv('SUGGESTIONS_PRECOMPUTE_ENABLED', 'False').lower() == 'true':
+    try:
+        from services.file_lock import acquire_process_lock
+        
+        suggestion_precompute_lock = acquire_process_lock(suggestion_store.path + '.job.lock')
+        if suggestion_precompute_lock is None:
+            logger.info("Suggestion precompute job runs in another process")
+        else:
+            suggestion_precomputer = SuggestionPrecomputer(
+                suggestion_store,
+                openai_service,
+                max_workers=int(os.getenv('SUGGESTIONS_PRECOMPUTE_WORKERS', '4')),
+                run_hour=int(os.getenv('SUGGESTIONS_PRECOMPUTE_HOUR', '3'))
+            )
+            suggestion_precomputer.start()
+            logger.info("Suggestion precompute job started")
+    except Exception as e:
+        logger.error(f"Error starting suggestion precompute job: {str(e)}")
+        logger.error(traceback.format_exc())
+        suggestion_precomputer = None
+
 # Root route handler
 @app.route('/')
 def index():
@@ -159,9 +287,18 @@ def index():
             "endpoints": {
                 "sms": "/sms",
                 "routines": "/api/routines",
+                "parse-routines": "/api/routines/parse",
                 "updates": "/api/updates",
+                "search": "/api/updates/search",
+                "export": "/api/export",
+                "timeline": "/api/timeline",
+                "analytics": "/api/analytics",
+                "summary": "/api/summary",
+                "predict": "/api/predict",
                 "health": "/health",
+                "metrics": "/metrics",
                 "assistant": "/assistant",
+                "assistant-stream": "/assistant/stream",
                 "users": "/users",
                 "parse-routine": "/parse-routine"
             }
@@ -175,12 +312,32 @@ def index():
 @app.route('/health')
 def health_check():
     try:
-        return jsonify({"status": "healthy"})
+        health = {"status": "healthy"}
+        
+        # An open circuit means AI features are answering with fallbacks
+        breaker = getattr(openai_service, 'breaker', None)
+        if breaker is not None:
+            health["openai"] = breaker.snapshot()
+            if health["openai"]["state"] != "closed":
+                health["status"] = "degraded"
+        
+        return jsonify(health)
     except Exception as e:
         logger.error(f"Error in health check: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"status": "error", "message": "Health check failed"}), 500
 
+# Metrics endpoint
+@app.route('/metrics')
+def get_metrics():
+    try:
+        from services.metrics import metrics
+        return jsonify(metrics.snapshot())
+    except Exception as e:
+        logger.error(f"Error getting metrics: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
 # SMS webhook endpoint
 @app.route('/sms', methods=['POST'])
 def sms_webhook():
@@ -234,14 +391,13 @@ def assistant():
         
         logger.info(f"Request data: user_id={user_id}, message length={len(message)}")
         
-        # Get user data for context
-        user_data = data_manager.get_user(user_id)
-        
-        # Get routine data for context
-        routines = data_manager.get_routines(user_id)
-        
-        # Get response from OpenAI
-        response = openai_service.get_response(message, user_data, routines)
+        # Get response from OpenAI, with the cached routine context when available
+        if assistant_context is not None:
+            response = openai_service.get_response(message, context=assistant_context.get_context(user_id), semantic=True)
+        else:
+            user_data = data_manager.get_user(user_id)
+            routines = data_manager.get_routines(user_id)
+            response = openai_service.get_response(message, user_data, routines, semantic=True)
         
         logger.info(f"Generated response length: {len(response)}")
         
@@ -251,6 +407,44 @@ def assistant():
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e), "status": "error"}), 400
 
+# Streaming assistant endpoint; the response is sent to the user's Socket.IO room
+@app.route('/assistant/stream', methods=['POST'])
+def assistant_stream():
+    try:
+        import uuid
+        data = request.get_json()
+        message = data.get('message', '')
+        user_id = data.get('user_id', 'default')
+        
+        if not message:
+            return jsonify({"error": "Message is required", "status": "error"}), 400
+        
+        if getattr(socket_service, 'socketio', None) is None or not hasattr(openai_service, 'stream_response'):
+            return jsonify({"error": "Streaming unavailable", "status": "error"}), 503
+        
+        # Use the cached routine context, or the user data and latest routine
+        if assistant_context is not None:
+            chunks = openai_service.stream_response(message, context=assistant_context.get_context(user_id), semantic=True)
+        else:
+            user_data = data_manager.get_user(user_id)
+            routines = data_manager.get_routines(user_id)
+            chunks = openai_service.stream_response(message, user_data, routines[-1] if routines else None, semantic=True)
+        
+        # Stream in the background so the request returns before the first token
+        request_id = uuid.uuid4().hex
+        socket_service.socketio.start_background_task(
+            socket_service.stream_to_user,
+            user_id,
+            request_id,
+            chunks
+        )
+        
+        return jsonify({"request_id": request_id, "status": "streaming"}), 202
+    except Exception as e:
+        logger.error(f"Error in streaming assistant endpoint: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
 # Users endpoint - GET
 @app.route('/users', methods=['GET'])
 def get_user():
@@ -366,6 +560,32 @@ def get_updates():
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e), "status": "error"}), 400
 
+# Search a user's caregiver updates
+@app.route('/api/updates/search', methods=['GET'])
+def search_updates():
+    try:
+        import datetime
+        user_id = request.args.get('user_id', 'default')
+        query = request.args.get('q', '').strip()
+        start_date = request.args.get('from')
+        end_date = request.args.get('to')
+        start_date = datetime.date.fromisoformat(start_date) if start_date else None
+        end_date = datetime.date.fromisoformat(end_date) if end_date else None
+        limit = int(request.args.get('limit', '50'))
+        
+        if not query:
+            return jsonify({"error": "Query is required", "status": "error"}), 400
+        
+        if update_search is None:
+            return jsonify({"error": "Search unavailable", "status": "error"}), 503
+        
+        result = update_search.search(user_id, query, start_date, end_date, limit)
+        return jsonify({"query": query, "count": result['count'], "results": result['results']})
+    except Exception as e:
+        logger.error(f"Error searching updates: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
 # Add a new routine
 @app.route('/api/routines', methods=['POST'])
 def add_routine():
@@ -384,6 +604,29 @@ def add_routine():
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e), "status": "error"}), 400
 
+# Parse several routine descriptions at once, e.g. to re-parse history
+@app.route('/api/routines/parse', methods=['POST'])
+def parse_routines():
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id', 'default')
+        texts = data.get('texts', [])
+        
+        if not texts or not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return jsonify({"error": "A list of texts is required", "status": "error"}), 400
+        if len(texts) > 100:
+            return jsonify({"error": "At most 100 texts can be parsed at once", "status": "error"}), 400
+        
+        if not hasattr(parser_service, 'parse_routines'):
+            return jsonify({"error": "Parser service unavailable", "status": "error"}), 503
+        
+        routines = parser_service.parse_routines(texts, user_id)
+        return jsonify({"routines": routines, "status": "success"})
+    except Exception as e:
+        logger.error(f"Error parsing routines: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
 # Add a new caregiver update
 @app.route('/api/updates', methods=['POST'])
 def add_update():
@@ -402,18 +645,178 @@ def add_update():
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e), "status": "error"}), 400
 
+# Get a user's parsed timeline for one day
+@app.route('/api/timeline', methods=['GET'])
+def get_timeline():
+    try:
+        import datetime
+        user_id = request.args.get('user_id', 'default')
+        date = request.args.get('date')
+        
+        # Validate the date before it is used in a file name
+        if date:
+            datetime.date.fromisoformat(date)
+        
+        if parser_sessions is None:
+            return jsonify({"error": "Parser sessions unavailable", "status": "error"}), 503
+        
+        timeline = parser_sessions.get_timeline(user_id, date)
+        return jsonify(timeline)
+    except Exception as e:
+        logger.error(f"Error getting timeline: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
+# Parse one new message into a user's timeline for one day
+@app.route('/api/timeline', methods=['POST'])
+def add_timeline_message():
+    try:
+        import datetime
+        data = request.get_json()
+        user_id = data.get('user_id', 'default')
+        message = data.get('message', '')
+        date = data.get('date')
+        
+        if not message:
+            return jsonify({"error": "Message is required", "status": "error"}), 400
+        
+        # Validate the date before it is used in a file name
+        if date:
+            datetime.date.fromisoformat(date)
+        
+        if parser_sessions is None:
+            return jsonify({"error": "Parser sessions unavailable", "status": "error"}), 503
+        
+        events = parser_sessions.ingest(user_id, message, date)
+        return jsonify({"events": events, "status": "success"})
+    except Exception as e:
+        logger.error(f"Error adding timeline message: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
+# Get a user's summary rollup for one day
+@app.route('/api/summary', methods=['GET'])
+def get_summary():
+    try:
+        import datetime
+        user_id = request.args.get('user_id', 'default')
+        date = request.args.get('date') or datetime.date.today().isoformat()
+        
+        # Validate the date before it is used in a file name
+        datetime.date.fromisoformat(date)
+        
+        return jsonify(data_manager.get_daily_summary(user_id, date))
+    except Exception as e:
+        logger.error(f"Error getting summary: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
+# Predict when the next event of a type is likely
+@app.route('/api/predict', methods=['GET'])
+def predict_next():
+    try:
+        user_id = request.args.get('user_id', 'default')
+        activity_type = request.args.get('type', 'nap')
+        
+        if routine_predictor is None:
+            return jsonify({"error": "Predictions unavailable", "status": "error"}), 503
+        
+        prediction = routine_predictor.predict(user_id, activity_type)
+        if prediction is None:
+            return jsonify({"error": "Not enough history for a prediction", "status": "error"}), 404
+        
+        return jsonify(prediction)
+    except Exception as e:
+        logger.error(f"Error predicting next event: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
+# Export a user's full history as CSV or Parquet, streamed in chunks
+@app.route('/api/export', methods=['GET'])
+def export_history():
+    try:
+        from services.export import iter_export_rows, iter_csv, iter_parquet, parquet_available
+        user_id = request.args.get('user_id', 'default')
+        export_format = request.args.get('format', 'csv').lower()
+        
+        if export_format == 'csv':
+            chunks, mimetype = iter_csv(iter_export_rows(data_manager, user_id)), 'text/csv'
+        elif export_format == 'parquet':
+            if not parquet_available():
+                return jsonify({"error": "Parquet export requires pyarrow", "status": "error"}), 503
+            chunks, mimetype = iter_parquet(iter_export_rows(data_manager, user_id)), 'application/vnd.apache.parquet'
+        else:
+            return jsonify({"error": "Format must be csv or parquet", "status": "error"}), 400
+        
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f'attachment; filename="history.{export_format}"'}
+        )
+    except Exception as e:
+        logger.error(f"Error exporting history: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
+# Get routine statistics over trailing windows of days
+@app.route('/api/analytics', methods=['GET'])
+def get_analytics():
+    try:
+        import datetime
+        user_id = request.args.get('user_id', 'default')
+        windows = tuple(int(days) for days in request.args.get('days', '7,30,90').split(','))
+        end_date = request.args.get('end_date')
+        end_date = datetime.date.fromisoformat(end_date) if end_date else None
+        
+        if min(windows) < 1:
+            return jsonify({"error": "Window lengths must be positive", "status": "error"}), 400
+        
+        if routine_analytics is None:
+            return jsonify({"error": "Analytics unavailable", "status": "error"}), 503
+        
+        return jsonify(routine_analytics.summarize(user_id, windows, end_date))
+    except Exception as e:
+        logger.error(f"Error getting analytics: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "status": "error"}), 400
+
 # Get AI suggestions for baby routine
 @app.route('/api/suggest', methods=['POST'])
 def get_suggestions():
     try:
-        data = request.get_json()
-        prompt = data.get('prompt', '')
+        data = request.get_json() or {}
+        user_id = data.get('user_id', 'default')
+        
+        # Serve precomputed suggestions while they match the user's routines
+        if suggestion_store is not None:
+            entry = suggestion_store.get(user_id)
+            if entry is not None:
+                return jsonify({
+                    "suggestions": entry['suggestions'],
+                    "version": entry['version'],
+                    "precomputed": True,
+                    "status": "success"
+                })
+        
+        routines = data_manager.get_routines(user_id)
+        if not routines:
+            return jsonify({"error": "No routines to base suggestions on", "status": "error"}), 400
         
-        if not prompt:
-            return jsonify({"error": "Prompt is required", "status": "error"}), 400
+        # Stale or missing: generate from the latest routine and keep the result
+        if suggestion_store is not None and hasattr(openai_service, 'compute_suggestions'):
+            try:
+                entry = suggestion_store.put(user_id, routine_version(routines), openai_service.compute_suggestions(routines[-1]))
+                return jsonify({
+                    "suggestions": entry['suggestions'],
+                    "version": entry['version'],
+                    "precomputed": False,
+                    "status": "success"
+                })
+            except Exception as e:
+                logger.error(f"Error generating suggestions: {str(e)}")
         
-        suggestions = openai_service.get_suggestions(prompt)
-        return jsonify({"suggestions": suggestions, "status": "success"})
+        suggestions = openai_service.get_suggestions(routines[-1])
+        return jsonify({"suggestions": suggestions, "precomputed": False, "status": "success"})
     except Exception as e:
         logger.error(f"Error getting suggestions: {str(e)}")
         logger.error(traceback.format_exc())
@@ -0,0 +1,217 @@
+"""
+End-to-end load test of the AI endpoints against the local LLM stub.
+
+Sends concurrent requests to a running app and reports throughput and tail
+latency per endpoint. Run the stub and point the app at it first, so no
+OpenAI quota is used:
+
+    python -m services.llm_stub --latency lognormal --latency-ms 400 --latency-max-ms 3000
+    OPENAI_STUB_URL=http://127.0.0.1:8089/v1 python app.py
+
+Usage (from the backend directory):
+    python benchmarks/llm_load_test.py --requests 500 --concurrency 20
+    python benchmarks/llm_load_test.py --endpoints assistant,sms --stub-url http://127.0.0.1:8089/v1
+
+Every question carries its request number, so the response caches do not
+answer it; /api/suggest is served from stored suggestions after the first
+call per user, as in production.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.parser_corpus import generate_short_sms
+
+QUESTIONS = [
+    "Is it normal for my baby to wake up at night?",
+    "How long should naps be at this age?",
+    "When should we start the bedtime routine?",
+    "How often should she be feeding during the day?",
+]
+
+# Users the requests are spread over
+USERS = 50
+
+
+def _assistant(index, rng):
+    return '/assistant', {
+        'message': f"{rng.choice(QUESTIONS)} (#{index})",
+        'user_id': f"load-{index % USERS}",
+    }
+
+
+def _suggest(index, rng):
+    return '/api/suggest', {'user_id': f"load-{index % USERS}"}
+
+
+def _parse(index, rng):
+    return '/api/routines/parse', {
+        'texts': [generate_short_sms(rng)['text'] for _ in range(4)],
+        'user_id': f"load-{index % USERS}",
+    }
+
+
+def _sms(index, rng):
+    return '/sms', {
+        'message': generate_short_sms(rng)['text'],
+        'from_number': f"+1555000{index % USERS:04d}",
+        'user_id': f"load-{index % USERS}",
+    }
+
+
+def _seed_routines(app_url, seed, timeout):
+    """Give every load test user a routine, so /api/suggest has one to work from."""
+    rng = random.Random(seed)
+    with requests.Session() as session:
+        for user in range(USERS):
+            events = [generate_short_sms(rng)['expected'][0] for _ in range(6)]
+            activities = [{'type': activity_type, 'start_time': start_time} for activity_type, start_time in events]
+            session.post(f"{app_url}/api/routines", json={
+                'user_id': f"load-{user}",
+                'routine': {'baby_name': 'Load', 'routine': activities},
+            }, timeout=timeout)
+
+
+# Endpoint name mapped to the function building one request: (path, JSON body)
+ENDPOINTS = {
+    'assistant': _assistant,
+    'suggest': _suggest,
+    'parse': _parse,
+    'sms': _sms,
+}
+
+
+def _percentile(values, fraction):
+    """Return the given percentile of a list of values (nearest rank)."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load_test(app_url, endpoints, total_requests=200, concurrency=10, seed=0, timeout=60):
+    """
+    Send requests to the endpoints in turn from a pool of workers.
+
+    Args:
+        app_url (str): Base URL of the running app
+        endpoints (list): Names of the endpoints to load, from ENDPOINTS
+        total_requests (int): Requests sent across all endpoints
+        concurrency (int): Requests in flight at once
+        seed (int): Random seed of the request contents
+        timeout (float): Seconds to wait for each response
+
+    Returns:
+        dict: Endpoint name mapped to its metrics
+    """
+    if 'suggest' in endpoints:
+        _seed_routines(app_url, seed, timeout)
+
+    local = threading.local()
+    latencies = {name: [] for name in endpoints}
+    errors = {name: 0 for name in endpoints}
+    lock = threading.Lock()
+
+    def send(index):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        name = endpoints[index % len(endpoints)]
+        path, body = ENDPOINTS[name](index, random.Random(seed * 1000003 + index))
+        start = time.perf_counter()
+        try:
+            ok = local.session.post(f"{app_url}{path}", json=body, timeout=timeout).status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies[name].append(elapsed)
+            if not ok:
+                errors[name] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(total_requests)))
+    wall = time.perf_counter() - start
+
+    results = {}
+    for name in endpoints:
+        values = latencies[name]
+        if not values:
+            continue
+        results[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'throughput_rps': round(len(values) / wall, 2),
+            'p50_ms': round(_percentile(values, 0.50) * 1000, 1),
+            'p95_ms': round(_percentile(values, 0.95) * 1000, 1),
+            'p99_ms': round(_percentile(values, 0.99) * 1000, 1),
+            'max_ms': round(max(values) * 1000, 1),
+        }
+    results['total'] = {
+        'requests': total_requests,
+        'errors': sum(errors.values()),
+        'throughput_rps': round(total_requests / wall, 2),
+        'wall_s': round(wall, 2),
+    }
+    return results
+
+
+def _stub_stats(stub_url):
+    """Read the stub's request counters, or None if unavailable."""
+    if not stub_url:
+        return None
+    base = stub_url.rstrip('/')
+    if base.endswith('/v1'):
+        base = base[:-3]
+    try:
+        return requests.get(f"{base}/stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Load test the AI endpoints of a running app.")
+    arg_parser.add_argument('--app-url', default='http://127.0.0.1:5000', help="base URL of the app")
+    arg_parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help="comma-separated endpoints to load")
+    arg_parser.add_argument('--requests', type=int, default=200, help="total requests")
+    arg_parser.add_argument('--concurrency', type=int, default=10, help="requests in flight at once")
+    arg_parser.add_argument('--seed', type=int, default=0, help="random seed of the request contents")
+    arg_parser.add_argument('--timeout', type=float, default=60, help="seconds to wait for each response")
+    arg_parser.add_argument('--stub-url', help="stub base URL, to report the upstream calls made")
+    args = arg_parser.parse_args(argv)
+
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        arg_parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    stub_before = _stub_stats(args.stub_url)
+    results = run_load_test(args.app_url.rstrip('/'), endpoints, args.requests, args.concurrency, args.seed, args.timeout)
+
+    for name, metrics in results.items():
+        if name == 'total':
+            continue
+        print(f"{name:10s} requests={metrics['requests']:5d} errors={metrics['errors']:4d} "
+              f"rps={metrics['throughput_rps']:7.2f} p50={metrics['p50_ms']:.1f}ms "
+              f"p95={metrics['p95_ms']:.1f}ms p99={metrics['p99_ms']:.1f}ms max={metrics['max_ms']:.1f}ms")
+    total = results['total']
+    print(f"{'total':10s} requests={total['requests']:5d} errors={total['errors']:4d} "
+          f"rps={total['throughput_rps']:7.2f} wall={total['wall_s']:.2f}s")
+
+    stub_after = _stub_stats(args.stub_url)
+    if stub_before is not None and stub_after is not None:
+        calls = {key: stub_after[key] - stub_before.get(key, 0) for key in stub_after}
+        print(f"{'upstream':10s} " + ' '.join(f"{key}={value}" for key, value in calls.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
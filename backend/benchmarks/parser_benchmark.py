@@ -0,0 +1,223 @@
+"""
+Benchmark and regression suite for ParserService.
+
+Parses a synthetic corpus (see parser_corpus.py), records per-document latency,
+per-stage timings and accuracy against the generated ground truth, and compares
+the results with a stored baseline.
+
+Usage (from the backend directory):
+    python benchmarks/parser_benchmark.py                    # compare with baseline
+    python benchmarks/parser_benchmark.py --update-baseline  # store a new baseline
+
+Timings are machine-dependent, so refresh the baseline on the machine that runs
+the comparison. Accuracy numbers are deterministic for a given seed.
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import contextlib
+from collections import Counter
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parser_service import ParserService
+from benchmarks.parser_corpus import generate_corpus
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'parser_baseline.json')
+
+# Benchmark stage name mapped to the ParserService method that implements it
+STAGES = {
+    'normalize': '_normalize_text',
+    'absolute': '_extract_absolute_time_events',
+    'relative': '_extract_relative_time_events',
+    'duration': '_extract_duration_events',
+    'location': '_enhance_events_with_location',
+    'confidence': '_calculate_confidence_score',
+}
+
+
+def _instrument(parser, stage_totals):
+    """
+    Wrap the parser's stage methods so each call adds its wall time to stage_totals.
+
+    Args:
+        parser (ParserService): Parser instance to instrument
+        stage_totals (dict): Stage name mapped to accumulated seconds
+    """
+    for stage, method_name in STAGES.items():
+        method = getattr(parser, method_name)
+
+        def timed(*args, _method=method, _stage=stage, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                stage_totals[_stage] += time.perf_counter() - start
+
+        setattr(parser, method_name, timed)
+
+
+def _score(expected, events):
+    """
+    Count matching (type, start_time) pairs between expected and parsed events.
+
+    Returns:
+        tuple: (true positives, predicted count, expected count)
+    """
+    predicted = Counter((e.get('type'), e.get('start_time')) for e in events)
+    wanted = Counter(expected)
+    true_positives = sum((predicted & wanted).values())
+    return true_positives, sum(predicted.values()), sum(wanted.values())
+
+
+def _percentile(values, fraction):
+    """Return the given percentile of a list of values (nearest rank)."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_benchmark(corpus, parser=None):
+    """
+    Parse every document in the corpus and collect timing and accuracy results.
+
+    Args:
+        corpus (dict): Corpus kind mapped to a list of documents
+        parser (ParserService, optional): Parser to benchmark; AI assist is disabled
+
+    Returns:
+        dict: Corpus kind mapped to its metrics
+    """
+    if parser is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            parser = ParserService()
+    parser.use_ai_assist = False
+
+    results = {}
+    for kind, documents in corpus.items():
+        stage_totals = {stage: 0.0 for stage in STAGES}
+        _instrument(parser, stage_totals)
+
+        latencies = []
+        true_positives = predicted = wanted = 0
+        for document in documents:
+            start = time.perf_counter()
+            routine = parser.parse_routine(document['text'], 'benchmark')
+            latencies.append(time.perf_counter() - start)
+
+            if document['expected'] is not None:
+                tp, pred, exp = _score(document['expected'], routine['routine'])
+                true_positives += tp
+                predicted += pred
+                wanted += exp
+
+        # Remove the per-kind wrappers again
+        for method_name in STAGES.values():
+            delattr(parser, method_name)
+
+        metrics = {
+            'documents': len(documents),
+            'characters': sum(len(d['text']) for d in documents),
+            'total_ms': round(sum(latencies) * 1000, 3),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 4),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 4),
+            'max_ms': round(max(latencies) * 1000, 4),
+            'stages_ms': {stage: round(total * 1000, 3) for stage, total in stage_totals.items()},
+        }
+        if wanted:
+            metrics['precision'] = round(true_positives / predicted, 4) if predicted else 0.0
+            metrics['recall'] = round(true_positives / wanted, 4)
+        results[kind] = metrics
+
+    return results
+
+
+def compare_to_baseline(results, baseline, time_tolerance=0.5, accuracy_tolerance=0.005):
+    """
+    Compare benchmark results with a baseline.
+
+    Args:
+        results (dict): Output of run_benchmark
+        baseline (dict): Previously stored output of run_benchmark
+        time_tolerance (float): Allowed relative slowdown of mean and p95 latency
+        accuracy_tolerance (float): Allowed absolute drop in precision or recall
+
+    Returns:
+        list: Comparison rows (kind, metric, baseline, current, change, regression)
+    """
+    rows = []
+    for kind, metrics in results.items():
+        base = baseline.get(kind)
+        if not base:
+            continue
+
+        for metric in ('mean_ms', 'p95_ms'):
+            change = (metrics[metric] - base[metric]) / base[metric] if base[metric] else 0.0
+            rows.append({
+                'kind': kind, 'metric': metric,
+                'baseline': base[metric], 'current': metrics[metric],
+                'change': round(change, 4),
+                'regression': change > time_tolerance,
+            })
+
+        for metric in ('precision', 'recall'):
+            if metric in metrics and metric in base:
+                change = metrics[metric] - base[metric]
+                rows.append({
+                    'kind': kind, 'metric': metric,
+                    'baseline': base[metric], 'current': metrics[metric],
+                    'change': round(change, 4),
+                    'regression': change < -accuracy_tolerance,
+                })
+
+    return rows
+
+
+def main(argv=None):
+    """Run the benchmark from the command line. Returns the process exit code."""
+    arg_parser = argparse.ArgumentParser(description="Benchmark ParserService against a stored baseline.")
+    arg_parser.add_argument('--seed', type=int, default=0, help="corpus random seed")
+    arg_parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON file")
+    arg_parser.add_argument('--update-baseline', action='store_true', help="store the results as the new baseline")
+    arg_parser.add_argument('--time-tolerance', type=float, default=0.5, help="allowed relative slowdown")
+    args = arg_parser.parse_args(argv)
+
+    results = run_benchmark(generate_corpus(seed=args.seed))
+
+    for kind, metrics in results.items():
+        accuracy = ''
+        if 'recall' in metrics:
+            accuracy = f"  precision={metrics['precision']:.3f} recall={metrics['recall']:.3f}"
+        print(f"{kind:14s} docs={metrics['documents']:4d} mean={metrics['mean_ms']:.3f}ms "
+              f"p95={metrics['p95_ms']:.3f}ms{accuracy}")
+        stages = ' '.join(f"{stage}={ms:.1f}ms" for stage, ms in metrics['stages_ms'].items())
+        print(f"{'':14s} {stages}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline first")
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+
+    rows = compare_to_baseline(results, baseline, time_tolerance=args.time_tolerance)
+    print()
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['kind']:14s} {row['metric']:10s} {row['baseline']:>10} -> {row['current']:>10} "
+              f"({row['change']:+.2%}) {flag}")
+
+    return 1 if any(row['regression'] for row in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
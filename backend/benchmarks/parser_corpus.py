@@ -0,0 +1,149 @@
+"""
+Synthetic corpus generator for ParserService benchmarks.
+
+Every generated document carries the events it describes, so the benchmark can
+score accuracy as well as speed. Generation is seeded and fully deterministic.
+"""
+import random
+
+# Sentence templates with the event they describe: (template, activity type)
+EVENT_TEMPLATES = [
+    ("{name} woke up at {time}.", 'wake'),
+    ("Bottle at {time}.", 'feeding'),
+    ("Had a bottle at {time}.", 'feeding'),
+    ("Feed at {time}.", 'feeding'),
+    ("Nap at {time}.", 'nap'),
+    ("Diaper change at {time}.", 'diaper'),
+    ("Poop at {time}.", 'diaper'),
+    ("Tummy time at {time}.", 'play'),
+    ("Bath at {time}.", 'bath'),
+    ("Walk at {time}.", 'walk'),
+    ("Story at {time}.", 'reading'),
+    ("Bedtime at {time}.", 'sleep'),
+    # Phrasings the regex parser does not handle yet, so accuracy work shows up
+    ("Naps at {time}.", 'nap'),
+    ("Fed at {time}.", 'feeding'),
+    ("Feeding at {time}.", 'feeding'),
+    ("Went down for a nap at {time}.", 'nap'),
+]
+
+# Sentences that describe no event
+FILLER_SENTENCES = [
+    "She was a bit fussy today.",
+    "The weather has been nice lately.",
+    "Grandma came over for a visit.",
+    "He smiled a lot this afternoon!",
+    "We tried a new song.",
+]
+
+NAMES = ['Mia', 'Leo', 'Ava', 'Noah', 'Mari', 'Eli']
+
+# Adversarial inputs that stress regex backtracking
+ADVERSARIAL_GENERATORS = {
+    'whitespace_run': lambda n: 'nap' + ' ' * n + 'x',
+    'long_word': lambda n: 'a' * n,
+    'digit_run': lambda n: '1' * n,
+    'repeated_my': lambda n: 'my' * (n // 2),
+    'repeated_activity': lambda n: 'nap ' * (n // 4),
+    'repeated_relative': lambda n: '2 hours after ' * (n // 14),
+}
+
+
+def _format_time(minutes):
+    """
+    Format minutes since midnight as a 12-hour time string and as HH:MM.
+
+    Args:
+        minutes (int): Minutes since midnight
+
+    Returns:
+        tuple: (spoken time such as "7:30pm", normalized time such as "19:30")
+    """
+    hours, mins = divmod(minutes, 60)
+    suffix = 'am' if hours < 12 else 'pm'
+    display_hours = hours % 12 or 12
+    spoken = f"{display_hours}{suffix}" if mins == 0 else f"{display_hours}:{mins:02d}{suffix}"
+    return spoken, f"{hours:02d}:{mins:02d}"
+
+
+def _event_sentence(rng, name, minutes):
+    """Build one event sentence and its expected (type, start_time) pair."""
+    template, activity_type = rng.choice(EVENT_TEMPLATES)
+    spoken, normalized = _format_time(minutes)
+    return template.format(name=name, time=spoken), (activity_type, normalized)
+
+
+def generate_short_sms(rng):
+    """
+    Generate a short single-event SMS.
+
+    Args:
+        rng (random.Random): Seeded random generator
+
+    Returns:
+        dict: Document with 'text' and 'expected' events
+    """
+    minutes = rng.randrange(6 * 60, 21 * 60, 15)
+    sentence, expected = _event_sentence(rng, rng.choice(NAMES), minutes)
+    return {'text': sentence, 'expected': [expected]}
+
+
+def generate_daily_journal(rng, events=30):
+    """
+    Generate a long daily journal with many events and some filler.
+
+    Args:
+        rng (random.Random): Seeded random generator
+        events (int): Number of events to describe
+
+    Returns:
+        dict: Document with 'text' and 'expected' events
+    """
+    name = rng.choice(NAMES)
+    sentences = []
+    expected = []
+    minutes = 6 * 60
+    for _ in range(events):
+        minutes = min(minutes + rng.randrange(15, 60, 15), 23 * 60)
+        sentence, event = _event_sentence(rng, name, minutes)
+        sentences.append(sentence)
+        expected.append(event)
+        if rng.random() < 0.3:
+            sentences.append(rng.choice(FILLER_SENTENCES))
+    return {'text': ' '.join(sentences), 'expected': expected}
+
+
+def generate_adversarial(kind, size):
+    """
+    Generate an adversarial input of roughly the given size.
+
+    Args:
+        kind (str): Key of ADVERSARIAL_GENERATORS
+        size (int): Approximate input length in characters
+
+    Returns:
+        dict: Document with 'text' and no expected events
+    """
+    return {'text': ADVERSARIAL_GENERATORS[kind](size), 'expected': None}
+
+
+def generate_corpus(seed=0, short_count=200, journal_count=20, journal_events=30, adversarial_size=4000):
+    """
+    Generate the full benchmark corpus.
+
+    Args:
+        seed (int): Random seed
+        short_count (int): Number of short SMS documents
+        journal_count (int): Number of daily journals
+        journal_events (int): Events per journal
+        adversarial_size (int): Length of each adversarial input
+
+    Returns:
+        dict: Corpus kind mapped to a list of documents
+    """
+    rng = random.Random(seed)
+    return {
+        'short_sms': [generate_short_sms(rng) for _ in range(short_count)],
+        'daily_journal': [generate_daily_journal(rng, journal_events) for _ in range(journal_count)],
+        'adversarial': [generate_adversarial(kind, adversarial_size) for kind in ADVERSARIAL_GENERATORS],
+    }
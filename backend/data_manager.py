@@ -1,8 +1,14 @@
 import os
+import re
 import json
 import logging
 import bcrypt
+import datetime
+import tempfile
+import threading
 from pathlib import Path
+from services.file_lock import file_lock
+from services.event_model import duration_to_minutes, record_date, record_events, time_to_minutes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,18 +17,34 @@ logger = logging.getLogger(__name__)
 class DataManager:
     """Data manager for handling user data, routines, and caregiver updates."""
     
-    def __init__(self, routines_file, caregiver_updates_file, users_file):
+    def __init__(self, routines_file, caregiver_updates_file, users_file, timelines_dir=None, summaries_dir=None,
+                 changes_file=None):
         """Initialize the data manager.
         
         Args:
             routines_file: Path to the routines JSON file
             caregiver_updates_file: Path to the caregiver updates JSON file
             users_file: Path to the users JSON file
+            timelines_dir: Directory for per-day timelines (defaults to a
+                "timelines" directory next to the routines file)
+            summaries_dir: Directory for per-day summary rollups (defaults to a
+                "summaries" directory next to the routines file)
+            changes_file: JSON-lines log of the user and kind of every write
+                (defaults to "changes.jsonl" next to the routines file)
         """
         self.routines_file = routines_file
         self.caregiver_updates_file = caregiver_updates_file
         self.users_file = users_file
+        self.timelines_dir = timelines_dir or os.path.join(os.path.dirname(routines_file), 'timelines')
+        self.summaries_dir = summaries_dir or os.path.join(os.path.dirname(routines_file), 'summaries')
+        self.changes_file = changes_file or os.path.join(os.path.dirname(routines_file), 'changes.jsonl')
+        self._write_listeners = []
         self.initialize_data_files()
+        
+        # Per-user write counts, followed from the change log from here on
+        self._user_versions = {}
+        self._changes_offset = self.changes_offset()
+        self._changes_lock = threading.Lock()
     
     def initialize_data_files(self):
         """Initialize data files if they don't exist."""
@@ -75,6 +97,19 @@ class DataManager:
             logger.error(f"Error getting routines: {str(e)}")
             return []
     
+    def get_all_routines(self):
+        """Get the routines of every user, for batch jobs.
+        
+        Returns:
+            Dict mapping user IDs to their lists of routines
+        """
+        try:
+            with open(self.routines_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error getting all routines: {str(e)}")
+            return {}
+    
     def add_routine(self, routine, user_id='default'):
         """Add a new routine for a user.
         
@@ -99,6 +134,9 @@ class DataManager:
             with open(self.routines_file, 'w') as f:
                 json.dump(all_routines, f, indent=2)
             
+            self._update_summary(routine, user_id)
+            self._notify_write(routine, user_id, 'routine')
+            
             return routine
         except Exception as e:
             logger.error(f"Error adding routine: {str(e)}")
@@ -123,6 +161,19 @@ class DataManager:
             logger.error(f"Error getting caregiver updates: {str(e)}")
             return []
     
+    def get_all_caregiver_updates(self):
+        """Get the caregiver updates of every user, for batch jobs.
+        
+        Returns:
+            Dict mapping user IDs to their lists of updates
+        """
+        try:
+            with open(self.caregiver_updates_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error getting all caregiver updates: {str(e)}")
+            return {}
+    
     def add_caregiver_update(self, update, user_id='default'):
         """Add a new caregiver update for a user.
         
@@ -147,11 +198,332 @@ class DataManager:
             with open(self.caregiver_updates_file, 'w') as f:
                 json.dump(all_updates, f, indent=2)
             
+            self._update_summary(update, user_id)
+            self._notify_write(update, user_id, 'caregiver_update')
+            
             return update
         except Exception as e:
             logger.error(f"Error adding caregiver update: {str(e)}")
             return {"error": str(e)}
     
+    def data_version(self, kinds=('routine', 'caregiver_update')):
+        """Get a value that changes whenever the stored records of some kinds change.
+        
+        Write listeners only hear writes made in this process; the version is
+        read from the files, so it also changes after writes by other gunicorn
+        workers.
+        
+        Args:
+            kinds: Record kinds covered ('routine', 'caregiver_update', 'user')
+            
+        Returns:
+            Tuple of the (modification time, size) of each file, or None for a missing file
+        """
+        paths = {
+            'routine': self.routines_file,
+            'caregiver_update': self.caregiver_updates_file,
+            'user': self.users_file
+        }
+        version = []
+        for kind in kinds:
+            try:
+                stat = os.stat(paths[kind])
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+    
+    def add_write_listener(self, listener, kinds=('routine', 'caregiver_update')):
+        """Register a callback for new routines, caregiver updates and user changes.
+        
+        Args:
+            listener: Callable taking (record, user_id), called after each record is stored
+            kinds: Record kinds the listener receives ('routine', 'caregiver_update', 'user')
+        """
+        self._write_listeners.append((listener, kinds))
+    
+    def changes_offset(self):
+        """Get the current end of the change log.
+        
+        Returns:
+            Byte offset to read later changes from
+        """
+        try:
+            return os.path.getsize(self.changes_file)
+        except OSError:
+            return 0
+    
+    def read_changes(self, offset):
+        """Read the writes logged after an offset, by this and every other process.
+        
+        Only complete lines are read, so a write being logged by another
+        process is picked up by the next call.
+        
+        Args:
+            offset: Byte offset in the change log to read from
+            
+        Returns:
+            Tuple of the (user_id, kind) of each write in order and the byte offset after them
+        """
+        try:
+            if os.path.getsize(self.changes_file) <= offset:
+                return [], offset
+            
+            with open(self.changes_file, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            end = data.rfind(b'\n') + 1
+            changes = []
+            for line in data[:end].decode('utf-8').splitlines():
+                if line.strip():
+                    change = json.loads(line)
+                    changes.append((change['user_id'], change['kind']))
+            return changes, offset + end
+        except OSError:
+            return [], offset
+        except Exception as e:
+            logger.error(f"Error reading changes: {str(e)}")
+            return [], offset
+    
+    def user_version(self, user_id, kinds=('routine', 'caregiver_update')):
+        """Get a value that changes whenever one user's records of some kinds change.
+        
+        Follows the change log, so writes by other gunicorn workers count too,
+        while writes for other users leave the value unchanged. Values are
+        only comparable within one process.
+        
+        Args:
+            user_id: User ID
+            kinds: Record kinds covered ('routine', 'caregiver_update', 'user')
+            
+        Returns:
+            Tuple of the number of writes of each kind seen for the user
+        """
+        with self._changes_lock:
+            changes, self._changes_offset = self.read_changes(self._changes_offset)
+            for change in changes:
+                self._user_versions[change] = self._user_versions.get(change, 0) + 1
+            return tuple(self._user_versions.get((user_id, kind), 0) for kind in kinds)
+    
+    def _log_change(self, user_id, kind):
+        """Append a write to the change log read by other processes."""
+        try:
+            # One short line per append, so concurrent appends do not interleave
+            with open(self.changes_file, 'a') as f:
+                f.write(json.dumps({'user_id': user_id, 'kind': kind}) + '\n')
+        except Exception as e:
+            logger.error(f"Error logging change: {str(e)}")
+    
+    def _notify_write(self, record, user_id, kind):
+        """Log a newly stored record and pass it to the write listeners for its kind."""
+        self._log_change(user_id, kind)
+        for listener, kinds in self._write_listeners:
+            if kind not in kinds:
+                continue
+            try:
+                listener(record, user_id)
+            except Exception as e:
+                logger.error(f"Error in write listener: {str(e)}")
+    
+    def _safe_user_id(self, user_id):
+        """Make a user ID safe to use as a directory name."""
+        safe_user_id = re.sub(r'[^A-Za-z0-9_.@-]', '_', user_id)
+        # Dots alone would name the directory itself or its parent
+        if not safe_user_id.strip('.'):
+            safe_user_id = safe_user_id.replace('.', '_') or '_'
+        return safe_user_id
+    
+    def _timeline_path(self, user_id, date):
+        """Get the JSON-lines file holding one user's timeline for one day.
+        
+        Raises:
+            ValueError: If the date is not an ISO date
+        """
+        date = datetime.date.fromisoformat(date).isoformat()
+        return os.path.join(self.timelines_dir, self._safe_user_id(user_id), f"{date}.jsonl")
+    
+    def get_timeline(self, user_id, date):
+        """Get the parsed events of one day for a user.
+        
+        Args:
+            user_id: User ID to get the timeline for
+            date: Day as an ISO date string (YYYY-MM-DD)
+            
+        Returns:
+            List of events in the order they were added
+        """
+        try:
+            path = self._timeline_path(user_id, date)
+            if not os.path.exists(path):
+                return []
+            
+            with open(path, 'r') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except Exception as e:
+            logger.error(f"Error getting timeline: {str(e)}")
+            return []
+    
+    def get_timeline_since(self, user_id, date, offset=0):
+        """Get the events appended to a user's day timeline after an offset.
+        
+        Only complete lines are read, so an append in progress in another
+        process is picked up by the next call.
+        
+        Args:
+            user_id: User ID to get the timeline for
+            date: Day as an ISO date string (YYYY-MM-DD)
+            offset: Byte offset in the timeline file to read from
+            
+        Returns:
+            Tuple of the events read and the byte offset after them
+        """
+        try:
+            path = self._timeline_path(user_id, date)
+            if not os.path.exists(path) or os.path.getsize(path) <= offset:
+                return [], offset
+            
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            end = data.rfind(b'\n') + 1
+            events = [json.loads(line) for line in data[:end].decode('utf-8').splitlines() if line.strip()]
+            return events, offset + end
+        except Exception as e:
+            logger.error(f"Error getting timeline: {str(e)}")
+            return [], offset
+    
+    def timeline_lock(self, user_id, date):
+        """Lock a user's day timeline against appends by other threads and processes.
+        
+        Args:
+            user_id: User ID of the timeline
+            date: Day as an ISO date string (YYYY-MM-DD)
+            
+        Returns:
+            Context manager holding the lock
+        """
+        return file_lock(self._timeline_path(user_id, date) + '.lock')
+    
+    def append_timeline_events(self, events, user_id, date):
+        """Append parsed events to a user's timeline for one day.
+        
+        Only the new events are written; earlier events are never rewritten.
+        
+        Args:
+            events: Events to append
+            user_id: User ID to add events for
+            date: Day as an ISO date string (YYYY-MM-DD)
+            
+        Returns:
+            Appended events
+        """
+        try:
+            path = self._timeline_path(user_id, date)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            with open(path, 'a') as f:
+                for event in events:
+                    f.write(json.dumps(event) + '\n')
+            
+            return events
+        except Exception as e:
+            logger.error(f"Error appending timeline events: {str(e)}")
+            return {"error": str(e)}
+    
+    def _summary_path(self, user_id, date):
+        """Get the JSON file holding one user's summary rollup for one day.
+        
+        Raises:
+            ValueError: If the date is not an ISO date
+        """
+        date = datetime.date.fromisoformat(date).isoformat()
+        return os.path.join(self.summaries_dir, self._safe_user_id(user_id), f"{date}.json")
+    
+    def _empty_summary(self, user_id, date):
+        """Create the summary of a day without events."""
+        return {
+            "user_id": user_id,
+            "date": date,
+            "counts": {},
+            "total_duration_minutes": {},
+            "last_event": {},
+            "event_count": 0,
+            "updated_at": None
+        }
+    
+    def get_daily_summary(self, user_id, date):
+        """Get the summary rollup of one day for a user.
+        
+        Rollups are maintained on every write, so this reads a single small file.
+        
+        Args:
+            user_id: User ID to get the summary for
+            date: Day as an ISO date string (YYYY-MM-DD)
+            
+        Returns:
+            Summary with event counts, total durations and the last event per activity type
+        """
+        try:
+            path = self._summary_path(user_id, date)
+            if not os.path.exists(path):
+                return self._empty_summary(user_id, date)
+            
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error getting daily summary: {str(e)}")
+            return self._empty_summary(user_id, date)
+    
+    def _update_summary(self, record, user_id):
+        """Add the events of a new routine or caregiver update to its day's rollup.
+        
+        Undated records, and records whose date is not an ISO date, count
+        towards the day they are added. The rollup is
+        read and rewritten under a lock shared by threads and gunicorn workers,
+        so concurrent writes for the same day are all counted.
+        
+        Args:
+            record: Routine or caregiver update that was just stored
+            user_id: User ID the record belongs to
+        """
+        try:
+            events = [event for event in record_events(record) if isinstance(event, dict) and event.get('type')]
+            if not events:
+                return
+            
+            date = record_date(record) or datetime.date.today().isoformat()
+            path = self._summary_path(user_id, date)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            with file_lock(path + '.lock'):
+                summary = self.get_daily_summary(user_id, date)
+                
+                for event in events:
+                    activity_type = event['type']
+                    summary['counts'][activity_type] = summary['counts'].get(activity_type, 0) + 1
+                    
+                    duration = duration_to_minutes(event.get('duration'))
+                    if duration:
+                        totals = summary['total_duration_minutes']
+                        totals[activity_type] = totals.get(activity_type, 0) + duration
+                    
+                    # Keep the latest event of each type; untimed events count as latest
+                    last = summary['last_event'].get(activity_type)
+                    start = time_to_minutes(event.get('start_time'))
+                    last_start = time_to_minutes(last.get('start_time')) if last else None
+                    if last is None or start is None or last_start is None or start >= last_start:
+                        summary['last_event'][activity_type] = event
+                
+                summary['event_count'] += len(events)
+                summary['updated_at'] = datetime.datetime.now().isoformat()
+                
+                # Write to a uniquely named temporary file first so readers never see a partial summary
+                with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), suffix='.tmp', delete=False) as f:
+                    json.dump(summary, f, indent=2)
+                os.replace(f.name, path)
+        except Exception as e:
+            logger.error(f"Error updating daily summary: {str(e)}")
+    
     def get_user(self, user_id='default'):
         """Get user data.
         
@@ -218,6 +590,8 @@ class DataManager:
             with open(self.users_file, 'w') as f:
                 json.dump(all_users, f, indent=2)
             
+            self._notify_write(user_data, user_data.get('id', user_id), 'user')
+            
             return user_data
         except Exception as e:
             logger.error(f"Error updating user: {str(e)}")
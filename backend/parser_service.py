@@ -1,13 +1,40 @@
 import os
 import re
 import datetime
+import functools
+import threading
+from contextlib import contextmanager
 from dateutil import parser as date_parser
 from dotenv import load_dotenv
 from services.openai_service import OpenAIService
+from services.enhancement_batcher import EnhancementBatcher
+from services.metrics import metrics, NULL_TRACE
+from services.event_index import EventIndex
+from services.event_model import Event, time_to_minutes, minutes_to_time
 
 # Load environment variables
 load_dotenv()
 
+def _traced(stage, count_results=False):
+    """
+    Decorator that times a ParserService method as a stage of the active trace.
+    
+    Args:
+        stage (str): Stage name recorded as parser.<stage>
+        count_results (bool): Also count the number of returned items as parser.<stage>.matches
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            trace = self._trace
+            with trace.stage(stage):
+                result = method(self, *args, **kwargs)
+            if count_results and result:
+                trace.count(f"{stage}.matches", len(result))
+            return result
+        return wrapper
+    return decorator
+
 class ParserService:
     """
     Service for parsing natural language descriptions of baby routines.
@@ -15,8 +42,34 @@ class ParserService:
     for relative time expressions, complex routines, and fault tolerance.
     """
     
-    def __init__(self):
-        """Initialize the parser service."""
+    def __init__(self, hardened=None, max_input_length=None, chunk_size=None, metrics_sample_rate=None):
+        """
+        Initialize the parser service.
+        
+        Args:
+            hardened (bool, optional): Enable input-size limits and chunked parsing.
+                Defaults to the PARSER_HARDENED environment variable.
+            max_input_length (int, optional): Maximum number of characters parsed in
+                hardened mode. Defaults to PARSER_MAX_INPUT_LENGTH.
+            chunk_size (int, optional): Target chunk length for long texts in hardened
+                mode. Defaults to PARSER_CHUNK_SIZE.
+            metrics_sample_rate (float, optional): Fraction of parses recorded in the
+                metrics registry. Defaults to PARSER_METRICS_SAMPLE_RATE (0 = off).
+        """
+        # Hardened mode settings for large or adversarial input
+        if hardened is None:
+            hardened = os.getenv('PARSER_HARDENED', 'False').lower() == 'true'
+        self.hardened = hardened
+        self.max_input_length = max_input_length or int(os.getenv('PARSER_MAX_INPUT_LENGTH', '5000'))
+        self.chunk_size = chunk_size or int(os.getenv('PARSER_CHUNK_SIZE', '1000'))
+        
+        # Instrumentation: sampled per-stage timings and counts
+        if metrics_sample_rate is None:
+            metrics_sample_rate = float(os.getenv('PARSER_METRICS_SAMPLE_RATE', '0'))
+        self.metrics_sample_rate = metrics_sample_rate
+        self.metrics = metrics
+        self._local = threading.local()
+        
         # Common time expressions for relative time parsing
         self.time_expressions = {
             'morning': '08:00',
@@ -37,7 +90,7 @@ class ParserService:
         # Activity types and their synonyms
         self.activity_types = {
             'nap': ['nap', 'sleep', 'snooze', 'rest', 'doze'],
-            'feeding': ['feed', 'eat', 'bottle', 'nurse', 'breastfeed', 'formula', 'solids', 'snack', 'meal'],
+            'feeding': ['feed', 'fed', 'eat', 'bottle', 'nurse', 'breastfeed', 'formula', 'solids', 'snack', 'meal'],
             'wake': ['wake', 'awake', 'up', 'woke', 'gets up', 'wakes up'],
             'sleep': ['sleep', 'bedtime', 'down', 'asleep', 'bed', 'crib'],
             'diaper': ['diaper', 'change', 'poop', 'pee', 'wet', 'soiled', 'dirty', 'bathroom', 'potty'],
@@ -47,14 +100,141 @@ class ParserService:
             'reading': ['read', 'book', 'story', 'stories'],
         }
         
+        # Common locations for baby activities
+        self.locations = {
+            'crib': ['crib', 'bassinet', 'bed', 'cot'],
+            'stroller': ['stroller', 'pram', 'buggy', 'pushchair'],
+            'car': ['car', 'carseat', 'vehicle', 'drive'],
+            'carrier': ['carrier', 'wrap', 'sling', 'baby wear'],
+            'swing': ['swing', 'rocker', 'bouncer'],
+            'arms': ['arms', 'held', 'hold', 'holding', 'cuddle'],
+            'floor': ['floor', 'mat', 'playmat', 'carpet', 'rug'],
+            'highchair': ['highchair', 'high chair', 'feeding chair'],
+            'bath': ['bath', 'bathtub', 'tub'],
+            'outside': ['outside', 'outdoors', 'yard', 'garden', 'park'],
+        }
+        
+        # Common abbreviations expanded during normalization
+        self.abbreviations = {
+            'hrs': 'hours',
+            'hr': 'hour',
+            'mins': 'minutes',
+            'min': 'minute',
+            'am.': 'am',
+            'pm.': 'pm',
+            'a.m.': 'am',
+            'p.m.': 'pm',
+            'approx.': 'approximately',
+            'approx': 'approximately',
+            'w/': 'with',
+            'w/o': 'without',
+            'b/w': 'between',
+            'b/f': 'before',
+            'a/f': 'after',
+        }
+        
+        # Compile all patterns once so parsing never rebuilds them per call
+        self._compile_patterns()
+        
         # Initialize OpenAI service for complex parsing assistance
         try:
             self.openai_service = OpenAIService()
+            # Low-confidence parses share AI calls, several descriptions per prompt
+            self.enhancer = EnhancementBatcher.from_env(self.openai_service, self._normalize_time)
             self.use_ai_assist = True
         except Exception as e:
             print(f"Warning: OpenAI service not available: {str(e)}")
             self.use_ai_assist = False
     
+    def _compile_patterns(self):
+        """
+        Compile the regular expressions used by the parser.
+        
+        Every pattern does a bounded amount of work per start position: text is
+        whitespace-collapsed before matching, so optional spaces are single
+        characters; unbounded digit and word runs may only start at a run
+        boundary; and alternations are fixed word lists. Matching is therefore
+        linear in the input length, whatever the input.
+        """
+        all_synonyms = '|'.join(sum(self.activity_types.values(), []))
+        time_exprs = '|'.join(sorted(self.time_expressions, key=len, reverse=True))
+        abbreviations = '|'.join(
+            re.escape(abbr) + ('(?![a-z])' if abbr[-1].isalpha() else '')
+            for abbr in sorted(self.abbreviations, key=len, reverse=True)
+        )
+        time_pattern = r'\d{1,2}(?::\d{2})?'
+        
+        self._patterns = {
+            'whitespace': re.compile(r'\s+'),
+            'abbreviations': re.compile(fr'(?<![a-z])(?:{abbreviations})'),
+            'absolute': {
+                activity_type: re.compile(
+                    fr'(?:baby|infant)?\s?(?:{"|".join(synonyms)})\s?(?:at|around|about|approximately|near|by)?\s?({time_pattern}(?:\s?(?:am|pm))?)',
+                    re.IGNORECASE
+                )
+                for activity_type, synonyms in self.activity_types.items()
+            },
+            'time_range': re.compile(
+                fr'(?:baby|infant)?\s?(?:nap|sleep|feed|eat|play)\s?(?:from|between)?\s?({time_pattern}\s?(?:am|pm)?)\s?(?:to|until|till|-)\s?({time_pattern}\s?(?:am|pm)?)',
+                re.IGNORECASE
+            ),
+            'relative': re.compile(
+                r'(?<!\d)(\d+)\s?(hour|minute|min|hr)s?\s?(after|before|following|prior to)\s?(\w+)',
+                re.IGNORECASE
+            ),
+            'time_of_day': re.compile(
+                fr'(?:baby|infant)?\s?(?:{all_synonyms})\s?(?:in|during|at)\s?(?:the)?\s?({time_exprs})',
+                re.IGNORECASE
+            ),
+            'duration': re.compile(
+                r'(?<!\d)(\d+)\s?(hour|minute|min|hr)s?\s?(nap|feed|feeding|sleep|play|bath|walk)',
+                re.IGNORECASE
+            ),
+            'context_time': re.compile(fr'({time_pattern}\s?(?:am|pm)?)'),
+            'near_duration': [
+                re.compile(r'for\s?(\d+)\s?(hour|minute|min|hr)s?', re.IGNORECASE),
+                re.compile(r'lasting\s?(\d+)\s?(hour|minute|min|hr)s?', re.IGNORECASE),
+                re.compile(r'(?<!\d)(\d+)\s?(hour|minute|min|hr)s?\s?long', re.IGNORECASE),
+                re.compile(r'(?<!\d)(\d+)\s?(hour|minute|min|hr)s?\s?duration', re.IGNORECASE),
+            ],
+            'locations': {
+                location: re.compile(fr'\b(?:{"|".join(synonyms)})\b', re.IGNORECASE)
+                for location, synonyms in self.locations.items()
+            },
+            'activity_words': {
+                activity_type: re.compile(fr'\b(?:{"|".join(synonyms)})\b', re.IGNORECASE)
+                for activity_type, synonyms in self.activity_types.items()
+            },
+            'baby_name': [
+                re.compile(r'(?:baby|infant)?\s?\b(\w+)(?:\'s)?\s?(?:routine|schedule|nap|feeding|diaper)', re.IGNORECASE),
+                re.compile(r'\b(\w+)(?:\'s)?\s?(?:routine|schedule|nap|feeding|diaper)', re.IGNORECASE),
+                re.compile(r'my\s?(?:baby|infant|little one)?\s?\b(\w+)', re.IGNORECASE),
+                re.compile(r'(?:baby|infant)?\s?\b(\w+)\s?(?:is|has|does|wakes|sleeps|eats)', re.IGNORECASE),
+            ],
+            'sentence_end': re.compile(r'[.!?\n]+'),
+        }
+    
+    @property
+    def _trace(self):
+        """The metrics trace of the parse running on this thread."""
+        return getattr(self._local, 'trace', NULL_TRACE)
+    
+    @contextmanager
+    def _tracing(self, operation):
+        """
+        Make a (possibly sampled-out) trace active on this thread for one operation.
+        
+        Args:
+            operation (str): Stage name for the whole operation
+        """
+        trace = self.metrics.trace('parser', self.metrics_sample_rate)
+        self._local.trace = trace
+        try:
+            with trace.stage(operation):
+                yield trace
+        finally:
+            self._local.trace = NULL_TRACE
+    
     def parse_routine(self, text, user_id):
         """
         Parse a freeform description of a baby's routine.
@@ -66,66 +246,310 @@ class ParserService:
         Returns:
             dict: Structured routine data
         """
+        with self._tracing('parse_routine'):
+            return self._parse_routine(text, user_id)
+    
+    def parse_events(self, text, reference_index=None):
+        """
+        Parse the events in a single message without AI enhancement.
+        
+        Used for incremental parsing, where relative references such as
+        "2 hours after nap" resolve against earlier events in reference_index.
+        
+        Args:
+            text (str): Message text
+            reference_index (EventIndex, optional): Previously parsed events
+            
+        Returns:
+            list: List of Event objects
+        """
+        with self._tracing('parse_events'):
+            if self.hardened and len(text) > self.max_input_length:
+                text = self._truncate_text(text, self.max_input_length)
+            return self._extract_events(text, reference_index)
+    
+    def parse_routines(self, texts, user_id):
+        """
+        Parse several freeform routine descriptions, such as a bulk re-parse.
+        
+        Low-confidence parses are enhanced together, several descriptions per
+        AI call, instead of one call each.
+        
+        Args:
+            texts (list): Freeform descriptions of routines
+            user_id (str): ID of the user submitting the routines
+            
+        Returns:
+            list: Structured routine data for each text, in order
+        """
+        with self._tracing('parse_routines'):
+            routines = [self._parse_without_ai(text, user_id) for text in texts]
+            pending = [routine for routine in routines if self._needs_ai_enhancement(routine)]
+            if not pending:
+                return routines
+            
+            try:
+                with self._trace.stage('ai_enhancement'):
+                    results = self.enhancer.enhance_many([(routine['text'], routine['baby_name']) for routine in pending])
+            except Exception as e:
+                self._trace.count('ai_fallback.failed', len(pending))
+                print(f"AI enhancement failed: {str(e)}")
+                return routines
+            
+            for routine, ai_enhanced_events in zip(pending, results):
+                self._apply_ai_enhancement(routine, ai_enhanced_events)
+            return routines
+    
+    def _parse_routine(self, text, user_id):
+        """
+        Parse a routine; see parse_routine.
+        
+        Args:
+            text (str): Freeform description of the routine
+            user_id (str): ID of the user submitting the routine
+            
+        Returns:
+            dict: Structured routine data
+        """
+        routine = self._parse_without_ai(text, user_id)
+        
+        # Use AI to enhance parsing if available and needed
+        if self._needs_ai_enhancement(routine):
+            try:
+                self._apply_ai_enhancement(routine, self._ai_enhanced_parsing(routine['text'], routine['baby_name']))
+            except Exception as e:
+                self._trace.count('ai_fallback.failed')
+                print(f"AI enhancement failed: {str(e)}")
+        
+        return routine
+    
+    def _parse_without_ai(self, text, user_id):
+        """
+        Parse a routine with the pattern-based parser only.
+        
+        Args:
+            text (str): Freeform description of the routine
+            user_id (str): ID of the user submitting the routine
+            
+        Returns:
+            dict: Structured routine data
+        """
+        # Cap the input size in hardened mode
+        truncated = False
+        if self.hardened and len(text) > self.max_input_length:
+            text = self._truncate_text(text, self.max_input_length)
+            truncated = True
+        
         # Extract routine events from text
-        routine_events = self._extract_events(text)
+        events = self._extract_events(text)
         
         # Try to extract baby name
         baby_name = self._extract_baby_name(text) or 'Baby'
         
+        confidence_score = self._calculate_confidence_score(text, events)
+        
         # Create routine object
+        routine_events = [event.to_dict() for event in events]
         routine = {
             'user_id': user_id,
             'text': text,
             'routine': routine_events,
             'baby_name': baby_name,
             'parsed_at': datetime.datetime.now().isoformat(),
-            'confidence_score': self._calculate_confidence_score(text, routine_events)
+            'confidence_score': confidence_score
         }
         
-        # Use AI to enhance parsing if available and needed
-        if self.use_ai_assist and (len(routine_events) < 3 or self._calculate_confidence_score(text, routine_events) < 0.7):
-            try:
-                ai_enhanced_events = self._ai_enhanced_parsing(text, baby_name)
-                if ai_enhanced_events and len(ai_enhanced_events) > len(routine_events):
-                    routine['routine'] = ai_enhanced_events
-                    routine['ai_enhanced'] = True
-            except Exception as e:
-                print(f"AI enhancement failed: {str(e)}")
+        if truncated:
+            routine['truncated'] = True
         
         return routine
     
-    def _extract_events(self, text):
+    def _needs_ai_enhancement(self, routine):
+        """
+        Decide whether a parsed routine should be enhanced with AI.
+        
+        Args:
+            routine (dict): Routine from _parse_without_ai
+            
+        Returns:
+            bool: True if the parse is weak and AI is available
+        """
+        trace = self._trace
+        if not self.use_ai_assist:
+            trace.count('ai_fallback.unavailable')
+        elif not self.openai_service.available():
+            # The API is failing; keep the deterministic result instead of waiting on it
+            trace.count('ai_fallback.circuit_open')
+        elif len(routine['routine']) < 3 or routine['confidence_score'] < 0.7:
+            trace.count('ai_fallback.triggered')
+            return True
+        else:
+            trace.count('ai_fallback.skipped')
+        return False
+    
+    def _apply_ai_enhancement(self, routine, ai_enhanced_events):
+        """
+        Use the AI events for a routine if they found more than the parser did.
+        
+        Args:
+            routine (dict): Routine from _parse_without_ai, updated in place
+            ai_enhanced_events (list): Events from AI enhancement, or None
+        """
+        if ai_enhanced_events and len(ai_enhanced_events) > len(routine['routine']):
+            routine['routine'] = ai_enhanced_events
+            routine['ai_enhanced'] = True
+            self._trace.count('ai_fallback.accepted')
+        else:
+            self._trace.count('ai_fallback.rejected')
+    
+    def _extract_events(self, text, reference_index=None):
         """
         Extract routine events from text with enhanced pattern recognition.
         
         Args:
             text (str): Freeform description of the routine
+            reference_index (EventIndex, optional): Earlier events for relative references
             
         Returns:
-            list: List of routine events
+            list: List of Event objects
         """
-        events = []
+        # Events are kept in a span- and time-indexed structure while parsing
+        index = EventIndex()
         
         # Normalize text for better pattern matching
         normalized_text = self._normalize_text(text)
         
-        # Extract events with absolute times
-        events.extend(self._extract_absolute_time_events(normalized_text))
+        # Long texts are parsed chunk by chunk in hardened mode
+        chunks = self._split_into_chunks(normalized_text, self.chunk_size) if self.hardened else [normalized_text]
         
-        # Extract events with relative times
-        events.extend(self._extract_relative_time_events(normalized_text))
+        # Offset of the current chunk in the normalized text
+        offset = 0
+        for chunk in chunks:
+            chunk_events = []
+            
+            # Extract events with absolute times
+            chunk_events.extend(self._index_events(index, self._extract_absolute_time_events(chunk), offset))
+            
+            # Extract events with relative times
+            relative_events = self._extract_relative_time_events(chunk, reference_index, index, offset)
+            chunk_events.extend(self._index_events(index, relative_events, offset))
+            
+            # Extract duration-based events
+            chunk_events.extend(self._index_events(index, self._extract_duration_events(chunk), offset))
+            
+            # Extract location information for events
+            self._enhance_events_with_location(chunk_events, chunk, index, offset)
+            
+            offset += len(chunk)
         
-        # Extract duration-based events
-        events.extend(self._extract_duration_events(normalized_text))
+        # Events come out sorted by start_time, untimed events last
+        return index.events()
+    
+    def _index_events(self, index, events, offset):
+        """
+        Add newly extracted events to the index, dropping duplicates.
         
-        # Extract location information for events
-        events = self._enhance_events_with_location(events, normalized_text)
+        An event whose text span overlaps an indexed event of the same type is
+        merged into it (missing details such as duration are copied over); one
+        that overlaps an event of another type at the same time is dropped.
         
-        # Sort events by start_time if available
-        events = sorted(events, key=lambda e: e.get('start_time', '00:00'))
+        Args:
+            index (EventIndex): Index of the events extracted so far
+            events (list): New events carrying a span relative to the chunk
+            offset (int): Offset of the chunk in the normalized text
+            
+        Returns:
+            list: Events that were added to the index
+        """
+        added = []
+        for event in events:
+            start, end = event.span
+            event.span = span = (start + offset, end + offset)
+            
+            duplicate = None
+            for existing in index.overlapping(span):
+                if existing.type == event.type or existing.start == event.start:
+                    duplicate = existing
+                    break
+            
+            if duplicate is None:
+                index.add(event, span)
+                added.append(event)
+            elif duplicate.type == event.type:
+                duplicate.merge(event)
         
-        return events
+        return added
+    
+    def _truncate_text(self, text, max_length):
+        """
+        Truncate text to a maximum length, preferring a sentence boundary.
+        
+        Args:
+            text (str): Text to truncate
+            max_length (int): Maximum number of characters to keep
+            
+        Returns:
+            str: Truncated text
+        """
+        text = text[:max_length]
+        
+        # Cut at the last sentence boundary if it keeps most of the text
+        boundary = max(text.rfind(mark) for mark in '.!?\n')
+        if boundary >= max_length // 2:
+            text = text[:boundary + 1]
+        
+        return text
     
+    def _split_into_chunks(self, text, chunk_size):
+        """
+        Split text into chunks of roughly chunk_size characters on sentence boundaries.
+        
+        Sentences longer than chunk_size are split on the last space before the limit.
+        
+        Args:
+            text (str): Normalized text to split
+            chunk_size (int): Target chunk length
+            
+        Returns:
+            list: List of text chunks
+        """
+        if len(text) <= chunk_size:
+            return [text]
+        
+        # Split into sentences, keeping the terminating punctuation
+        sentences = []
+        start = 0
+        for match in self._patterns['sentence_end'].finditer(text):
+            sentences.append(text[start:match.end()])
+            start = match.end()
+        if start < len(text):
+            sentences.append(text[start:])
+        
+        chunks = []
+        current = ''
+        for sentence in sentences:
+            # Hard-split sentences that are longer than a chunk
+            while len(sentence) > chunk_size:
+                cut = sentence.rfind(' ', 0, chunk_size)
+                if cut <= 0:
+                    cut = chunk_size
+                if current:
+                    chunks.append(current)
+                    current = ''
+                chunks.append(sentence[:cut])
+                sentence = sentence[cut:]
+            
+            if len(current) + len(sentence) > chunk_size:
+                chunks.append(current)
+                current = ''
+            current += sentence
+        
+        if current:
+            chunks.append(current)
+        
+        return chunks
+    
+    @_traced('normalize')
     def _normalize_text(self, text):
         """
         Normalize text for better pattern matching.
@@ -139,27 +563,12 @@ class ParserService:
         # Convert to lowercase
         text = text.lower()
         
-        # Replace common abbreviations
-        abbreviations = {
-            'hrs': 'hours',
-            'hr': 'hour',
-            'mins': 'minutes',
-            'min': 'minute',
-            'am.': 'am',
-            'pm.': 'pm',
-            'a.m.': 'am',
-            'p.m.': 'pm',
-            'approx.': 'approximately',
-            'approx': 'approximately',
-            'w/': 'with',
-            'w/o': 'without',
-            'b/w': 'between',
-            'b/f': 'before',
-            'a/f': 'after',
-        }
+        # Collapse whitespace runs so every optional-space token in the patterns
+        # matches at most one character
+        text = self._patterns['whitespace'].sub(lambda m: '\n' if '\n' in m.group(0) else ' ', text)
         
-        for abbr, full in abbreviations.items():
-            text = text.replace(abbr, full)
+        # Replace common abbreviations in a single pass, on whole tokens only
+        text = self._patterns['abbreviations'].sub(lambda m: self.abbreviations[m.group(0)], text)
         
         # Standardize time formats
         # Replace "7:00 in the morning" with "7:00 am"
@@ -181,6 +590,7 @@ class ParserService:
         
         return text
     
+    @_traced('absolute', count_results=True)
     def _extract_absolute_time_events(self, text):
         """
         Extract events with absolute times from text.
@@ -194,47 +604,36 @@ class ParserService:
         events = []
         
         # Enhanced patterns for various activity types
-        for activity_type, synonyms in self.activity_types.items():
-            # Create pattern with all synonyms for this activity type
-            activity_pattern = '|'.join(synonyms)
-            
+        for activity_type, pattern in self._patterns['absolute'].items():
             # Pattern for "activity at/around time"
-            pattern = fr'(?:baby|infant)?\s*(?:{activity_pattern})\s*(?:at|around|about|approximately|near|by)?\s*(\d{{1,2}}(?::\d{{2}})?(?:\s*(?:am|pm))?)'
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+            matches = pattern.finditer(text)
             
             for match in matches:
                 time_str = match.group(1)
-                normalized_time = self._normalize_time(time_str)
+                start = time_to_minutes(self._normalize_time(time_str))
                 
-                if normalized_time:
-                    event = {
-                        'type': activity_type,
-                        'start_time': normalized_time,
-                        'source_text': match.group(0)
-                    }
+                if start is not None:
+                    event = Event(activity_type, start=start, source_text=match.group(0), span=match.span())
                     
                     # Add additional details based on activity type
                     if activity_type == 'feeding':
-                        event['feeding_type'] = self._determine_feeding_type(match.group(0))
+                        event.feeding_type = self._determine_feeding_type(match.group(0))
                     elif activity_type == 'diaper':
-                        event['diaper_type'] = self._determine_diaper_type(match.group(0))
+                        event.diaper_type = self._determine_diaper_type(match.group(0))
                     elif activity_type == 'nap' or activity_type == 'sleep':
                         # Try to find duration
-                        duration = self._extract_duration_near_match(text, match.start(), match.end())
-                        if duration:
-                            event['duration'] = duration
+                        event.duration = self._extract_duration_near_match(text, match.start(), match.end())
                     
                     events.append(event)
         
         # Extract time ranges (e.g., "nap from 1pm to 3pm")
-        time_range_pattern = r'(?:baby|infant)?\s*(?:nap|sleep|feed|eat|play)\s*(?:from|between)?\s*(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)\s*(?:to|until|till|-)\s*(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)'
-        matches = re.finditer(time_range_pattern, text, re.IGNORECASE)
+        matches = self._patterns['time_range'].finditer(text)
         
         for match in matches:
-            start_time = self._normalize_time(match.group(1))
-            end_time = self._normalize_time(match.group(2))
+            start = time_to_minutes(self._normalize_time(match.group(1)))
+            end = time_to_minutes(self._normalize_time(match.group(2)))
             
-            if start_time and end_time:
+            if start is not None and end is not None:
                 # Determine activity type
                 activity_type = 'nap'  # Default
                 for act_type, synonyms in self.activity_types.items():
@@ -242,34 +641,24 @@ class ParserService:
                         activity_type = act_type
                         break
                 
-                event = {
-                    'type': activity_type,
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'source_text': match.group(0)
-                }
+                # Calculate duration; an end before the start is on the next day
+                duration = (end - start) % (24 * 60)
                 
-                # Calculate duration
-                start_dt = datetime.datetime.strptime(start_time, '%H:%M')
-                end_dt = datetime.datetime.strptime(end_time, '%H:%M')
-                
-                # Handle cases where end time is on the next day
-                if end_dt < start_dt:
-                    end_dt += datetime.timedelta(days=1)
-                
-                duration_minutes = (end_dt - start_dt).total_seconds() / 60
-                event['duration'] = f"{int(duration_minutes)} minutes"
-                
-                events.append(event)
+                events.append(Event(activity_type, start=start, end=end, duration=duration,
+                                    source_text=match.group(0), span=match.span()))
         
         return events
     
-    def _extract_relative_time_events(self, text):
+    @_traced('relative', count_results=True)
+    def _extract_relative_time_events(self, text, reference_index=None, index=None, offset=0):
         """
         Extract events with relative time expressions.
         
         Args:
             text (str): Normalized text to extract events from
+            reference_index (EventIndex, optional): Events from earlier messages to resolve references against
+            index (EventIndex, optional): Events already extracted from this text
+            offset (int, optional): Offset of text within the indexed text
             
         Returns:
             list: List of events with relative times
@@ -277,8 +666,7 @@ class ParserService:
         events = []
         
         # Pattern for "X hours/minutes after/before Y"
-        relative_pattern = r'(\d+)\s*(hour|minute|min|hr)s?\s*(after|before|following|prior to)\s*(\w+)'
-        matches = re.finditer(relative_pattern, text, re.IGNORECASE)
+        matches = self._patterns['relative'].finditer(text)
         
         for match in matches:
             amount = int(match.group(1))
@@ -303,76 +691,83 @@ class ParserService:
             if not reference_time:
                 for act_type, synonyms in self.activity_types.items():
                     if any(reference.lower() in syn for syn in synonyms):
-                        # Find the most recent mention of this activity type
-                        for event in events:
-                            if event['type'] == act_type and 'start_time' in event:
-                                reference_event = event
-                                break
+                        # Find the most recent earlier mention of this activity type
+                        if index is not None:
+                            reference_event = index.latest_mention(act_type, offset + match.start())
+                        
+                        # Fall back to events parsed from earlier messages
+                        if not reference_event and reference_index is not None:
+                            reference_event = reference_index.latest(act_type)
                         break
             
             # If we found a reference time or event, create a new event
             if reference_time or reference_event:
-                # Determine the activity type
-                activity_context = text[max(0, match.start() - 50):min(len(text), match.end() + 50)]
+                # Determine the activity type from the surrounding text, leaving out
+                # the reference itself ("2 hours after nap, bottle" is a feeding)
+                activity_context = text[max(0, match.start() - 50):match.start()] + ' ' + text[match.end():match.end() + 50]
                 activity_type = self._determine_activity_type(activity_context)
                 
                 if activity_type:
-                    event = {
-                        'type': activity_type,
-                        'relative_time': True,
-                        'source_text': match.group(0)
-                    }
-                    
                     # Calculate the time based on reference
                     if reference_time:
-                        base_time = datetime.datetime.strptime(reference_time, '%H:%M')
-                        if relation.lower() in ['after', 'following']:
-                            new_time = base_time + datetime.timedelta(minutes=minutes)
-                        else:  # before, prior to
-                            new_time = base_time - datetime.timedelta(minutes=minutes)
-                        
-                        event['start_time'] = new_time.strftime('%H:%M')
-                        event['reference'] = f"relative to {reference}"
+                        base_time = time_to_minutes(reference_time)
+                        description = f"relative to {reference}"
+                    else:
+                        base_time = reference_event.start
+                        description = f"relative to {reference_event.type} at {minutes_to_time(base_time)}"
                     
-                    elif reference_event:
-                        base_time = datetime.datetime.strptime(reference_event['start_time'], '%H:%M')
-                        if relation.lower() in ['after', 'following']:
-                            new_time = base_time + datetime.timedelta(minutes=minutes)
-                        else:  # before, prior to
-                            new_time = base_time - datetime.timedelta(minutes=minutes)
-                        
-                        event['start_time'] = new_time.strftime('%H:%M')
-                        event['reference'] = f"relative to {reference_event['type']} at {reference_event['start_time']}"
+                    if relation.lower() not in ['after', 'following']:  # before, prior to
+                        minutes = -minutes
                     
-                    events.append(event)
+                    events.append(Event(
+                        activity_type,
+                        start=(base_time + minutes) % (24 * 60),
+                        reference=description,
+                        relative_time=True,
+                        source_text=match.group(0),
+                        span=match.span()
+                    ))
+        
+        # Time of day expressions ("nap in the afternoon")
+        events.extend(self._extract_time_of_day_events(text))
         
-        # Pattern for time of day expressions
-        for time_expr, time_value in self.time_expressions.items():
-            pattern = fr'(?:baby|infant)?\s*(?:{"|".join(sum(self.activity_types.values(), []))})\s*(?:in|during|at)\s*(?:the)?\s*({time_expr})'
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        return events
+    
+    @_traced('relative.time_of_day', count_results=True)
+    def _extract_time_of_day_events(self, text):
+        """
+        Extract events tied to a time of day such as "in the morning".
+        
+        Args:
+            text (str): Normalized text to extract events from
             
-            for match in matches:
-                # Determine activity type
-                activity_type = self._determine_activity_type(match.group(0))
+        Returns:
+            list: List of events with approximate times
+        """
+        events = []
+        
+        # One pass over all time of day expressions
+        for match in self._patterns['time_of_day'].finditer(text):
+            time_value = self.time_expressions[match.group(1).lower()]
+            
+            # Determine activity type
+            activity_type = self._determine_activity_type(match.group(0))
+            
+            if activity_type:
+                event = Event(activity_type, start=time_to_minutes(time_value), approximate_time=True,
+                              source_text=match.group(0), span=match.span())
                 
-                if activity_type:
-                    event = {
-                        'type': activity_type,
-                        'start_time': time_value,
-                        'approximate_time': True,
-                        'source_text': match.group(0)
-                    }
-                    
-                    # Add additional details based on activity type
-                    if activity_type == 'feeding':
-                        event['feeding_type'] = self._determine_feeding_type(match.group(0))
-                    elif activity_type == 'diaper':
-                        event['diaper_type'] = self._determine_diaper_type(match.group(0))
-                    
-                    events.append(event)
+                # Add additional details based on activity type
+                if activity_type == 'feeding':
+                    event.feeding_type = self._determine_feeding_type(match.group(0))
+                elif activity_type == 'diaper':
+                    event.diaper_type = self._determine_diaper_type(match.group(0))
+                
+                events.append(event)
         
         return events
     
+    @_traced('duration', count_results=True)
     def _extract_duration_events(self, text):
         """
         Extract events with duration information.
@@ -386,8 +781,7 @@ class ParserService:
         events = []
         
         # Pattern for "X hour/minute nap/feed/etc."
-        duration_pattern = r'(\d+)\s*(hour|minute|min|hr)s?\s*(nap|feed|feeding|sleep|play|bath|walk)'
-        matches = re.finditer(duration_pattern, text, re.IGNORECASE)
+        matches = self._patterns['duration'].finditer(text)
         
         for match in matches:
             amount = int(match.group(1))
@@ -396,7 +790,6 @@ class ParserService:
             
             # Convert to minutes
             minutes = amount * 60 if unit.startswith('hour') or unit.startswith('hr') else amount
-            duration = f"{minutes} minutes"
             
             # Determine activity type
             activity_type = None
@@ -406,18 +799,17 @@ class ParserService:
                     break
             
             if activity_type:
-                # Look for time information near this mention
-                context = text[max(0, match.start() - 50):min(len(text), match.end() + 50)]
-                time_match = re.search(r'(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)', context)
+                # Look for time information near this mention, after it first;
+                # the duration's own number is not a time
+                time_match = (
+                    self._patterns['context_time'].search(text[match.end():match.end() + 50])
+                    or self._patterns['context_time'].search(text[max(0, match.start() - 50):match.start()])
+                )
                 
-                event = {
-                    'type': activity_type,
-                    'duration': duration,
-                    'source_text': match.group(0)
-                }
+                event = Event(activity_type, duration=minutes, source_text=match.group(0), span=match.span())
                 
                 if time_match:
-                    event['start_time'] = self._normalize_time(time_match.group(1))
+                    event.start = time_to_minutes(self._normalize_time(time_match.group(1)))
                 
                 events.append(event)
         
@@ -433,68 +825,53 @@ class ParserService:
             end_pos (int): End position of the match
             
         Returns:
-            str: Duration string or None if not found
+            int: Duration in minutes or None if not found
         """
         # Look for duration patterns like "for 2 hours" or "lasting 30 minutes"
         context = text[max(0, start_pos - 30):min(len(text), end_pos + 30)]
         
-        duration_patterns = [
-            r'for\s*(\d+)\s*(hour|minute|min|hr)s?',
-            r'lasting\s*(\d+)\s*(hour|minute|min|hr)s?',
-            r'(\d+)\s*(hour|minute|min|hr)s?\s*long',
-            r'(\d+)\s*(hour|minute|min|hr)s?\s*duration',
-        ]
-        
-        for pattern in duration_patterns:
-            match = re.search(pattern, context, re.IGNORECASE)
+        for pattern in self._patterns['near_duration']:
+            match = pattern.search(context)
             if match:
                 amount = int(match.group(1))
                 unit = match.group(2)
                 
                 # Convert to minutes
-                minutes = amount * 60 if unit.startswith('hour') or unit.startswith('hr') else amount
-                return f"{minutes} minutes"
+                return amount * 60 if unit.startswith('hour') or unit.startswith('hr') else amount
         
         return None
     
-    def _enhance_events_with_location(self, events, text):
+    @_traced('location')
+    def _enhance_events_with_location(self, events, text, index=None, offset=0):
         """
         Enhance events with location information.
         
         Args:
             events (list): List of events to enhance
             text (str): Original text to extract location from
+            index (EventIndex, optional): Index holding the events' text spans
+            offset (int, optional): Offset of text within the indexed text
             
         Returns:
             list: Enhanced events with location information
         """
-        # Common locations for baby activities
-        locations = {
-            'crib': ['crib', 'bassinet', 'bed', 'cot'],
-            'stroller': ['stroller', 'pram', 'buggy', 'pushchair'],
-            'car': ['car', 'carseat', 'vehicle', 'drive'],
-            'carrier': ['carrier', 'wrap', 'sling', 'baby wear'],
-            'swing': ['swing', 'rocker', 'bouncer'],
-            'arms': ['arms', 'held', 'hold', 'holding', 'cuddle'],
-            'floor': ['floor', 'mat', 'playmat', 'carpet', 'rug'],
-            'highchair': ['highchair', 'high chair', 'feeding chair'],
-            'bath': ['bath', 'bathtub', 'tub'],
-            'outside': ['outside', 'outdoors', 'yard', 'garden', 'park'],
-        }
-        
         for event in events:
             # Only look for location for certain activity types
-            if event['type'] in ['nap', 'sleep', 'play', 'feeding']:
-                # Get context around this event's mention
-                if 'source_text' in event and event['source_text'] in text:
-                    source_text = event['source_text']
-                    start_pos = text.find(source_text)
-                    context = text[max(0, start_pos - 30):min(len(text), start_pos + len(source_text) + 30)]
+            if event.type in ['nap', 'sleep', 'play', 'feeding']:
+                # Get context around this event's mention, from its indexed span if known
+                span = index.span_of(event) if index is not None else None
+                if span is None and event.source_text and event.source_text in text:
+                    start_pos = text.find(event.source_text)
+                    span = (start_pos + offset, start_pos + offset + len(event.source_text))
+                
+                if span is not None:
+                    start_pos, end_pos = span[0] - offset, span[1] - offset
+                    context = text[max(0, start_pos - 30):min(len(text), end_pos + 30)]
                     
                     # Check for location mentions
-                    for location, synonyms in locations.items():
-                        if any(re.search(fr'\b{syn}\b', context, re.IGNORECASE) for syn in synonyms):
-                            event['location'] = location
+                    for location, pattern in self._patterns['locations'].items():
+                        if pattern.search(context):
+                            event.location = location
                             break
         
         return events
@@ -509,8 +886,8 @@ class ParserService:
         Returns:
             str: Activity type or None if not determined
         """
-        for activity_type, synonyms in self.activity_types.items():
-            if any(re.search(fr'\b{syn}\b', text, re.IGNORECASE) for syn in synonyms):
+        for activity_type, pattern in self._patterns['activity_words'].items():
+            if pattern.search(text):
                 return activity_type
         
         return None
@@ -558,6 +935,7 @@ class ParserService:
         
         return 'wet'  # Default
     
+    @_traced('normalize_time')
     def _normalize_time(self, time_str):
         """
         Normalize time string to HH:MM format.
@@ -574,6 +952,11 @@ class ParserService:
         # Remove any whitespace
         time_str = time_str.strip().lower()
         
+        # A bare number is an hour ("nap at 1"), not a day of the month
+        if time_str.isdigit():
+            hours = int(time_str)
+            return f"{hours:02d}:00" if hours < 24 else None
+        
         try:
             # Try to parse with dateutil
             parsed_time = date_parser.parse(time_str)
@@ -601,6 +984,7 @@ class ParserService:
             # Format as HH:MM
             return f"{hours:02d}:{minutes:02d}"
     
+    @_traced('baby_name')
     def _extract_baby_name(self, text):
         """
         Extract baby name from text with improved accuracy.
@@ -611,16 +995,12 @@ class ParserService:
         Returns:
             str: Baby name or None if not found
         """
+        # Collapse whitespace so the name patterns only see single spaces
+        text = self._patterns['whitespace'].sub(' ', text)
+        
         # Common patterns for baby name mentions
-        name_patterns = [
-            r'(?:baby|infant)?\s*(\w+)(?:\'s)?\s*(?:routine|schedule|nap|feeding|diaper)',
-            r'(\w+)(?:\'s)?\s*(?:routine|schedule|nap|feeding|diaper)',
-            r'my\s*(?:baby|infant|little one)?\s*(\w+)\s*',
-            r'(?:baby|infant)?\s*(\w+)\s*(?:is|has|does|wakes|sleeps|eats)',
-        ]
-        
-        for pattern in name_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern in self._patterns['baby_name']:
+            matches = pattern.finditer(text)
             for match in matches:
                 name = match.group(1)
                 # Exclude common words that might be matched
@@ -630,6 +1010,7 @@ class ParserService:
         
         return None
     
+    @_traced('confidence')
     def _calculate_confidence_score(self, text, events):
         """
         Calculate a confidence score for the parsing results.
@@ -648,16 +1029,17 @@ class ParserService:
         base_score = min(len(events) / 5.0, 1.0)
         
         # Check if we have complete information
-        complete_events = sum(1 for e in events if 'start_time' in e)
+        complete_events = sum(1 for e in events if e.start is not None)
         completeness_score = complete_events / len(events) if events else 0
         
         # Check if we have a variety of activity types
-        activity_types = set(e['type'] for e in events)
+        activity_types = set(e.type for e in events)
         variety_score = min(len(activity_types) / 3.0, 1.0)
         
         # Calculate final score
         return (base_score * 0.4 + completeness_score * 0.4 + variety_score * 0.2)
     
+    @_traced('ai_enhancement')
     def _ai_enhanced_parsing(self, text, baby_name):
         """
         Use OpenAI to enhance parsing for complex or ambiguous text.
@@ -669,49 +1051,7 @@ class ParserService:
         Returns:
             list: Enhanced list of events or None if AI enhancement failed
         """
-        if not self.use_ai_assist:
+        if not self.use_ai_assist or not self.openai_service.available():
             return None
         
-        try:
-            # Create a prompt for the AI
-            prompt = f"""
-            Parse the following baby routine description for {baby_name} into structured data.
-            Extract all activities with their times, durations, and other relevant details.
-            
-            Description: {text}
-            
-            Format each activity as a JSON object with these fields:
-            - type: The activity type (nap, feeding, wake, sleep, diaper, play, bath, etc.)
-            - start_time: Time in 24-hour format (HH:MM)
-            - end_time: Time in 24-hour format if available
-            - duration: Duration in minutes if available
-            - location: Location if mentioned
-            - Additional type-specific fields (feeding_type, diaper_type, etc.)
-            
-            Return a JSON array of all activities.
-            """
-            
-            # Get response from OpenAI
-            response = self.openai_service.get_response(prompt)
-            
-            # Extract JSON from response
-            import json
-            json_str = response.split("```json")[1].split("```")[0] if "```json" in response else response
-            json_str = re.search(r'\[\s*\{.*\}\s*\]', json_str, re.DOTALL)
-            
-            if json_str:
-                events = json.loads(json_str.group(0))
-                
-                # Validate and normalize the events
-                for event in events:
-                    if 'start_time' in event and event['start_time']:
-                        event['start_time'] = self._normalize_time(event['start_time'])
-                    if 'end_time' in event and event['end_time']:
-                        event['end_time'] = self._normalize_time(event['end_time'])
-                    event['ai_generated'] = True
-                
-                return events
-        except Exception as e:
-            print(f"AI parsing enhancement failed: {str(e)}")
-        
-        return None
+        return self.enhancer.enhance(text, baby_name)
@@ -0,0 +1,236 @@
+import datetime
+import threading
+import numpy as np
+from services.event_model import ActivityType, Event, record_date, record_events
+
+# Integer code of each activity type in the columnar arrays
+TYPE_CODES = {activity_type: code for code, activity_type in enumerate(ActivityType)}
+
+NAP = TYPE_CODES[ActivityType.NAP]
+SLEEP = TYPE_CODES[ActivityType.SLEEP]
+FEEDING = TYPE_CODES[ActivityType.FEEDING]
+DIAPER = TYPE_CODES[ActivityType.DIAPER]
+
+# Missing times and durations are stored as -1
+MISSING = -1
+
+DEFAULT_WINDOWS = (7, 30, 90)
+
+class EventColumns:
+    """
+    A user's dated events as parallel NumPy arrays, sorted by day and start time.
+    """
+
+    __slots__ = ('type', 'day', 'start', 'end', 'duration')
+
+    def __init__(self, types, days, starts, ends, durations):
+        """
+        Initialize the columns from equal-length sequences.
+
+        Args:
+            types (list): Activity type codes (see TYPE_CODES)
+            days (list): Days as proleptic Gregorian ordinals
+            starts (list): Start minutes since midnight, or MISSING
+            ends (list): End minutes since midnight, or MISSING
+            durations (list): Durations in minutes, or MISSING
+        """
+        order = np.lexsort((np.asarray(starts, dtype=np.int32), np.asarray(days, dtype=np.int32)))
+        self.type = np.asarray(types, dtype=np.int8)[order]
+        self.day = np.asarray(days, dtype=np.int32)[order]
+        self.start = np.asarray(starts, dtype=np.int32)[order]
+        self.end = np.asarray(ends, dtype=np.int32)[order]
+        self.duration = np.asarray(durations, dtype=np.int32)[order]
+
+    def __len__(self):
+        return len(self.type)
+
+class RoutineAnalytics:
+    """
+    Vectorized per-child statistics over a user's routines and caregiver updates.
+    Stored records are converted once into EventColumns, which are cached per
+    user until the underlying data files change.
+    """
+
+    def __init__(self, data_manager):
+        """
+        Initialize the analytics service.
+
+        Args:
+            data_manager: DataManager instance to read routines and updates from
+        """
+        self.data_manager = data_manager
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def load_columns(self, user_id):
+        """
+        Load a user's dated events into columnar arrays.
+
+        Events of unknown activity types and records without a date are skipped.
+
+        Args:
+            user_id (str): User ID
+
+        Returns:
+            EventColumns: The user's events
+        """
+        version = self.data_manager.data_version(('routine', 'caregiver_update'))
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached and cached[0] == version:
+                return cached[1]
+
+        records = self.data_manager.get_routines(user_id) + self.data_manager.get_caregiver_updates(user_id)
+        columns = self._columns_from_records(records)
+        with self._lock:
+            self._cache[user_id] = (version, columns)
+        return columns
+
+    def _columns_from_records(self, records):
+        """
+        Convert stored routines and updates into columnar arrays.
+
+        Args:
+            records (list): Routines and caregiver updates
+
+        Returns:
+            EventColumns: The records' dated events
+        """
+        types, days, starts, ends, durations = [], [], [], [], []
+        for record in records:
+            date = record_date(record)
+            if not date:
+                continue
+            try:
+                day = datetime.date.fromisoformat(date).toordinal()
+            except ValueError:
+                continue
+
+            for data in record_events(record):
+                if not isinstance(data, dict):
+                    continue
+                try:
+                    event = Event.from_dict(data)
+                except (KeyError, ValueError):
+                    continue
+                types.append(TYPE_CODES[event.type])
+                days.append(day)
+                starts.append(MISSING if event.start is None else event.start)
+                ends.append(MISSING if event.end is None else event.end)
+                durations.append(MISSING if event.duration is None else event.duration)
+
+        return EventColumns(types, days, starts, ends, durations)
+
+    def summarize(self, user_id, windows=DEFAULT_WINDOWS, end_date=None):
+        """
+        Compute statistics for a user over trailing windows of days.
+
+        Args:
+            user_id (str): User ID
+            windows (tuple, optional): Window lengths in days
+            end_date (datetime.date, optional): Last day of every window; defaults to today
+
+        Returns:
+            dict: Statistics per window, keyed "<days>d"
+        """
+        columns = self.load_columns(user_id)
+        end_date = end_date or datetime.date.today()
+        last_day = end_date.toordinal()
+
+        return {
+            'user_id': user_id,
+            'end_date': end_date.isoformat(),
+            'event_count': len(columns),
+            'windows': {
+                f"{days}d": self._window_stats(columns, last_day - days + 1, last_day)
+                for days in windows
+            },
+        }
+
+    def _window_stats(self, columns, first_day, last_day):
+        """
+        Compute the statistics of one window.
+
+        Args:
+            columns (EventColumns): All of the user's events
+            first_day (int): First day of the window as an ordinal
+            last_day (int): Last day of the window as an ordinal
+
+        Returns:
+            dict: Window statistics
+        """
+        # Columns are sorted by day, so the window is a contiguous slice
+        low, high = np.searchsorted(columns.day, [first_day, last_day + 1])
+        types = columns.type[low:high]
+        days = columns.day[low:high]
+        starts = columns.start[low:high]
+        ends = columns.end[low:high]
+        durations = columns.duration[low:high]
+
+        day_count = last_day - first_day + 1
+        days_with_data = len(np.unique(days))
+
+        # Total nap minutes per day
+        is_nap = (types == NAP) & (durations > 0)
+        nap_minutes = np.bincount(days[is_nap] - first_day, weights=durations[is_nap], minlength=day_count)
+        nap_days = np.flatnonzero(nap_minutes)
+
+        wake_windows = compute_wake_windows(types, days, starts, ends, durations)
+        intervals = compute_feeding_intervals(types, days, starts)
+
+        diaper_count = int(np.count_nonzero(types == DIAPER))
+
+        return {
+            'days': day_count,
+            'days_with_data': days_with_data,
+            'event_count': int(len(types)),
+            'nap_minutes_per_day': _mean(nap_minutes[nap_days]),
+            'nap_minutes_by_day': [
+                {'date': datetime.date.fromordinal(first_day + int(offset)).isoformat(), 'minutes': int(nap_minutes[offset])}
+                for offset in nap_days
+            ],
+            'mean_wake_window_minutes': _mean(wake_windows),
+            'mean_feeding_interval_minutes': _mean(intervals),
+            'feeding_count': int(np.count_nonzero(types == FEEDING)),
+            'diaper_count': diaper_count,
+            'diapers_per_day': round(diaper_count / days_with_data, 2) if days_with_data else None,
+        }
+
+def compute_wake_windows(types, days, starts, ends, durations):
+    """
+    Wake windows: from the end of one sleep to the start of the next on the same day.
+
+    Args:
+        types, days, starts, ends, durations (numpy.ndarray): Event columns sorted by day and start
+
+    Returns:
+        numpy.ndarray: Wake windows in minutes, in chronological order
+    """
+    is_sleep = ((types == NAP) | (types == SLEEP)) & (starts >= 0)
+    sleep_starts = starts[is_sleep]
+    sleep_ends = np.where(ends[is_sleep] >= 0, ends[is_sleep],
+                          np.where(durations[is_sleep] >= 0, sleep_starts + durations[is_sleep], MISSING))
+    sleep_days = days[is_sleep]
+    wake_windows = sleep_starts[1:] - sleep_ends[:-1]
+    valid = (sleep_days[1:] == sleep_days[:-1]) & (sleep_ends[:-1] >= 0) & (wake_windows > 0)
+    return wake_windows[valid]
+
+def compute_feeding_intervals(types, days, starts):
+    """
+    Feeding intervals: between consecutive feedings on the same day.
+
+    Args:
+        types, days, starts (numpy.ndarray): Event columns sorted by day and start
+
+    Returns:
+        numpy.ndarray: Intervals in minutes, in chronological order
+    """
+    is_feeding = (types == FEEDING) & (starts >= 0)
+    feeding_starts = starts[is_feeding]
+    feeding_days = days[is_feeding]
+    intervals = np.diff(feeding_starts)
+    return intervals[(feeding_days[1:] == feeding_days[:-1]) & (intervals > 0)]
+
+def _mean(values):
+    """Mean of an array rounded to one decimal, or None if it is empty."""
+    return round(float(values.mean()), 1) if len(values) else None
@@ -0,0 +1,181 @@
+import datetime
+import threading
+from services.event_model import ActivityType, Event, minutes_to_time, record_date, record_events
+from services.routine_query import ACTIVITY_NAMES, _format_minutes
+
+# Approximate characters per prompt token
+CHARS_PER_TOKEN = 4
+
+DEFAULT_MAX_TOKENS = 300
+
+# Most recent activities listed in the context
+DEFAULT_RECENT_COUNT = 8
+
+# Activity types summarized for today, in order
+SUMMARY_TYPES = ('nap', 'sleep', 'feeding', 'diaper')
+
+class AssistantContext:
+    """
+    Builds the routine context of a user's assistant prompts.
+    The context is a compact text of today's rollup, 7-day statistics and
+    the most recent activities, trimmed to a token budget. It is cached per
+    user and rebuilt when the day changes or after that user's next write,
+    including writes handled by other gunicorn workers, as recorded in the
+    DataManager change log.
+    """
+
+    def __init__(self, data_manager, analytics=None, max_tokens=DEFAULT_MAX_TOKENS, recent_count=DEFAULT_RECENT_COUNT):
+        """
+        Initialize the context builder.
+
+        Args:
+            data_manager: DataManager instance
+            analytics (RoutineAnalytics, optional): Provides the 7-day statistics
+            max_tokens (int, optional): Token budget of a context
+            recent_count (int, optional): Most recent activities to list
+        """
+        self.data_manager = data_manager
+        self.analytics = analytics
+        self.max_chars = max_tokens * CHARS_PER_TOKEN
+        self.recent_count = recent_count
+        self._contexts = {}
+        self._lock = threading.Lock()
+
+    def get_context(self, user_id, today=None):
+        """
+        Get a user's assistant context.
+
+        Args:
+            user_id (str): User ID
+            today (datetime.date, optional): Current day; defaults to today
+
+        Returns:
+            str: Context text, empty if the user has no data
+        """
+        today = today or datetime.date.today()
+        # Read before the data, so a write made meanwhile makes the cached context stale
+        version = self.data_manager.user_version(user_id, ('routine', 'caregiver_update', 'user'))
+        with self._lock:
+            cached = self._contexts.get(user_id)
+        if cached and cached[0] == today and cached[1] == version:
+            return cached[2]
+
+        context = self.build_context(user_id, today)
+        with self._lock:
+            self._contexts[user_id] = (today, version, context)
+        return context
+
+    def build_context(self, user_id, today):
+        """
+        Build a user's assistant context from the stored data.
+
+        Args:
+            user_id (str): User ID
+            today (datetime.date): Current day
+
+        Returns:
+            str: Context text within the token budget
+        """
+        records = self.data_manager.get_routines(user_id) + self.data_manager.get_caregiver_updates(user_id)
+        user = self.data_manager.get_user(user_id) or {}
+
+        baby_name = user.get('baby_name') or next(
+            (record['baby_name'] for record in reversed(records) if record.get('baby_name')), None
+        )
+
+        lines = []
+        if baby_name:
+            lines.append(f"Baby: {baby_name}")
+
+        today_line = self._today_line(user_id, today)
+        if today_line:
+            lines.append(today_line)
+
+        stats_line = self._stats_line(user_id, today)
+        if stats_line:
+            lines.append(stats_line)
+
+        # Most recent activities fill whatever budget is left, newest first
+        recent = self._recent_activities(records)
+        if recent:
+            budget = self.max_chars - sum(len(line) + 1 for line in lines) - len("Recent activities:") - 1
+            listed = []
+            for line in recent:
+                if len(line) + 1 > budget:
+                    break
+                listed.append(line)
+                budget -= len(line) + 1
+            if listed:
+                lines.append("Recent activities:")
+                lines.extend(reversed(listed))
+
+        return '\n'.join(lines)[:self.max_chars]
+
+    def _today_line(self, user_id, today):
+        """Summarize today's counts and latest events from the daily rollup."""
+        summary = self.data_manager.get_daily_summary(user_id, today.isoformat())
+        parts = []
+        for activity_type in SUMMARY_TYPES:
+            count = summary['counts'].get(activity_type, 0)
+            if not count:
+                continue
+            singular, plural = ACTIVITY_NAMES[activity_type]
+            part = f"{count} {singular if count == 1 else plural}"
+            minutes = summary['total_duration_minutes'].get(activity_type)
+            if minutes:
+                part += f" ({_format_minutes(minutes)})"
+            last_event = summary['last_event'].get(activity_type)
+            if last_event and last_event.get('start_time'):
+                part += f", last at {last_event['start_time']}"
+            parts.append(part)
+        return f"Today: {'; '.join(parts)}." if parts else None
+
+    def _stats_line(self, user_id, today):
+        """Summarize the last 7 days from the analytics statistics."""
+        if self.analytics is None:
+            return None
+        stats = self.analytics.summarize(user_id, (7,), today)['windows']['7d']
+        if not stats['days_with_data']:
+            return None
+
+        parts = []
+        if stats['nap_minutes_per_day']:
+            parts.append(f"naps {_format_minutes(stats['nap_minutes_per_day'])}/day")
+        if stats['mean_wake_window_minutes']:
+            parts.append(f"wake windows ~{_format_minutes(stats['mean_wake_window_minutes'])}")
+        if stats['mean_feeding_interval_minutes']:
+            parts.append(f"feeding every ~{_format_minutes(stats['mean_feeding_interval_minutes'])}")
+        if stats['diapers_per_day']:
+            parts.append(f"{stats['diapers_per_day']} diapers/day")
+        return f"Last 7 days: {', '.join(parts)}." if parts else None
+
+    def _recent_activities(self, records):
+        """Format the most recent dated events, newest first."""
+        events = []
+        for record in records:
+            date = record_date(record) or ''
+            for data in record_events(record):
+                if not isinstance(data, dict):
+                    continue
+                try:
+                    event = Event.from_dict(data)
+                except (KeyError, ValueError):
+                    continue
+                events.append((date, -1 if event.start is None else event.start, event))
+
+        events.sort(key=lambda item: (item[0], item[1]))
+        lines = []
+        for date, _, event in reversed(events[-self.recent_count:]):
+            parts = [date[5:] or 'undated']
+            if event.start is not None:
+                parts.append(minutes_to_time(event.start))
+            line = f"- {' '.join(parts)} {event.type.value}"
+            details = [_format_minutes(event.duration)] if event.duration else []
+            if event.type == ActivityType.FEEDING and event.feeding_type:
+                details.append(event.feeding_type)
+            if event.type == ActivityType.DIAPER and event.diaper_type:
+                details.append(event.diaper_type)
+            if details:
+                line += f" ({', '.join(details)})"
+            lines.append(line)
+        return lines
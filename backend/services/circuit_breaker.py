@@ -0,0 +1,210 @@
+import os
+import time
+import threading
+from collections import deque
+from services.llm_client import LLMError
+from services.metrics import metrics as default_metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(LLMError):
+    """A call refused without trying because the circuit is open."""
+
+    def __init__(self, name, retry_in):
+        """
+        Initialize the error.
+
+        Args:
+            name (str): Name of the circuit
+            retry_in (float): Seconds until a trial call is allowed
+        """
+        super().__init__(f"The {name} circuit is open; retry in {retry_in:.0f}s", retryable=True)
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that is failing or too slow.
+    The outcomes of the last `window` calls are kept while the circuit is
+    closed. A call counts as bad if it failed or took at least
+    `slow_call_seconds`. Once the share of bad calls reaches `failure_rate`,
+    the circuit opens and calls are refused at once for `open_seconds`. Then
+    it half-opens: a few trial calls go through, and the circuit closes if
+    they are all good or opens again on the first bad one.
+    """
+
+    def __init__(self, name='openai', failure_rate=0.5, slow_call_seconds=10, window=20, min_calls=5,
+                 open_seconds=30, half_open_calls=1, metrics=None, clock=time.monotonic):
+        """
+        Initialize a closed circuit.
+
+        Args:
+            name (str, optional): Name used in errors and metrics
+            failure_rate (float, optional): Share of bad calls that opens the circuit
+            slow_call_seconds (float, optional): Latency from which a successful call counts as bad
+            window (int, optional): Number of recent calls considered
+            min_calls (int, optional): Calls needed in the window before it can open
+            open_seconds (float, optional): Seconds calls are refused before a trial
+            half_open_calls (int, optional): Good trial calls needed to close again
+            metrics (MetricsRegistry, optional): Registry for state change counters
+            clock (callable, optional): Monotonic time in seconds
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.metrics = metrics or default_metrics
+        self.clock = clock
+        self._state = CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._trials = 0
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a breaker configured by environment variables.
+
+        Returns:
+            CircuitBreaker: The breaker
+        """
+        return cls(
+            failure_rate=float(os.getenv('OPENAI_BREAKER_FAILURE_RATE', '0.5')),
+            slow_call_seconds=float(os.getenv('OPENAI_BREAKER_SLOW_SECONDS', '10')),
+            open_seconds=float(os.getenv('OPENAI_BREAKER_OPEN_SECONDS', '30')),
+        )
+
+    def _update_state(self):
+        """Half-open an open circuit once its wait has passed; call with the lock held."""
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trials = 0
+            self._successes = 0
+            self.metrics.increment(f"circuit.{self.name}.half_opened")
+
+    def _open(self):
+        """Open the circuit; call with the lock held."""
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.metrics.increment(f"circuit.{self.name}.opened")
+
+    @property
+    def state(self):
+        """The current state: 'closed', 'open' or 'half_open'."""
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def is_open(self):
+        """Whether calls would be refused right now."""
+        with self._lock:
+            self._update_state()
+            return self._state == OPEN or (self._state == HALF_OPEN and self._trials >= self.half_open_calls)
+
+    def before_call(self):
+        """
+        Ask permission to make one call.
+
+        Every permitted call must end with record_success, record_failure or release.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or its trial calls are taken
+        """
+        with self._lock:
+            self._update_state()
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return
+            retry_in = max(self._opened_at + self.open_seconds - self.clock(), 0) if self._state == OPEN else 0
+        self.metrics.increment(f"circuit.{self.name}.rejected")
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self, latency):
+        """
+        Record a completed call.
+
+        Args:
+            latency (float): Seconds the call took
+        """
+        self._record(latency >= self.slow_call_seconds)
+
+    def record_failure(self, error=None):
+        """
+        Record a failed call.
+
+        Errors the upstream is not to blame for, such as a rejected request,
+        only release the permission.
+
+        Args:
+            error (Exception, optional): The error the call raised
+        """
+        if isinstance(error, LLMError) and not error.retryable:
+            self.release()
+        else:
+            self._record(True)
+
+    def release(self):
+        """Give back a permission without recording an outcome, e.g. when the call was never made."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def _record(self, bad):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if bad:
+                    self._open()
+                    return
+                self._successes += 1
+                if self._successes >= self.half_open_calls:
+                    self._state = CLOSED
+                    self.metrics.increment(f"circuit.{self.name}.closed")
+                return
+            if self._state != CLOSED:
+                return
+
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls and sum(self._outcomes) >= self.failure_rate * len(self._outcomes):
+                self._open()
+
+    def snapshot(self):
+        """
+        Get the state of the circuit for health checks.
+
+        Returns:
+            dict: State, recent call and bad call counts, and seconds until a trial when open
+        """
+        with self._lock:
+            self._update_state()
+            snapshot = {
+                'state': self._state,
+                'recent_calls': len(self._outcomes),
+                'recent_bad_calls': sum(self._outcomes),
+            }
+            if self._state == OPEN:
+                snapshot['retry_in'] = round(max(self._opened_at + self.open_seconds - self.clock(), 0), 1)
+            return snapshot
+
+_default_breaker = None
+_default_lock = threading.Lock()
+
+def get_default_breaker():
+    """
+    Get the process-wide circuit breaker shared by every OpenAIService.
+
+    Returns:
+        CircuitBreaker: The breaker, configured from the environment on first use
+    """
+    global _default_breaker
+    with _default_lock:
+        if _default_breaker is None:
+            _default_breaker = CircuitBreaker.from_env()
+        return _default_breaker
@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import time
+import threading
+from services.event_model import ActivityType
+from services.llm_dispatcher import BATCH
+from services.metrics import metrics as default_metrics
+
+ACTIVITY_FIELDS = """Format each activity as a JSON object with these fields:
+- type: The activity type (nap, feeding, wake, sleep, diaper, play, bath, etc.)
+- start_time: Time in 24-hour format (HH:MM)
+- end_time: Time in 24-hour format if available
+- duration: Duration in minutes if available
+- location: Location if mentioned
+- Additional type-specific fields (feeding_type, diaper_type, etc.)"""
+
+SINGLE_PROMPT = """Parse the following baby routine description for {baby_name} into structured data.
+Extract all activities with their times, durations, and other relevant details.
+
+Description: {text}
+
+{fields}
+
+Return a JSON array of all activities."""
+
+BATCH_PROMPT = """Parse each of the following baby routine descriptions into structured data.
+Extract all activities with their times, durations, and other relevant details.
+
+{descriptions}
+
+{fields}
+
+Return one JSON object that maps the id of every description to a JSON array of its activities,
+for example {{"1": [...], "2": [...]}}."""
+
+ACTIVITY_TYPES = frozenset(activity_type.value for activity_type in ActivityType)
+
+# Completion tokens allowed per description in a batch
+TOKENS_PER_ITEM = 200
+
+_ARRAY_PATTERN = re.compile(r'\[\s*\{.*\}\s*\]', re.DOTALL)
+_OBJECT_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+
+def _json_text(response):
+    """Strip the disclaimer and any code fence around the JSON in a response."""
+    return response.split("```json")[1].split("```")[0] if "```json" in response else response
+
+class _Item:
+    """A description waiting in a micro-batch and, once done, its events."""
+
+    __slots__ = ('text', 'baby_name', 'done', 'result')
+
+    def __init__(self, text, baby_name):
+        self.text = text
+        self.baby_name = baby_name
+        self.done = threading.Event()
+        self.result = None
+
+class EnhancementBatcher:
+    """
+    Sends AI parsing requests for several routine descriptions in one call.
+    Descriptions are numbered in a single prompt and the model answers with
+    one JSON object keyed by those ids. Items missing from the answer or
+    failing validation are retried with a single-description call, so a
+    batch never loses an item. Concurrent enhance calls, such as a burst of
+    SMS updates, are gathered for up to `max_delay` seconds into one batch.
+    """
+
+    def __init__(self, openai_service, normalize_time=None, batch_size=8, max_delay=0.05, metrics=None):
+        """
+        Initialize the batcher.
+
+        Args:
+            openai_service (OpenAIService): Service used for the completions
+            normalize_time (callable, optional): Converts a returned time to "HH:MM"
+            batch_size (int, optional): Descriptions sent per call
+            max_delay (float, optional): Seconds a description waits for others to batch with
+            metrics (MetricsRegistry, optional): Registry for call counters
+        """
+        self.openai_service = openai_service
+        self.normalize_time = normalize_time
+        self.batch_size = max(batch_size, 1)
+        self.max_delay = max_delay
+        self.metrics = metrics or default_metrics
+        self._pending = []
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls, openai_service, normalize_time=None):
+        """
+        Create a batcher configured by environment variables.
+
+        Args:
+            openai_service (OpenAIService): Service used for the completions
+            normalize_time (callable, optional): Converts a returned time to "HH:MM"
+
+        Returns:
+            EnhancementBatcher: The batcher
+        """
+        return cls(
+            openai_service,
+            normalize_time,
+            batch_size=int(os.getenv('AI_ENHANCEMENT_BATCH_SIZE', '8')),
+            max_delay=float(os.getenv('AI_ENHANCEMENT_BATCH_DELAY', '0.05')),
+        )
+
+    def enhance(self, text, baby_name):
+        """
+        Parse one description with AI, batched with any concurrent callers.
+
+        The first caller waits up to max_delay for others, then sends
+        everything that arrived in the meantime.
+
+        Args:
+            text (str): Routine description
+            baby_name (str): Baby's name
+
+        Returns:
+            list: Validated event dicts, or None if enhancement failed
+        """
+        item = _Item(text, baby_name)
+        with self._condition:
+            self._pending.append(item)
+            leader = len(self._pending) == 1
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+
+        if not leader:
+            item.done.wait()
+            return item.result
+
+        deadline = time.monotonic() + self.max_delay
+        with self._condition:
+            while len(self._pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch, self._pending = self._pending, []
+
+        try:
+            results = self.enhance_many([(other.text, other.baby_name) for other in batch])
+            for other, result in zip(batch, results):
+                other.result = result
+        finally:
+            for other in batch:
+                other.done.set()
+        return item.result
+
+    def enhance_many(self, items):
+        """
+        Parse several descriptions with AI, batch_size per call.
+
+        Args:
+            items (list): (text, baby_name) pairs
+
+        Returns:
+            list: Validated event dicts or None for each item, in order
+        """
+        results = []
+        for start in range(0, len(items), self.batch_size):
+            chunk = items[start:start + self.batch_size]
+            results.extend(self._enhance_batch(chunk) if len(chunk) > 1 else [self._enhance_one(*chunk[0])])
+        return results
+
+    def _enhance_batch(self, items):
+        """
+        Parse descriptions in one call, retrying failed items one by one.
+
+        Args:
+            items (list): (text, baby_name) pairs
+
+        Returns:
+            list: Validated event dicts or None for each item
+        """
+        descriptions = '\n'.join(
+            f"[{index}] Baby: {baby_name}. Description: {text}"
+            for index, (text, baby_name) in enumerate(items, 1)
+        )
+        prompt = BATCH_PROMPT.format(descriptions=descriptions, fields=ACTIVITY_FIELDS)
+
+        self.metrics.increment('ai_enhancement.calls')
+        self.metrics.increment('ai_enhancement.batches')
+        self.metrics.increment('ai_enhancement.batched_items', len(items))
+        response = self.openai_service.get_response(
+            prompt,
+            priority=BATCH,
+            max_tokens=TOKENS_PER_ITEM * len(items) + 100
+        )
+
+        answers = {}
+        match = _OBJECT_PATTERN.search(_json_text(response))
+        if match:
+            try:
+                answers = json.loads(match.group(0))
+            except ValueError:
+                answers = {}
+        if not isinstance(answers, dict):
+            answers = {}
+
+        results = []
+        for index, (text, baby_name) in enumerate(items, 1):
+            events = self._validate(answers.get(str(index)))
+            if events is None:
+                self.metrics.increment('ai_enhancement.fallbacks')
+                events = self._enhance_one(text, baby_name)
+            results.append(events)
+        return results
+
+    def _enhance_one(self, text, baby_name):
+        """
+        Parse one description in its own call.
+
+        Args:
+            text (str): Routine description
+            baby_name (str): Baby's name
+
+        Returns:
+            list: Validated event dicts, or None if the answer was unusable
+        """
+        prompt = SINGLE_PROMPT.format(baby_name=baby_name, text=text, fields=ACTIVITY_FIELDS)
+
+        self.metrics.increment('ai_enhancement.calls')
+        response = self.openai_service.get_response(prompt, priority=BATCH)
+
+        match = _ARRAY_PATTERN.search(_json_text(response))
+        if not match:
+            return None
+        try:
+            return self._validate(json.loads(match.group(0)))
+        except ValueError:
+            return None
+
+    def _validate(self, events):
+        """
+        Check and normalize the events returned for one description.
+
+        Args:
+            events: Decoded JSON for the description
+
+        Returns:
+            list: Event dicts with known types and normalized times, or None if invalid
+        """
+        if not isinstance(events, list) or not events:
+            return None
+        for event in events:
+            if not isinstance(event, dict) or str(event.get('type', '')).lower() not in ACTIVITY_TYPES:
+                return None
+
+        for event in events:
+            event['type'] = event['type'].lower()
+            if self.normalize_time is not None:
+                for key in ('start_time', 'end_time'):
+                    if event.get(key):
+                        event[key] = self.normalize_time(event[key])
+            event['ai_generated'] = True
+        return events
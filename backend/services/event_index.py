@@ -0,0 +1,160 @@
+from bisect import bisect_left, bisect_right
+
+class EventIndex:
+    """
+    Compact index of one day's parsed events.
+    Timed events are kept sorted by start time, overall and per activity type,
+    so the latest event of a type at or before a given time is a bisect lookup.
+    Events parsed from text can also carry their (start, end) text span, which
+    is indexed by offset for overlap checks and "nearest earlier mention" lookups.
+    """
+
+    def __init__(self, events=None):
+        """
+        Initialize the index.
+
+        Args:
+            events (list, optional): Event objects to add
+        """
+        self._keys = []
+        self._events = []
+        self._by_type = {}
+        self._untimed = []
+        self._seq = 0
+        
+        # Text spans sorted by start offset: keys are (start, seq)
+        self._span_keys = []
+        self._span_ends = []
+        self._span_events = []
+        self._max_span_length = 0
+        self._spans_by_id = {}
+        self._mentions_by_type = {}
+        for event in events or []:
+            self.add(event)
+
+    def __len__(self):
+        return len(self._events) + len(self._untimed)
+
+    def add(self, event, span=None):
+        """
+        Add an event to the index in O(log n) comparisons.
+
+        Args:
+            event (Event): Parsed event
+            span (tuple, optional): (start, end) offsets of the event in the parsed text
+        """
+        # The sequence number keeps insertion order for equal keys
+        seq = self._seq
+        self._seq += 1
+        minute = event.start
+
+        if span is not None:
+            self._add_span(event, span, seq, minute is not None)
+
+        if minute is None:
+            self._untimed.append(event)
+            return
+
+        key = (minute, seq)
+        position = bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._events.insert(position, event)
+
+        type_keys, type_events = self._by_type.setdefault(event.type, ([], []))
+        position = bisect_right(type_keys, key)
+        type_keys.insert(position, key)
+        type_events.insert(position, event)
+
+    def _add_span(self, event, span, seq, timed):
+        """Index an event's text span by start offset."""
+        start, end = span
+        key = (start, seq)
+        position = bisect_right(self._span_keys, key)
+        self._span_keys.insert(position, key)
+        self._span_ends.insert(position, end)
+        self._span_events.insert(position, event)
+        self._max_span_length = max(self._max_span_length, end - start)
+        self._spans_by_id[id(event)] = span
+
+        # Timed mentions per type, for resolving references such as "after nap"
+        if timed:
+            type_keys, type_events = self._mentions_by_type.setdefault(event.type, ([], []))
+            position = bisect_right(type_keys, key)
+            type_keys.insert(position, key)
+            type_events.insert(position, event)
+
+    def span_of(self, event):
+        """
+        Get the text span an event was parsed from.
+
+        Args:
+            event (Event): Indexed event
+
+        Returns:
+            tuple: (start, end) offsets, or None if the event has no span
+        """
+        return self._spans_by_id.get(id(event))
+
+    def overlapping(self, span):
+        """
+        Find indexed events whose text spans overlap a span.
+
+        Only spans starting within the longest indexed span length before the
+        query can overlap it, so the scan is bounded by two bisect lookups.
+
+        Args:
+            span (tuple): (start, end) offsets
+
+        Returns:
+            list: Overlapping events in offset order
+        """
+        start, end = span
+        low = bisect_left(self._span_keys, (start - self._max_span_length, -1))
+        high = bisect_left(self._span_keys, (end, -1))
+        return [
+            self._span_events[i]
+            for i in range(low, high)
+            if self._span_ends[i] > start
+        ]
+
+    def latest_mention(self, activity_type, before_offset):
+        """
+        Find the nearest timed event of a type mentioned before a text offset.
+
+        Args:
+            activity_type (str): Activity type to look up
+            before_offset (int): Text offset the mention must start before
+
+        Returns:
+            Event: The matching event, or None
+        """
+        type_keys, type_events = self._mentions_by_type.get(activity_type, ([], []))
+        position = bisect_left(type_keys, (before_offset, -1))
+        return type_events[position - 1] if position else None
+
+    def latest(self, activity_type, before=None):
+        """
+        Find the latest event of a type, optionally at or before a time.
+
+        Args:
+            activity_type (str): Activity type to look up
+            before (int, optional): Upper bound in minutes since midnight
+
+        Returns:
+            Event: The matching event, or None
+        """
+        type_keys, type_events = self._by_type.get(activity_type, ([], []))
+        if before is None:
+            position = len(type_keys)
+        else:
+            position = bisect_right(type_keys, (before, float('inf')))
+        return type_events[position - 1] if position else None
+
+    def events(self):
+        """
+        Get all events, timed events first in start-time order.
+
+        Returns:
+            list: Indexed events
+        """
+        return self._events + self._untimed
@@ -0,0 +1,256 @@
+import datetime
+import re
+from enum import Enum
+
+MINUTES_PER_DAY = 24 * 60
+
+_DURATION_PATTERN = re.compile(r'\d+')
+
+def time_to_minutes(time_str):
+    """
+    Convert an "HH:MM" string to minutes since midnight.
+
+    Args:
+        time_str (str): Time in 24-hour HH:MM format
+
+    Returns:
+        int: Minutes since midnight, or None if the time is missing or invalid
+    """
+    if not time_str:
+        return None
+    try:
+        hours, minutes = time_str.split(':')
+        return int(hours) * 60 + int(minutes)
+    except (ValueError, AttributeError):
+        return None
+
+def minutes_to_time(minutes):
+    """
+    Convert minutes since midnight to an "HH:MM" string, wrapping around midnight.
+
+    Args:
+        minutes (int): Minutes since midnight
+
+    Returns:
+        str: Time in 24-hour HH:MM format, or None if minutes is None
+    """
+    if minutes is None:
+        return None
+    hours, minutes = divmod(minutes % MINUTES_PER_DAY, 60)
+    return f"{hours:02d}:{minutes:02d}"
+
+def duration_to_minutes(duration):
+    """
+    Convert a duration from the API format ("90 minutes") or a number to minutes.
+
+    Args:
+        duration (str or int): Duration value
+
+    Returns:
+        int: Duration in minutes, or None if it cannot be read
+    """
+    if duration is None or isinstance(duration, bool):
+        return None
+    if isinstance(duration, (int, float)):
+        return int(duration)
+    match = _DURATION_PATTERN.search(str(duration))
+    return int(match.group(0)) if match else None
+
+class ActivityType(str, Enum):
+    """Activity types recognized by the parser."""
+
+    NAP = 'nap'
+    FEEDING = 'feeding'
+    WAKE = 'wake'
+    SLEEP = 'sleep'
+    DIAPER = 'diaper'
+    PLAY = 'play'
+    BATH = 'bath'
+    WALK = 'walk'
+    READING = 'reading'
+
+    def __str__(self):
+        return self.value
+
+class Event:
+    """
+    A parsed routine event.
+    Times are stored as integer minutes since midnight and the duration as
+    integer minutes, so sorting and time arithmetic need no string parsing.
+    Events are converted to and from the dict format used by the API and the
+    stored timelines with to_dict and from_dict.
+    """
+
+    __slots__ = (
+        'type', 'start', 'end', 'duration', 'feeding_type', 'diaper_type', 'location',
+        'source_text', 'reference', 'relative_time', 'approximate_time', 'span', 'extra',
+    )
+
+    # Optional string fields copied as-is between events and dicts
+    _TEXT_FIELDS = ('feeding_type', 'diaper_type', 'location', 'source_text', 'reference')
+
+    # Dict keys handled explicitly by to_dict and from_dict
+    _KNOWN_KEYS = frozenset(('type', 'start_time', 'end_time', 'duration', 'relative_time', 'approximate_time') + _TEXT_FIELDS)
+
+    def __init__(self, type, start=None, end=None, duration=None, feeding_type=None, diaper_type=None,
+                 location=None, source_text=None, reference=None, relative_time=False,
+                 approximate_time=False, span=None, extra=None):
+        """
+        Initialize the event.
+
+        Args:
+            type (ActivityType or str): Activity type
+            start (int, optional): Start time in minutes since midnight
+            end (int, optional): End time in minutes since midnight
+            duration (int, optional): Duration in minutes
+            feeding_type (str, optional): Feeding type for feeding events
+            diaper_type (str, optional): Diaper type for diaper events
+            location (str, optional): Where the activity happened
+            source_text (str, optional): Text the event was parsed from
+            reference (str, optional): Description of the reference of a relative time
+            relative_time (bool, optional): Whether the time was relative to another event
+            approximate_time (bool, optional): Whether the time is approximate
+            span (tuple, optional): (start, end) offsets of the event in the parsed text
+            extra (dict, optional): Any other fields, kept for round-tripping
+        """
+        self.type = ActivityType(type)
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.feeding_type = feeding_type
+        self.diaper_type = diaper_type
+        self.location = location
+        self.source_text = source_text
+        self.reference = reference
+        self.relative_time = relative_time
+        self.approximate_time = approximate_time
+        self.span = span
+        self.extra = extra
+
+    def __repr__(self):
+        return f"Event({self.type.value!r}, start={minutes_to_time(self.start)!r}, duration={self.duration!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Event):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__ if name != 'span')
+
+    # Events are mutable; compare by value but hash by identity
+    __hash__ = object.__hash__
+
+    def sort_key(self):
+        """
+        Key that orders events by start time, untimed events last.
+
+        Returns:
+            tuple: Sort key
+        """
+        return (self.start is None, self.start or 0)
+
+    def merge(self, other):
+        """
+        Fill in details missing from this event from another event of the same activity.
+
+        Args:
+            other (Event): Event to copy missing details from
+        """
+        for name in self.__slots__:
+            if name != 'span' and not getattr(self, name) and getattr(other, name):
+                setattr(self, name, getattr(other, name))
+
+    def to_dict(self):
+        """
+        Convert the event to the API dict format.
+
+        Returns:
+            dict: Event with "HH:MM" times and a "N minutes" duration
+        """
+        data = {'type': self.type.value}
+        if self.start is not None:
+            data['start_time'] = minutes_to_time(self.start)
+        if self.end is not None:
+            data['end_time'] = minutes_to_time(self.end)
+        if self.duration is not None:
+            data['duration'] = f"{self.duration} minutes"
+        for name in self._TEXT_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        if self.relative_time:
+            data['relative_time'] = True
+        if self.approximate_time:
+            data['approximate_time'] = True
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create an event from the API dict format.
+
+        Args:
+            data (dict): Event dict with at least a 'type'
+
+        Returns:
+            Event: The event
+
+        Raises:
+            ValueError: If the activity type is not recognized
+        """
+        extra = {key: value for key, value in data.items() if key not in cls._KNOWN_KEYS}
+        return cls(
+            data['type'],
+            start=time_to_minutes(data.get('start_time')),
+            end=time_to_minutes(data.get('end_time')),
+            duration=duration_to_minutes(data.get('duration')),
+            feeding_type=data.get('feeding_type'),
+            diaper_type=data.get('diaper_type'),
+            location=data.get('location'),
+            source_text=data.get('source_text'),
+            reference=data.get('reference'),
+            relative_time=bool(data.get('relative_time')),
+            approximate_time=bool(data.get('approximate_time')),
+            extra=extra or None,
+        )
+
+def record_date(record):
+    """
+    Get the day a stored routine or caregiver update belongs to.
+
+    Uses an explicit 'date', then the 'timestamp' or 'parsed_at' ISO timestamp.
+    Values that do not start with a valid ISO date are ignored.
+
+    Args:
+        record (dict): Routine or caregiver update
+
+    Returns:
+        str: ISO date (YYYY-MM-DD), or None if the record is undated
+    """
+    for key in ('date', 'timestamp', 'parsed_at'):
+        value = record.get(key)
+        if isinstance(value, str) and len(value) >= 10:
+            try:
+                return datetime.date.fromisoformat(value[:10]).isoformat()
+            except ValueError:
+                continue
+    return None
+
+def record_events(record):
+    """
+    Get the event dicts held by a stored routine or caregiver update.
+
+    Routines carry their events in 'routine', SMS updates in 'parsed_events',
+    and an update posted as a single event is itself the event.
+
+    Args:
+        record (dict): Routine or caregiver update
+
+    Returns:
+        list: Event dicts
+    """
+    for key in ('routine', 'parsed_events'):
+        events = record.get(key)
+        if isinstance(events, list):
+            return events
+    return [record] if 'type' in record else []
@@ -0,0 +1,163 @@
+import io
+import csv
+from services.event_model import duration_to_minutes, record_date, record_events
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Columns of an exported row, one row per event
+EXPORT_COLUMNS = (
+    'source', 'date', 'recorded_at', 'type', 'start_time', 'end_time',
+    'duration_minutes', 'feeding_type', 'diaper_type', 'location', 'text',
+)
+
+# Rows buffered before a CSV chunk is sent
+CSV_CHUNK_ROWS = 500
+
+# Rows per Parquet row group
+PARQUET_ROW_GROUP_SIZE = 10000
+
+def parquet_available():
+    """Check whether Parquet export is possible, which needs pyarrow."""
+    return pq is not None
+
+def iter_export_rows(data_manager, user_id):
+    """
+    Yield a user's routines and caregiver updates as flat rows, one per event.
+
+    Records without events, such as free-text updates, yield a single row
+    with only their text.
+
+    Args:
+        data_manager: DataManager instance
+        user_id (str): User ID
+
+    Yields:
+        tuple: Values in EXPORT_COLUMNS order
+    """
+    for source, records in (('routine', data_manager.get_routines(user_id)),
+                            ('caregiver_update', data_manager.get_caregiver_updates(user_id))):
+        for record in records:
+            date = record_date(record)
+            recorded_at = record.get('timestamp') or record.get('parsed_at')
+            text = record.get('message') or record.get('text') or record.get('notes')
+
+            events = [event for event in record_events(record) if isinstance(event, dict)]
+            if not events:
+                yield (source, date, recorded_at, None, None, None, None, None, None, None, text)
+                continue
+
+            for event in events:
+                yield (
+                    source, date, recorded_at, event.get('type'), event.get('start_time'),
+                    event.get('end_time'), duration_to_minutes(event.get('duration')),
+                    event.get('feeding_type'), event.get('diaper_type'), event.get('location'),
+                    event.get('source_text') or text,
+                )
+
+def iter_csv(rows, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Encode rows as CSV, yielding the output in chunks.
+
+    Args:
+        rows (iterable): Tuples in EXPORT_COLUMNS order
+        chunk_rows (int, optional): Rows per yielded chunk
+
+    Yields:
+        str: CSV text, starting with the header
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes over in chunks."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        """Remove and return the bytes written since the last call."""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def iter_parquet(rows, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """
+    Encode rows as a Parquet file, yielding the output one row group at a time.
+
+    Args:
+        rows (iterable): Tuples in EXPORT_COLUMNS order
+        row_group_size (int, optional): Rows per row group
+
+    Yields:
+        bytes: Parquet file content
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if not parquet_available():
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    schema = pa.schema([
+        (name, pa.int32() if name == 'duration_minutes' else pa.string())
+        for name in EXPORT_COLUMNS
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def write_group(columns):
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values if pa.types.is_integer(field.type) else [None if value is None else str(value) for value in values],
+                      type=field.type)
+             for values, field in zip(columns, schema)],
+            schema=schema
+        ))
+
+    columns = [[] for _ in EXPORT_COLUMNS]
+    count = 0
+    for row in rows:
+        for values, value in zip(columns, row):
+            values.append(value)
+        count += 1
+        if count == row_group_size:
+            write_group(columns)
+            columns = [[] for _ in EXPORT_COLUMNS]
+            count = 0
+            yield sink.take()
+
+    if count:
+        write_group(columns)
+    writer.close()
+    yield sink.take()
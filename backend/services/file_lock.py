@@ -0,0 +1,68 @@
+import os
+import logging
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows; locking is then only between threads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+def _thread_lock(path):
+    """Get the in-process lock of a lock file."""
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive lock on a lock file, shared by threads and by processes
+    such as gunicorn workers, for a read-modify-write of the data it guards.
+
+    Args:
+        path (str): Lock file, created if missing
+    """
+    with _thread_lock(path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+def acquire_process_lock(path):
+    """
+    Try to become the one process that runs a background job.
+
+    Every gunicorn worker imports the app, so jobs that must run once, such
+    as the reminder scheduler, start only in the worker that gets this lock.
+    The lock is held until the returned file is closed or the process exits,
+    so a replacement worker takes over when the holder dies.
+
+    Args:
+        path (str): Lock file, created if missing
+
+    Returns:
+        file: Open lock file to keep for the life of the job, or None if
+            another process holds the lock
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    f = open(path, 'a')
+    if fcntl is None:
+        logger.warning(f"No file locking on this platform; {path} does not keep other processes out")
+        return f
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import random
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = 'https://api.openai.com/v1'
+
+# Statuses worth retrying: rate limits and upstream failures
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+class LLMError(Exception):
+    """A chat completion request that failed or ran out of time."""
+
+    def __init__(self, message, status=None, retryable=False):
+        """
+        Initialize the error.
+
+        Args:
+            message (str): Error description
+            status (int, optional): HTTP status of the last response
+            retryable (bool, optional): Whether the failure was transient
+        """
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+class LLMClient:
+    """
+    HTTP client for OpenAI-compatible chat completions.
+    Owns a keep-alive connection pool shared by all calls. Every attempt has
+    connect and read timeouts, transient failures are retried with jittered
+    exponential backoff, and a call never runs past its total deadline, so a
+    slow upstream cannot hold a worker for the whole gunicorn timeout.
+    """
+
+    def __init__(self, api_key, api_base=DEFAULT_API_BASE, connect_timeout=3.05, read_timeout=30,
+                 deadline=45, max_retries=3, backoff_base=0.5, backoff_cap=8, pool_size=10,
+                 sleep=time.sleep, clock=time.monotonic):
+        """
+        Initialize the client and its connection pool.
+
+        Args:
+            api_key (str): API key sent as a bearer token
+            api_base (str, optional): Base URL of the API
+            connect_timeout (float, optional): Seconds to wait for a connection
+            read_timeout (float, optional): Seconds to wait for a response
+            deadline (float, optional): Seconds a call may take across all attempts
+            max_retries (int, optional): Retries after the first attempt
+            backoff_base (float, optional): Backoff ceiling of the first retry in seconds
+            backoff_cap (float, optional): Largest backoff ceiling in seconds
+            pool_size (int, optional): Connections kept alive
+            sleep (callable, optional): Sleeps for a number of seconds
+            clock (callable, optional): Monotonic time in seconds
+        """
+        self.api_key = api_key
+        self.api_base = api_base.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self.clock = clock
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        })
+
+    @classmethod
+    def from_env(cls, api_key=None, api_base=None):
+        """
+        Create a client configured by environment variables.
+
+        Args:
+            api_key (str, optional): API key to use instead of OPENAI_API_KEY
+            api_base (str, optional): Base URL to use instead of OPENAI_API_BASE
+
+        Returns:
+            LLMClient: The client
+        """
+        return cls(
+            api_key or os.getenv('OPENAI_API_KEY'),
+            api_base=api_base or os.getenv('OPENAI_API_BASE') or DEFAULT_API_BASE,
+            connect_timeout=float(os.getenv('OPENAI_CONNECT_TIMEOUT', '3.05')),
+            read_timeout=float(os.getenv('OPENAI_READ_TIMEOUT', '30')),
+            deadline=float(os.getenv('OPENAI_DEADLINE', '45')),
+            max_retries=int(os.getenv('OPENAI_MAX_RETRIES', '3')),
+        )
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Get the delay before a retry, with full jitter.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0
+            retry_after (float, optional): Delay requested by the server
+
+        Returns:
+            float: Seconds to wait
+        """
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after) if retry_after else delay
+
+    def _payload(self, messages, model, max_tokens, temperature, stream=False):
+        """Build the request body of a chat completion."""
+        payload = {'model': model, 'messages': messages}
+        if max_tokens is not None:
+            payload['max_tokens'] = max_tokens
+        if temperature is not None:
+            payload['temperature'] = temperature
+        if stream:
+            payload['stream'] = True
+        return payload
+
+    def _post(self, payload, deadline_at, stream=False):
+        """
+        Send a chat completion request, retrying transient failures until the deadline.
+
+        Args:
+            payload (dict): Request body
+            deadline_at (float): Clock time by which the call must finish
+            stream (bool, optional): Whether to leave the response body unread
+
+        Returns:
+            requests.Response: The successful response
+
+        Raises:
+            LLMError: If every attempt failed or the deadline passed
+        """
+        attempt = 0
+        while True:
+            remaining = deadline_at - self.clock()
+            if remaining <= 0:
+                raise LLMError("Chat completion deadline exceeded", retryable=True)
+
+            status, retry_after = None, None
+            try:
+                response = self.session.post(
+                    f'{self.api_base}/chat/completions',
+                    json=payload,
+                    timeout=(min(self.connect_timeout, remaining), min(self.read_timeout, remaining)),
+                    stream=stream
+                )
+                status = response.status_code
+                if status < 400:
+                    return response
+                if status not in RETRY_STATUSES:
+                    raise LLMError(f"Chat completion failed with status {status}: {response.text[:200]}", status)
+                error = f"status {status}"
+                retry_after = _retry_after(response)
+                response.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = type(e).__name__
+
+            if attempt >= self.max_retries:
+                raise LLMError(f"Chat completion failed after {attempt + 1} attempts: {error}", status, retryable=True)
+
+            delay = self.backoff(attempt, retry_after)
+            if delay >= deadline_at - self.clock():
+                raise LLMError(f"Chat completion deadline exceeded after {attempt + 1} attempts: {error}", status, retryable=True)
+
+            logger.warning(f"Chat completion attempt {attempt + 1} failed ({error}); retrying in {delay:.2f}s")
+            self.sleep(delay)
+            attempt += 1
+
+    def chat_completion(self, messages, model, max_tokens=None, temperature=None, deadline=None):
+        """
+        Request a chat completion.
+
+        Args:
+            messages (list): Chat messages
+            model (str): Model name
+            max_tokens (int, optional): Completion token limit
+            temperature (float, optional): Sampling temperature
+            deadline (float, optional): Seconds the call may take; defaults to the client deadline
+
+        Returns:
+            dict: Decoded API response
+
+        Raises:
+            LLMError: If every attempt failed or the deadline passed
+        """
+        deadline_at = self.clock() + (deadline if deadline is not None else self.deadline)
+        payload = self._payload(messages, model, max_tokens, temperature)
+        return self._post(payload, deadline_at).json()
+
+    def stream_chat_completion(self, messages, model, max_tokens=None, temperature=None, deadline=None):
+        """
+        Request a chat completion as a stream of content chunks.
+
+        Opening the stream is retried like chat_completion. Once chunks have
+        been yielded, a failure is raised rather than retried; the read
+        timeout then bounds the wait for each chunk.
+
+        Args:
+            messages (list): Chat messages
+            model (str): Model name
+            max_tokens (int, optional): Completion token limit
+            temperature (float, optional): Sampling temperature
+            deadline (float, optional): Seconds the whole stream may take; defaults to the client deadline
+
+        Yields:
+            str: Content chunks in order
+
+        Raises:
+            LLMError: If the stream could not be opened, broke off or ran past the deadline
+        """
+        deadline_at = self.clock() + (deadline if deadline is not None else self.deadline)
+        payload = self._payload(messages, model, max_tokens, temperature, stream=True)
+        response = self._post(payload, deadline_at, stream=True)
+        try:
+            # Server-sent events, one "data: {json}" line per chunk
+            for line in response.iter_lines(chunk_size=None):
+                if self.clock() > deadline_at:
+                    raise LLMError("Chat completion deadline exceeded while streaming", retryable=True)
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    return
+                choices = json.loads(data).get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content')
+                if content:
+                    yield content
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise LLMError(f"Chat completion stream failed: {type(e).__name__}", retryable=True)
+        finally:
+            response.close()
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+def _retry_after(response):
+    """Read a Retry-After header given in seconds."""
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
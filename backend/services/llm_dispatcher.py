@@ -0,0 +1,193 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from services.llm_client import LLMError
+from services.metrics import metrics as default_metrics
+
+# Priority classes, most urgent first
+INTERACTIVE = 'interactive'
+SMS = 'sms'
+BATCH = 'batch'
+PRIORITIES = {INTERACTIVE: 0, SMS: 1, BATCH: 2}
+
+# Longest a request of each class waits for its turn, in seconds
+DEFAULT_MAX_WAIT = {INTERACTIVE: 15, SMS: 30, BATCH: 120}
+
+class TokenBucket:
+    """
+    Allows a sustained rate per minute with bursts up to the bucket capacity.
+    Not thread-safe; the dispatcher serializes access.
+    """
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute (float): Units refilled per minute
+            capacity (float, optional): Largest burst; defaults to one minute's worth
+            clock (callable, optional): Monotonic time in seconds
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        Get the seconds until an amount is available.
+
+        Amounts above the capacity only need a full bucket, so oversized
+        requests are delayed rather than refused.
+
+        Args:
+            amount (float): Units needed
+
+        Returns:
+            float: Seconds to wait, 0 if available now
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount):
+        """Remove an amount; the level may go negative to carry a debt."""
+        self._refill()
+        self.level -= amount
+
+class LLMDispatcher:
+    """
+    Central admission control for upstream LLM calls in this process.
+    Callers wait in one priority queue: interactive requests go before SMS
+    replies, which go before batch work. The head of the queue proceeds once
+    both the request and token buckets allow it, so the rate limit is spent
+    on the most urgent work first. Each class has a bounded queue and a
+    maximum wait, and queue times are recorded per class.
+    """
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=90000, max_queue=100,
+                 max_wait=None, metrics=None, clock=time.monotonic):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            requests_per_minute (float, optional): Request rate limit
+            tokens_per_minute (float, optional): Token rate limit
+            max_queue (int, optional): Waiting requests allowed per priority class
+            max_wait (dict, optional): Seconds each class may wait; see DEFAULT_MAX_WAIT
+            metrics (MetricsRegistry, optional): Registry for queue metrics
+            clock (callable, optional): Monotonic time in seconds
+        """
+        self.requests = TokenBucket(requests_per_minute, clock=clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock)
+        self.max_queue = max_queue
+        self.max_wait = dict(DEFAULT_MAX_WAIT, **(max_wait or {}))
+        self.metrics = metrics or default_metrics
+        self.clock = clock
+        self._queue = []
+        self._queued = {name: 0 for name in PRIORITIES}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a dispatcher configured by environment variables.
+
+        Returns:
+            LLMDispatcher: The dispatcher
+        """
+        return cls(
+            requests_per_minute=float(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '500')),
+            tokens_per_minute=float(os.getenv('OPENAI_TOKENS_PER_MINUTE', '90000')),
+            max_queue=int(os.getenv('LLM_QUEUE_SIZE', '100')),
+        )
+
+    def queued(self, priority=None):
+        """Get the number of waiting requests, in one class or in all."""
+        with self._condition:
+            return self._queued[priority] if priority else len(self._queue)
+
+    def acquire(self, priority=INTERACTIVE, tokens=0):
+        """
+        Wait for permission to make one upstream call.
+
+        Args:
+            priority (str, optional): 'interactive', 'sms' or 'batch'
+            tokens (int, optional): Estimated tokens the call will use
+
+        Raises:
+            LLMError: If the class's queue is full or its maximum wait passed
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        enqueued_at = self.clock()
+        deadline = enqueued_at + self.max_wait[priority]
+        with self._condition:
+            if self._queued[priority] >= self.max_queue:
+                self.metrics.increment(f"llm.queue.{priority}.rejected")
+                raise LLMError(f"The {priority} request queue is full", retryable=True)
+
+            entry = (PRIORITIES[priority], next(self._sequence))
+            heapq.heappush(self._queue, entry)
+            self._queued[priority] += 1
+            try:
+                while True:
+                    now = self.clock()
+                    if self._queue[0] == entry:
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    else:
+                        wait = None
+                    if now >= deadline:
+                        self.metrics.increment(f"llm.queue.{priority}.timeouts")
+                        raise LLMError(f"Timed out waiting for the {priority} request queue", retryable=True)
+                    self._condition.wait(min(wait, deadline - now) if wait is not None else deadline - now)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._queued[priority] -= 1
+                # The next request in line may be able to proceed
+                self._condition.notify_all()
+
+        self.metrics.observe(f"llm.queue.{priority}", self.clock() - enqueued_at)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """
+        Correct the token bucket once a call reports its actual usage.
+
+        Args:
+            estimated_tokens (int): Tokens charged by acquire
+            actual_tokens (int): Tokens the call used
+        """
+        with self._condition:
+            self.tokens.take(actual_tokens - estimated_tokens)
+            self._condition.notify_all()
+
+_default_dispatcher = None
+_default_lock = threading.Lock()
+
+def get_default_dispatcher():
+    """
+    Get the process-wide dispatcher shared by every OpenAIService.
+
+    Returns:
+        LLMDispatcher: The dispatcher, configured from the environment on first use
+    """
+    global _default_dispatcher
+    with _default_lock:
+        if _default_dispatcher is None:
+            _default_dispatcher = LLMDispatcher.from_env()
+        return _default_dispatcher
@@ -0,0 +1,369 @@
+"""
+Local OpenAI-compatible chat completions server for load and latency testing.
+
+Serves POST /v1/chat/completions, including streaming, with a configurable
+latency distribution, error rate and echo or canned answers, so the AI
+features can be benchmarked without calling OpenAI. GET /stats returns the
+request counters.
+
+Usage (from the backend directory):
+    python -m services.llm_stub --latency lognormal --latency-ms 400 --latency-max-ms 3000 --error-rate 0.02
+
+Then start the app with OPENAI_STUB_URL=http://127.0.0.1:8089/v1 to send
+every OpenAI call to the stub.
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the backend directory to the path when run as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.prompt_budget import count_tokens
+
+DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+MODES = ('echo', 'canned')
+
+DEFAULT_PORT = 8089
+
+DEFAULT_CANNED_RESPONSE = ("Keep naps at consistent times each day.\n"
+                           "Start the bedtime routine 20 minutes before sleep.\n"
+                           "Offer a feeding shortly after each wake-up.")
+
+# z-score of the 99th percentile of a normal distribution
+_Z_99 = 2.326
+
+class LLMStub:
+    """
+    OpenAI-compatible chat completions stub.
+    Each request waits for a latency drawn from the configured distribution,
+    then fails with one of the error statuses at the configured rate or
+    answers with an echo of the last user message or a canned response.
+    Streamed answers send that latency as the time to the first chunk, then
+    one word per chunk every `token_ms`.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, latency='fixed', latency_ms=200, latency_max_ms=None,
+                 token_ms=20, error_rate=0.0, error_statuses=(429, 500, 503), retry_after=1, mode='echo',
+                 canned_response=DEFAULT_CANNED_RESPONSE, seed=None):
+        """
+        Initialize the stub.
+
+        Args:
+            host (str, optional): Address to listen on
+            port (int, optional): Port to listen on, or 0 for any free port
+            latency (str, optional): Latency distribution: 'fixed', 'uniform' or 'lognormal'
+            latency_ms (float, optional): Fixed latency, uniform minimum or lognormal median
+            latency_max_ms (float, optional): Uniform maximum or lognormal 99th percentile;
+                defaults to four times latency_ms
+            token_ms (float, optional): Delay between streamed chunks
+            error_rate (float, optional): Share of requests answered with an error
+            error_statuses (tuple, optional): Statuses errors are drawn from
+            retry_after (int, optional): Retry-After seconds sent with 429 errors
+            mode (str, optional): 'echo' repeats the last user message, 'canned' sends canned_response
+            canned_response (str, optional): Answer in canned mode
+            seed (int, optional): Random seed for repeatable runs
+
+        Raises:
+            ValueError: If the distribution or mode is unknown
+        """
+        if latency not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency}")
+        if mode not in MODES:
+            raise ValueError(f"Unknown response mode: {mode}")
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_max_ms = latency_max_ms if latency_max_ms is not None else latency_ms * 4
+        self.token_ms = token_ms
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.mode = mode
+        self.canned_response = canned_response
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'streams': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a stub configured by environment variables.
+
+        Returns:
+            LLMStub: The stub
+        """
+        latency_max_ms = os.getenv('LLM_STUB_LATENCY_MAX_MS')
+        statuses = os.getenv('LLM_STUB_ERROR_STATUSES', '429,500,503')
+        return cls(
+            host=os.getenv('LLM_STUB_HOST', '127.0.0.1'),
+            port=int(os.getenv('LLM_STUB_PORT', str(DEFAULT_PORT))),
+            latency=os.getenv('LLM_STUB_LATENCY', 'fixed'),
+            latency_ms=float(os.getenv('LLM_STUB_LATENCY_MS', '200')),
+            latency_max_ms=float(latency_max_ms) if latency_max_ms else None,
+            token_ms=float(os.getenv('LLM_STUB_TOKEN_MS', '20')),
+            error_rate=float(os.getenv('LLM_STUB_ERROR_RATE', '0')),
+            error_statuses=[int(status) for status in statuses.split(',') if status.strip()],
+            mode=os.getenv('LLM_STUB_MODE', 'echo'),
+            canned_response=os.getenv('LLM_STUB_RESPONSE') or DEFAULT_CANNED_RESPONSE,
+        )
+
+    @property
+    def api_base(self):
+        """Base URL to configure as OPENAI_STUB_URL."""
+        host = '127.0.0.1' if self.host in ('', '0.0.0.0') else self.host
+        return f"http://{host}:{self.port}/v1"
+
+    def sample_latency(self):
+        """
+        Draw the latency of one request.
+
+        Returns:
+            float: Latency in seconds
+        """
+        with self._lock:
+            if self.latency == 'uniform':
+                latency_ms = self.random.uniform(self.latency_ms, self.latency_max_ms)
+            elif self.latency == 'lognormal' and self.latency_ms > 0:
+                sigma = math.log(max(self.latency_max_ms, self.latency_ms) / self.latency_ms) / _Z_99
+                latency_ms = self.random.lognormvariate(math.log(self.latency_ms), sigma)
+            else:
+                latency_ms = self.latency_ms
+        return max(latency_ms, 0) / 1000
+
+    def sample_error(self):
+        """
+        Decide whether a request fails.
+
+        Returns:
+            int: Error status, or None if the request succeeds
+        """
+        with self._lock:
+            if self.error_statuses and self.random.random() < self.error_rate:
+                return self.random.choice(self.error_statuses)
+        return None
+
+    def answer(self, messages):
+        """
+        Get the answer to a conversation.
+
+        Args:
+            messages (list): Chat messages of the request
+
+        Returns:
+            str: The answer
+        """
+        if self.mode == 'canned':
+            return self.canned_response
+        user_messages = [message for message in messages if message.get('role') == 'user']
+        return f"Echo: {user_messages[-1].get('content', '') if user_messages else ''}"
+
+    def count(self, key):
+        """Add one to a request counter."""
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        """
+        Get the request counters.
+
+        Returns:
+            dict: Requests, streamed requests and errors served
+        """
+        with self._lock:
+            return dict(self.stats)
+
+    def start(self):
+        """
+        Start serving in a background thread.
+
+        Returns:
+            LLMStub: The stub, with port set to the bound port
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, name='llm-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Serves the stub's endpoints."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send_json(200, self.server.stub.snapshot())
+        else:
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        stub = self.server.stub
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': "Request body is not valid JSON"}})
+            return
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+
+        stub.count('requests')
+        time.sleep(stub.sample_latency())
+
+        status = stub.sample_error()
+        if status is not None:
+            stub.count('errors')
+            headers = {'Retry-After': str(stub.retry_after)} if status == 429 else {}
+            self._send_json(status, {'error': {'message': f"Stub error {status}", 'type': 'stub_error'}}, headers)
+            return
+
+        messages = body.get('messages') or []
+        content = stub.answer(messages)
+        model = body.get('model', 'stub')
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:24]}"
+
+        if body.get('stream'):
+            stub.count('streams')
+            self._stream(completion_id, model, content, stub.token_ms / 1000)
+            return
+
+        prompt_tokens = sum(count_tokens(str(message.get('content', ''))) for message in messages)
+        completion_tokens = count_tokens(content)
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+    def _stream(self, completion_id, model, content, token_delay):
+        """Send an answer as server-sent events, one word per chunk."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        words = content.split(' ')
+        try:
+            for index, word in enumerate(words):
+                if index and token_delay:
+                    time.sleep(token_delay)
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'delta': {'content': word if index == len(words) - 1 else word + ' '},
+                        'finish_reason': None,
+                    }],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            final = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+            }
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. after a read timeout
+            pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        try:
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def main(argv=None):
+    stub = LLMStub.from_env()
+    arg_parser = argparse.ArgumentParser(description="Serve OpenAI-compatible chat completions locally for load tests.")
+    arg_parser.add_argument('--host', default=stub.host, help="address to listen on")
+    arg_parser.add_argument('--port', type=int, default=stub.port, help="port to listen on")
+    arg_parser.add_argument('--latency', choices=DISTRIBUTIONS, default=stub.latency, help="latency distribution")
+    arg_parser.add_argument('--latency-ms', type=float, default=stub.latency_ms,
+                            help="fixed latency, uniform minimum or lognormal median")
+    arg_parser.add_argument('--latency-max-ms', type=float, default=stub.latency_max_ms,
+                            help="uniform maximum or lognormal 99th percentile")
+    arg_parser.add_argument('--token-ms', type=float, default=stub.token_ms, help="delay between streamed chunks")
+    arg_parser.add_argument('--error-rate', type=float, default=stub.error_rate, help="share of requests that fail")
+    arg_parser.add_argument('--error-statuses', default=','.join(str(status) for status in stub.error_statuses),
+                            help="comma-separated statuses errors are drawn from")
+    arg_parser.add_argument('--mode', choices=MODES, default=stub.mode, help="echo the question or send a canned answer")
+    arg_parser.add_argument('--response', default=stub.canned_response, help="answer in canned mode")
+    arg_parser.add_argument('--seed', type=int, default=None, help="random seed")
+    args = arg_parser.parse_args(argv)
+
+    stub = LLMStub(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_max_ms=args.latency_max_ms,
+        token_ms=args.token_ms,
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(',') if status.strip()],
+        mode=args.mode,
+        canned_response=args.response,
+        seed=args.seed,
+    ).start()
+    print(f"LLM stub serving at {stub.api_base} ({args.latency} latency {args.latency_ms:g}ms, "
+          f"error rate {args.error_rate:g}, {args.mode} mode)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process registry of counters and timers.
+    Services record into the shared `metrics` instance and the /metrics
+    endpoint serves a snapshot of it.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}
+
+    def increment(self, name, value=1):
+        """
+        Add a value to a counter.
+
+        Args:
+            name (str): Counter name
+            value (int, optional): Amount to add
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """
+        Record one timing observation.
+
+        Args:
+            name (str): Timer name
+            seconds (float): Observed duration in seconds
+        """
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = [0, 0.0, 0.0]
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+    def trace(self, prefix, sample_rate=1.0):
+        """
+        Start a trace for one operation, subject to sampling.
+
+        Args:
+            prefix (str): Prefix for all metric names recorded by the trace
+            sample_rate (float, optional): Probability that the operation is recorded
+
+        Returns:
+            Trace: A recording trace, or NULL_TRACE if the operation is not sampled
+        """
+        if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+            return NULL_TRACE
+        self.increment(f"{prefix}.sampled")
+        return Trace(self, prefix)
+
+    def snapshot(self):
+        """
+        Get a copy of all recorded metrics.
+
+        Returns:
+            dict: Counters and timers (count, total_ms, mean_ms, max_ms)
+        """
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'timers': {
+                    name: {
+                        'count': count,
+                        'total_ms': round(total * 1000, 3),
+                        'mean_ms': round(total / count * 1000, 4),
+                        'max_ms': round(maximum * 1000, 4),
+                    }
+                    for name, (count, total, maximum) in self._timers.items()
+                },
+            }
+
+    def reset(self):
+        """Clear all recorded metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+class _StageTimer:
+    """Context manager that records the wall time of one stage."""
+
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+class Trace:
+    """Records stage timings and counts for one sampled operation."""
+
+    def __init__(self, registry, prefix):
+        """
+        Initialize the trace.
+
+        Args:
+            registry (MetricsRegistry): Registry to record into
+            prefix (str): Prefix for all metric names
+        """
+        self.registry = registry
+        self.prefix = prefix
+
+    def stage(self, name):
+        """Return a context manager timing the named stage."""
+        return _StageTimer(self.registry, f"{self.prefix}.{name}")
+
+    def count(self, name, value=1):
+        """Add a value to the named counter."""
+        self.registry.increment(f"{self.prefix}.{name}", value)
+
+class _NullTrace:
+    """Trace used for unsampled operations; records nothing."""
+
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def count(self, name, value=1):
+        pass
+
+NULL_TRACE = _NullTrace()
+
+# Process-wide registry
+metrics = MetricsRegistry()
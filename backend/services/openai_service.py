@@ -1,10 +1,36 @@
 import os
-import openai
 from dotenv import load_dotenv
+from services.llm_client import LLMClient, LLMError
+from services.response_cache import ResponseCache, make_cache_key
+from services.semantic_cache import SemanticCache
+from services.singleflight import SingleFlight
+from services.llm_dispatcher import INTERACTIVE, get_default_dispatcher
+from services.prompt_budget import PromptBudget, count_tokens
+from services.circuit_breaker import CircuitOpenError, get_default_breaker
 
 # Load environment variables
 load_dotenv()
 
+SYSTEM_PROMPT = """You are a helpful, empathetic parenting assistant for the Hatchling app.
+Your responses should be:
+1. Concise and friendly
+2. In plain language (not overly clinical or robotic)
+3. Empathetic to the challenges of parenting
+4. Focused on providing practical advice
+
+When answering questions about baby routines, focus on typical patterns and gentle guidance.
+For medical questions, always emphasize the importance of consulting healthcare professionals.
+"""
+
+UNAVAILABLE_MESSAGE = "I'm sorry, the AI assistant is temporarily unavailable. Please try again in a few minutes."
+
+# General suggestions given while the AI is unavailable
+FALLBACK_SUGGESTIONS = [
+    "Try to keep wake-up and bedtime within the same half hour every day.",
+    "Watch for early sleepy cues like yawning or eye rubbing and start naps before overtiredness sets in.",
+    "Keep a short, predictable routine before naps and bedtime, such as a feeding, a diaper change and a song.",
+]
+
 class OpenAIService:
     """
     Service for handling OpenAI GPT interactions for the Hatchling app.
@@ -12,16 +38,47 @@ class OpenAIService:
     baby routines and general parenting topics.
     """
     
-    def __init__(self):
-        """Initialize the OpenAI service with API key from environment variables."""
+    def __init__(self, cache=None, semantic_cache=None, llm_client=None, dispatcher=None, prompt_budget=None,
+                 breaker=None):
+        """
+        Initialize the OpenAI service with API key from environment variables.
+        
+        Args:
+            cache (ResponseCache, optional): Cache for responses; configured from
+                the RESPONSE_CACHE_* environment variables if not given
+            semantic_cache (SemanticCache, optional): Cache for answers to paraphrased
+                questions; configured from the SEMANTIC_CACHE_* environment variables if not given
+            llm_client (LLMClient, optional): Client for chat completions; configured from
+                the OPENAI_* environment variables if not given
+            dispatcher (LLMDispatcher, optional): Rate limiter and priority queue for
+                upstream calls; defaults to the one shared by the whole process
+            prompt_budget (PromptBudget, optional): Token budget of routine prompts;
+                configured from PROMPT_ROUTINE_TOKENS if not given
+            breaker (CircuitBreaker, optional): Circuit breaker around upstream calls;
+                defaults to the one shared by the whole process
+        """
         self.api_key = os.getenv('OPENAI_API_KEY')
-        if self.api_key:
-            openai.api_key = self.api_key
-        else:
+        # Load tests send every call to the local stub server (services/llm_stub.py)
+        self.stub_url = os.getenv('OPENAI_STUB_URL')
+        if self.stub_url:
+            print(f"WARNING: OpenAI calls go to the stub server at {self.stub_url}")
+            self.api_key = self.api_key or 'stub'
+        elif not self.api_key:
             print("WARNING: OPENAI_API_KEY not found in environment variables")
         self.disclaimer = "This is an AI assistant and may not always be accurate. For medical questions or concerns, please consult your pediatrician or a qualified professional."
+        self.model = "gpt-3.5-turbo"
+        self.temperature = 0.7
+        self.cache = cache if cache is not None else ResponseCache.from_env()
+        self.semantic_cache = semantic_cache if semantic_cache is not None else SemanticCache.from_env()
+        self.llm_client = llm_client if llm_client is not None else LLMClient.from_env(self.api_key, self.stub_url)
+        # Identical concurrent requests share one upstream call
+        self.singleflight = SingleFlight('openai.singleflight')
+        self.dispatcher = dispatcher if dispatcher is not None else get_default_dispatcher()
+        self.prompt_budget = prompt_budget if prompt_budget is not None else PromptBudget.from_env()
+        self.breaker = breaker if breaker is not None else get_default_breaker()
         
-    def get_response(self, query, user_data=None, baby_data=None):
+    def get_response(self, query, user_data=None, baby_data=None, priority=INTERACTIVE, context=None, max_tokens=500,
+                     semantic=False):
         """
         Get a response from OpenAI GPT for a parenting or routine-related query.
         
@@ -29,6 +86,11 @@ class OpenAIService:
             query (str): The user's question or request
             user_data (dict, optional): User data for personalized responses
             baby_data (dict, optional): Baby routine data for context-aware responses
+            priority (str, optional): Dispatcher priority class: 'interactive', 'sms' or 'batch'
+            context (str, optional): Prebuilt routine context from AssistantContext
+            max_tokens (int, optional): Completion token limit
+            semantic (bool, optional): Whether paraphrases may be answered from the semantic
+                cache; only for free-form questions, not templated prompts
             
         Returns:
             str: The AI response with disclaimer
@@ -38,68 +100,270 @@ class OpenAIService:
                 return f"{self.disclaimer}\n\nI'm sorry, I couldn't process your question at the moment. The OpenAI API key is not configured."
                 
             # Prepare system message with context
-            system_message = self._build_system_message(user_data, baby_data)
-            
-            # Create the messages array for the API call
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": query}
-            ]
-            
-            # Call the OpenAI API using the older syntax for version 0.27.0
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            # Extract the response text (different structure in older API)
-            response_text = response.choices[0].message.content.strip()
+            system_message = self._build_system_message(user_data, baby_data, context)
             
-            # Add the disclaimer
-            full_response = f"{self.disclaimer}\n\n{response_text}"
+            cached = self._get_cached_response(query, system_message, semantic)
+            if cached is not None:
+                return cached
             
-            return full_response
+            return self.singleflight.do(
+                make_cache_key(query, system_message, self.model, self.temperature),
+                lambda: self._generate_response(query, system_message, priority, max_tokens, semantic)
+            )
             
+        except CircuitOpenError:
+            # Fail fast while the API is degraded; cached answers were checked above
+            return f"{self.disclaimer}\n\n{UNAVAILABLE_MESSAGE}"
         except Exception as e:
             print(f"OpenAI API error: {str(e)}")
             # Return a friendly error message
             return f"{self.disclaimer}\n\nI'm sorry, I couldn't process your question at the moment. Please try again later. Error: {str(e)}"
     
-    def _build_system_message(self, user_data, baby_data):
+    def _generate_response(self, query, system_message, priority=INTERACTIVE, max_tokens=500, semantic=False):
         """
-        Build a system message with context for more relevant responses.
+        Call the API for a response and cache it.
+        
+        Args:
+            query (str): The user's question or request
+            system_message (str): The system message with context
+            priority (str, optional): Dispatcher priority class
+            max_tokens (int, optional): Completion token limit
+            semantic (bool, optional): Whether to add the answer to the semantic cache
+            
+        Returns:
+            str: The AI response with disclaimer
+        """
+        # Create the messages array for the API call
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": query}
+        ]
+        
+        response = self._complete(messages, max_tokens, priority)
+        
+        # Extract the response text
+        response_text = response['choices'][0]['message']['content'].strip()
+        
+        # Add the disclaimer
+        full_response = f"{self.disclaimer}\n\n{response_text}"
+        
+        self._cache_response(query, system_message, full_response, semantic)
+        
+        return full_response
+    
+    def available(self):
+        """
+        Check whether upstream calls are currently allowed.
+        
+        Returns:
+            bool: False while the circuit breaker is open
+        """
+        return not self.breaker.is_open()
+    
+    def _acquire(self, messages, max_tokens, priority):
+        """
+        Get permission from the circuit breaker, then wait for the dispatcher.
         
         Args:
+            messages (list): Chat messages
+            max_tokens (int): Completion token limit
+            priority (str): Dispatcher priority class
+            
+        Returns:
+            int: Estimated tokens charged by the dispatcher
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+        """
+        # Checked first, so an open circuit fails without queueing
+        self.breaker.before_call()
+        estimated_tokens = _estimate_tokens(messages, max_tokens)
+        try:
+            self.dispatcher.acquire(priority, estimated_tokens)
+        except Exception:
+            self.breaker.release()
+            raise
+        return estimated_tokens
+    
+    def _complete(self, messages, max_tokens, priority):
+        """
+        Wait for the circuit breaker and dispatcher, then call the API.
+        
+        Args:
+            messages (list): Chat messages
+            max_tokens (int): Completion token limit
+            priority (str): Dispatcher priority class
+            
+        Returns:
+            dict: Decoded API response
+        """
+        estimated_tokens = self._acquire(messages, max_tokens, priority)
+        
+        # Call the API with bounded timeouts and retries
+        started = self.breaker.clock()
+        try:
+            response = self.llm_client.chat_completion(
+                messages,
+                model=self.model,
+                max_tokens=max_tokens,
+                temperature=self.temperature
+            )
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success(self.breaker.clock() - started)
+        
+        usage = response.get('usage') or {}
+        if usage.get('total_tokens'):
+            self.dispatcher.record_usage(estimated_tokens, usage['total_tokens'])
+        return response
+    
+    def stream_response(self, query, user_data=None, baby_data=None, context=None, semantic=False):
+        """
+        Stream a response to a parenting or routine-related query as it is generated.
+        
+        The disclaimer is yielded first, so the caller has something to show
+        before the first token arrives. Cached answers are yielded whole.
+        
+        Args:
+            query (str): The user's question or request
             user_data (dict, optional): User data for personalized responses
             baby_data (dict, optional): Baby routine data for context-aware responses
+            context (str, optional): Prebuilt routine context from AssistantContext
+            semantic (bool, optional): Whether paraphrases may be answered from the semantic cache
+            
+        Yields:
+            str: Chunks of the AI response with disclaimer
+            
+        Raises:
+            LLMError: If the stream could not be completed
+        """
+        if not self.api_key:
+            yield f"{self.disclaimer}\n\nI'm sorry, I couldn't process your question at the moment. The OpenAI API key is not configured."
+            return
+        
+        system_message = self._build_system_message(user_data, baby_data, context)
+        
+        cached = self._get_cached_response(query, system_message, semantic)
+        if cached is not None:
+            yield cached
+            return
+        
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": query}
+        ]
+        
+        try:
+            self._acquire(messages, 500, INTERACTIVE)
+        except CircuitOpenError:
+            yield f"{self.disclaimer}\n\n{UNAVAILABLE_MESSAGE}"
+            return
+        
+        # Every exit must settle the permit: an outcome once the stream ends or fails,
+        # or a release if the consumer stops reading, which says nothing about the API
+        recorded = False
+        latency = None
+        chunks = []
+        try:
+            yield f"{self.disclaimer}\n\n"
+            
+            # The breaker judges the stream by its time to the first chunk
+            started = self.breaker.clock()
+            for chunk in self.llm_client.stream_chat_completion(
+                messages,
+                model=self.model,
+                max_tokens=500,
+                temperature=self.temperature
+            ):
+                if latency is None:
+                    latency = self.breaker.clock() - started
+                # Leading whitespace would land right after the disclaimer
+                if not chunks:
+                    chunk = chunk.lstrip()
+                    if not chunk:
+                        continue
+                chunks.append(chunk)
+                yield chunk
+            recorded = True
+            self.breaker.record_success(latency if latency is not None else self.breaker.clock() - started)
+        except Exception as e:
+            recorded = True
+            self.breaker.record_failure(e)
+            raise
+        finally:
+            if not recorded:
+                self.breaker.release()
+        
+        self._cache_response(query, system_message, f"{self.disclaimer}\n\n{''.join(chunks).strip()}", semantic)
+    
+    def _get_cached_response(self, query, system_message, semantic=False):
+        """
+        Look up a cached answer to a question asked with the same context.
+        
+        Args:
+            query (str): The user's question
+            system_message (str): The system message with context
+            semantic (bool, optional): Whether to also look for answered paraphrases
             
         Returns:
-            str: The system message with context
+            str: The cached response, or None
         """
-        system_message = """
-        You are a helpful, empathetic parenting assistant for the Hatchling app. 
-        Your responses should be:
-        1. Concise and friendly
-        2. In plain language (not overly clinical or robotic)
-        3. Empathetic to the challenges of parenting
-        4. Focused on providing practical advice
+        # Repeated questions with unchanged context are answered from the cache
+        if self.cache is not None:
+            cached = self.cache.get(make_cache_key(query, system_message, self.model, self.temperature))
+            if cached is not None:
+                return cached
         
-        When answering questions about baby routines, focus on typical patterns and gentle guidance.
-        For medical questions, always emphasize the importance of consulting healthcare professionals.
+        # Paraphrases of an answered question in the same context. Templated prompts
+        # (parsing, routine context) look alike whatever they ask, so they never match
+        if semantic and self.semantic_cache is not None:
+            return self.semantic_cache.lookup(query, system_message)
+        return None
+    
+    def _cache_response(self, query, system_message, full_response, semantic=False):
         """
+        Store a generated response in the caches.
+        
+        Args:
+            query (str): The user's question
+            system_message (str): The system message with context
+            full_response (str): The response with disclaimer
+            semantic (bool, optional): Whether to add it to the semantic cache as well
+        """
+        if self.cache is not None:
+            self.cache.set(make_cache_key(query, system_message, self.model, self.temperature), full_response)
+        if semantic and self.semantic_cache is not None:
+            self.semantic_cache.add(query, system_message, full_response)
+    
+    def _build_system_message(self, user_data, baby_data, context=None):
+        """
+        Build a system message with context for more relevant responses.
+        
+        Args:
+            user_data (dict, optional): User data for personalized responses
+            baby_data (dict, optional): Baby routine data for context-aware responses;
+                given a list of routines, the latest one is used
+            context (str, optional): Prebuilt routine context, used instead of baby_data
+            
+        Returns:
+            str: The system message with context
+        """
+        system_message = SYSTEM_PROMPT
+        
+        if context:
+            return system_message + f"\nHere is some context about the baby's routine:\n{context}\n"
+        
+        if isinstance(baby_data, list):
+            baby_data = baby_data[-1] if baby_data else None
         
         # Add context from baby data if available
         if baby_data:
-            routine_context = f"""
-            Here is some context about the baby's routine:
-            - Name: {baby_data.get('baby_name', 'the baby')}
-            """
+            routine_context = f"\nHere is some context about the baby's routine:\n- Name: {baby_data.get('baby_name', 'the baby')}\n"
             
             # Add recent activities if available
             if baby_data.get('routine'):
-                routine_context += "\n- Recent activities:\n"
+                routine_context += "- Recent activities:\n"
                 for activity in baby_data.get('routine')[:5]:  # Last 5 activities
                     activity_type = activity.get('type', '')
                     start_time = activity.get('start_time', '')
@@ -109,52 +373,40 @@ class OpenAIService:
         
         return system_message
     
-    def get_routine_specific_response(self, query, routine_data):
+    def get_routine_specific_response(self, query, routine_data, priority=INTERACTIVE):
         """
         Get a response specifically about a baby's routine using the available data.
         
         Args:
             query (str): The user's question about the routine
             routine_data (dict): The baby's routine data
+            priority (str, optional): Dispatcher priority class: 'interactive', 'sms' or 'batch'
             
         Returns:
             str: The AI response with disclaimer
         """
         try:
-            # Extract relevant routine information
-            baby_name = routine_data.get('baby_name', 'your baby')
-            
-            # Create a context-rich prompt
-            routine_context = f"The following is data about {baby_name}'s routine:\n"
-            
-            if routine_data.get('routine'):
-                for activity in routine_data.get('routine'):
-                    activity_type = activity.get('type', '')
-                    start_time = activity.get('start_time', '')
-                    actual_time = activity.get('actual_time', '')
-                    
-                    if actual_time:
-                        routine_context += f"- {activity_type} scheduled for {start_time}, actually happened at {actual_time}\n"
-                    else:
-                        routine_context += f"- {activity_type} scheduled for {start_time}\n"
+            # Create a context-rich prompt, compressing older activities to fit the token budget
+            routine_context, _ = self.prompt_budget.routine_context(routine_data)
             
             # Combine the context with the user's query
             full_query = f"{routine_context}\n\nBased on this information, please answer: {query}"
             
             # Get response using the standard method
-            return self.get_response(full_query, baby_data=routine_data)
+            return self.get_response(full_query, baby_data=routine_data, priority=priority)
             
         except Exception as e:
             print(f"Routine response error: {str(e)}")
             # Return a friendly error message
             return f"{self.disclaimer}\n\nI'm sorry, I couldn't process your question about the routine at the moment. Please try again later."
     
-    def get_suggestions(self, routine_data):
+    def get_suggestions(self, routine_data, priority=INTERACTIVE):
         """
         Get suggestions for improving the baby's routine based on the available data.
         
         Args:
             routine_data (dict): The baby's routine data
+            priority (str, optional): Dispatcher priority class: 'interactive', 'sms' or 'batch'
             
         Returns:
             list: A list of suggestions
@@ -162,51 +414,90 @@ class OpenAIService:
         try:
             if not self.api_key:
                 return ["Unable to generate suggestions. The OpenAI API key is not configured."]
-                
-            # Extract relevant routine information
-            baby_name = routine_data.get('baby_name', 'your baby')
-            
-            # Create a context-rich prompt
-            routine_context = f"The following is data about {baby_name}'s routine:\n"
-            
-            if routine_data.get('routine'):
-                for activity in routine_data.get('routine'):
-                    activity_type = activity.get('type', '')
-                    start_time = activity.get('start_time', '')
-                    actual_time = activity.get('actual_time', '')
-                    
-                    if actual_time:
-                        routine_context += f"- {activity_type} scheduled for {start_time}, actually happened at {actual_time}\n"
-                    else:
-                        routine_context += f"- {activity_type} scheduled for {start_time}\n"
-            
-            # Create the query for suggestions
-            query = f"{routine_context}\n\nBased on this routine data, provide 3 brief, practical suggestions for improving {baby_name}'s routine. Format each suggestion as a single sentence."
-            
-            # Create the messages array for the API call
-            messages = [
-                {"role": "system", "content": "You are a helpful parenting assistant that provides practical, concise suggestions for baby routines."},
-                {"role": "user", "content": query}
-            ]
-            
-            # Call the OpenAI API using the older syntax for version 0.27.0
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=300,
-                temperature=0.7
-            )
             
-            # Extract the response text
-            response_text = response.choices[0].message.content.strip()
-            
-            # Split into individual suggestions
-            suggestions = [s.strip() for s in response_text.split('\n') if s.strip()]
-            
-            # Limit to 3 suggestions
-            return suggestions[:3]
+            return self.compute_suggestions(routine_data, priority)
             
+        except CircuitOpenError:
+            return list(FALLBACK_SUGGESTIONS)
         except Exception as e:
             print(f"Suggestions error: {str(e)}")
             # Return a default suggestion
             return ["I couldn't generate personalized suggestions at the moment. Please try again later."]
+    
+    def compute_suggestions(self, routine_data, priority=INTERACTIVE):
+        """
+        Generate suggestions for a routine, raising errors instead of falling back.
+        
+        Used where fallback suggestions must not be mistaken for real ones,
+        such as when precomputing and storing suggestions.
+        
+        Args:
+            routine_data (dict): The baby's routine data
+            priority (str, optional): Dispatcher priority class: 'interactive', 'sms' or 'batch'
+            
+        Returns:
+            list: A list of suggestions
+            
+        Raises:
+            LLMError: If the API key is missing, the API call failed or the circuit breaker is open
+        """
+        if not self.api_key:
+            raise LLMError("The OpenAI API key is not configured")
+        
+        # Extract relevant routine information
+        baby_name = routine_data.get('baby_name', 'your baby')
+        
+        # Create a context-rich prompt, compressing older activities to fit the token budget
+        routine_context, _ = self.prompt_budget.routine_context(routine_data)
+        
+        # Create the query for suggestions
+        query = f"{routine_context}\n\nBased on this routine data, provide 3 brief, practical suggestions for improving {baby_name}'s routine. Format each suggestion as a single sentence."
+        
+        system_message = "You are a helpful parenting assistant that provides practical, concise suggestions for baby routines."
+        
+        cache_key = make_cache_key(query, system_message, self.model, self.temperature)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        return self.singleflight.do(cache_key, lambda: self._generate_suggestions(query, system_message, cache_key, priority))
+    
+    def _generate_suggestions(self, query, system_message, cache_key, priority=INTERACTIVE):
+        """
+        Call the API for routine suggestions and cache them.
+        
+        Args:
+            query (str): The suggestions prompt with routine context
+            system_message (str): The system message
+            cache_key (str): Cache key of the request
+            priority (str, optional): Dispatcher priority class
+            
+        Returns:
+            list: Up to 3 suggestions
+        """
+        # Create the messages array for the API call
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": query}
+        ]
+        
+        response = self._complete(messages, 300, priority)
+        
+        # Extract the response text
+        response_text = response['choices'][0]['message']['content'].strip()
+        
+        # Split into individual suggestions
+        suggestions = [s.strip() for s in response_text.split('\n') if s.strip()]
+        
+        # Limit to 3 suggestions
+        suggestions = suggestions[:3]
+        
+        if self.cache is not None:
+            self.cache.set(cache_key, suggestions)
+        
+        return suggestions
+
+def _estimate_tokens(messages, max_tokens):
+    """Estimate the tokens of a call: the counted prompt tokens plus the completion limit."""
+    return sum(count_tokens(message['content']) for message in messages) + max_tokens
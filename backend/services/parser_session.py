@@ -0,0 +1,156 @@
+import datetime
+import threading
+from collections import OrderedDict
+from services.event_index import EventIndex
+from services.event_model import Event
+
+class ParserSession:
+    """
+    Incremental parse state for one user's day.
+    Keeps an EventIndex of the events parsed so far, so each new message is
+    parsed on its own while relative references resolve against earlier ones.
+    Events are held as compact Event objects and converted to dicts only when
+    they leave the session.
+    """
+
+    def __init__(self, user_id, date, events=None, offset=0):
+        """
+        Initialize the session.
+
+        Args:
+            user_id (str): User the session belongs to
+            date (str): Day as an ISO date string (YYYY-MM-DD)
+            events (list, optional): Event dicts already parsed for this day
+            offset (int, optional): Byte offset in the stored timeline up to which events are held
+        """
+        self.user_id = user_id
+        self.date = date
+        self.index = EventIndex(Event.from_dict(event) for event in events or [])
+        self.offset = offset
+        self.lock = threading.Lock()
+
+    def ingest(self, parser, text):
+        """
+        Parse one new message and add its events to the session.
+
+        Args:
+            parser (ParserService): Parser used for the message
+            text (str): Message text
+
+        Returns:
+            list: Event objects parsed from the message
+        """
+        events = parser.parse_events(text, reference_index=self.index)
+        for event in events:
+            self.index.add(event)
+        return events
+
+    def timeline(self):
+        """
+        Get the day's events in start-time order.
+
+        Returns:
+            list: Event dicts parsed so far
+        """
+        return [event.to_dict() for event in self.index.events()]
+
+class ParserSessionManager:
+    """
+    Holds the active ParserSession of each user and day.
+    Sessions are loaded from the stored timeline on first use, kept in a
+    bounded LRU cache, and every ingested message appends only its new events
+    to the stored timeline. Before a session is used, the events other
+    gunicorn workers appended since it last read the timeline are read in.
+    """
+
+    def __init__(self, parser, data_manager, max_sessions=1000):
+        """
+        Initialize the session manager.
+
+        Args:
+            parser (ParserService): Parser used for incoming messages
+            data_manager: DataManager instance for timeline storage
+            max_sessions (int, optional): Maximum number of sessions kept in memory
+        """
+        self.parser = parser
+        self.data_manager = data_manager
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_session(self, user_id, date=None):
+        """
+        Get the session for a user and day, loading it if needed.
+
+        Args:
+            user_id (str): User ID
+            date (str, optional): ISO date; defaults to today
+
+        Returns:
+            ParserSession: The session
+        """
+        date = date or datetime.date.today().isoformat()
+        key = (user_id, date)
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+        if session is not None:
+            with session.lock:
+                self._catch_up(session)
+            return session
+
+        # Load outside the manager lock; a concurrent load of the same key keeps the first
+        events, offset = self.data_manager.get_timeline_since(user_id, date)
+        loaded = ParserSession(user_id, date, events, offset)
+
+        with self._lock:
+            session = self._sessions.setdefault(key, loaded)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def ingest(self, user_id, text, date=None):
+        """
+        Parse a new message for a user's day and persist its events.
+
+        Args:
+            user_id (str): User ID
+            text (str): Message text
+            date (str, optional): ISO date; defaults to today
+
+        Returns:
+            list: Events parsed from the message
+        """
+        session = self.get_session(user_id, date)
+        with session.lock, self.data_manager.timeline_lock(user_id, session.date):
+            self._catch_up(session)
+            events = [event.to_dict() for event in session.ingest(self.parser, text)]
+            if events:
+                self.data_manager.append_timeline_events(events, user_id, session.date)
+                # Move past the lines just appended; the session already holds their events
+                _, session.offset = self.data_manager.get_timeline_since(user_id, session.date, session.offset)
+        return events
+
+    def _catch_up(self, session):
+        """Add the events appended to the stored timeline by other processes; call with the session lock held."""
+        events, session.offset = self.data_manager.get_timeline_since(session.user_id, session.date, session.offset)
+        for event in events:
+            session.index.add(Event.from_dict(event))
+
+    def get_timeline(self, user_id, date=None):
+        """
+        Get a user's timeline for a day.
+
+        Args:
+            user_id (str): User ID
+            date (str, optional): ISO date; defaults to today
+
+        Returns:
+            list: Events in start-time order
+        """
+        session = self.get_session(user_id, date)
+        with session.lock:
+            return session.timeline()
@@ -0,0 +1,267 @@
+import math
+import datetime
+import functools
+import threading
+from collections import deque
+from services.analytics import compute_feeding_intervals, compute_wake_windows, FEEDING, NAP, SLEEP, MISSING
+from services.event_model import ActivityType, Event, record_date, record_events
+
+# Number of most recent intervals each model is computed over
+DEFAULT_WINDOW = 30
+
+# Minimum number of intervals before predictions are made
+MIN_SAMPLES = 3
+
+class RollingStats:
+    """
+    Mean and standard deviation over the most recent values, updated in O(1).
+    """
+
+    __slots__ = ('values', 'total', 'total_sq')
+
+    def __init__(self, values=(), window=DEFAULT_WINDOW):
+        """
+        Initialize the statistics.
+
+        Args:
+            values (numpy.ndarray or list, optional): Initial values, oldest first
+            window (int, optional): Number of most recent values kept
+        """
+        recent = values[-window:] if len(values) else []
+        self.values = deque((float(value) for value in recent), maxlen=window)
+        self.total = float(sum(self.values))
+        self.total_sq = float(sum(value * value for value in self.values))
+
+    def add(self, value):
+        """
+        Add a value, dropping the oldest one if the window is full.
+
+        Args:
+            value (float): New value
+        """
+        value = float(value)
+        if len(self.values) == self.values.maxlen:
+            oldest = self.values[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else None
+
+    @property
+    def std(self):
+        if not self.values:
+            return None
+        mean = self.mean
+        return math.sqrt(max(0.0, self.total_sq / len(self.values) - mean * mean))
+
+class UserModel:
+    """
+    Interval statistics and the latest reference events of one user.
+    Event times are (day ordinal, minutes since midnight) tuples.
+    """
+
+    __slots__ = ('wake_windows', 'feeding_intervals', 'last_feeding', 'last_sleep_start', 'last_sleep_end')
+
+    def __init__(self, wake_windows, feeding_intervals, last_feeding=None, last_sleep_start=None, last_sleep_end=None):
+        self.wake_windows = wake_windows
+        self.feeding_intervals = feeding_intervals
+        self.last_feeding = last_feeding
+        self.last_sleep_start = last_sleep_start
+        self.last_sleep_end = last_sleep_end
+
+    def add_event(self, day, event):
+        """
+        Update the model with a newly logged event.
+
+        Events older than the latest one of their kind are ignored; the model
+        assumes events are logged in time order.
+
+        Args:
+            day (int): Day ordinal of the event
+            event (Event): The event
+        """
+        if event.start is None:
+            return
+        moment = (day, event.start)
+
+        if event.type == ActivityType.FEEDING:
+            if self.last_feeding is None or moment > self.last_feeding:
+                if self.last_feeding and self.last_feeding[0] == day:
+                    self.feeding_intervals.add(event.start - self.last_feeding[1])
+                self.last_feeding = moment
+
+        elif event.type in (ActivityType.NAP, ActivityType.SLEEP):
+            if self.last_sleep_start and moment <= self.last_sleep_start:
+                return
+            if self.last_sleep_end and self.last_sleep_end[0] == day and event.start > self.last_sleep_end[1]:
+                self.wake_windows.add(event.start - self.last_sleep_end[1])
+
+            end = event.end if event.end is not None else (
+                event.start + event.duration if event.duration is not None else None)
+            self.last_sleep_start = moment
+            self.last_sleep_end = (day, end) if end is not None else None
+
+class RoutinePredictor:
+    """
+    Predicts when a baby's next nap or feeding is likely.
+    A user's model is built from the stored history with vectorized
+    statistics over the analytics columns, then kept current by a DataManager
+    write listener, so predictions are constant-time lookups. Each model
+    records the user's version from the DataManager change log; a write the
+    listener did not apply, such as one stored by another gunicorn worker,
+    leaves the versions apart and the user's model is rebuilt. Writes for
+    other users never touch it.
+    """
+
+    def __init__(self, data_manager, analytics, window=DEFAULT_WINDOW):
+        """
+        Initialize the predictor and register it for new writes.
+
+        Args:
+            data_manager: DataManager instance
+            analytics (RoutineAnalytics): Provides the columnar event history
+            window (int, optional): Number of most recent intervals the statistics cover
+        """
+        self.data_manager = data_manager
+        self.analytics = analytics
+        self.window = window
+        # User ID to (model, user version)
+        self._models = {}
+        self._lock = threading.Lock()
+        data_manager.add_write_listener(functools.partial(self.on_write, kind='routine'), kinds=('routine',))
+        data_manager.add_write_listener(functools.partial(self.on_write, kind='caregiver_update'), kinds=('caregiver_update',))
+
+    def _build_model(self, records):
+        """Build a user's model from their full stored history."""
+        columns = self.analytics._columns_from_records(records)
+        model = UserModel(
+            RollingStats(compute_wake_windows(columns.type, columns.day, columns.start, columns.end, columns.duration), self.window),
+            RollingStats(compute_feeding_intervals(columns.type, columns.day, columns.start), self.window),
+        )
+
+        # Latest reference events, from the arrays sorted by day and start
+        feeding = ((columns.type == FEEDING) & (columns.start >= 0)).nonzero()[0]
+        if len(feeding):
+            model.last_feeding = (int(columns.day[feeding[-1]]), int(columns.start[feeding[-1]]))
+
+        sleeps = (((columns.type == NAP) | (columns.type == SLEEP)) & (columns.start >= 0)).nonzero()[0]
+        if len(sleeps):
+            last = sleeps[-1]
+            day, start = int(columns.day[last]), int(columns.start[last])
+            model.last_sleep_start = (day, start)
+            if columns.end[last] != MISSING:
+                model.last_sleep_end = (day, int(columns.end[last]))
+            elif columns.duration[last] != MISSING:
+                model.last_sleep_end = (day, start + int(columns.duration[last]))
+
+        return model
+
+    def get_model(self, user_id):
+        """
+        Get a user's model, building it on first use and after writes it missed.
+
+        Args:
+            user_id (str): User ID
+
+        Returns:
+            UserModel: The model
+        """
+        # Read before the records, so a write made meanwhile is caught by the next call
+        version = self.data_manager.user_version(user_id)
+        with self._lock:
+            cached = self._models.get(user_id)
+        if cached is not None and cached[1] == version:
+            return cached[0]
+
+        model = self._build_model(self.data_manager.get_routines(user_id) + self.data_manager.get_caregiver_updates(user_id))
+        with self._lock:
+            self._models[user_id] = (model, version)
+        return model
+
+    def on_write(self, record, user_id, kind):
+        """
+        Update a cached model with a newly stored routine or caregiver update.
+
+        Users without a cached model are skipped; their model is built from
+        the stored history, including this record, on first use. A model that
+        missed other writes for the user is dropped and rebuilt on next use.
+
+        Args:
+            record (dict): The stored record
+            user_id (str): User ID
+            kind (str): 'routine' or 'caregiver_update'
+        """
+        version = self.data_manager.user_version(user_id)
+        with self._lock:
+            cached = self._models.get(user_id)
+            if cached is None:
+                return
+            model, (routine_count, update_count) = cached
+            if kind == 'routine':
+                routine_count += 1
+            else:
+                update_count += 1
+            # The change log holds this write; anything more is a write the model missed
+            if (routine_count, update_count) != version:
+                del self._models[user_id]
+                return
+            self._models[user_id] = (model, version)
+
+            date = record_date(record) or datetime.date.today().isoformat()
+            day = datetime.date.fromisoformat(date).toordinal()
+            events = []
+            for data in record_events(record):
+                if not isinstance(data, dict):
+                    continue
+                try:
+                    events.append(Event.from_dict(data))
+                except (KeyError, ValueError):
+                    continue
+            for event in sorted(events, key=Event.sort_key):
+                model.add_event(day, event)
+
+    def predict(self, user_id, activity_type):
+        """
+        Predict when the next event of a type is likely.
+
+        Args:
+            user_id (str): User ID
+            activity_type (str): 'nap', 'sleep' or 'feeding'
+
+        Returns:
+            dict: Predicted time with a one-standard-deviation range, or None
+                if there is not enough history
+        """
+        model = self.get_model(user_id)
+        if activity_type in ('nap', 'sleep'):
+            stats, reference, basis = model.wake_windows, model.last_sleep_end, 'wake_windows'
+        elif activity_type == 'feeding':
+            stats, reference, basis = model.feeding_intervals, model.last_feeding, 'feeding_intervals'
+        else:
+            return None
+
+        if reference is None or stats.count < MIN_SAMPLES:
+            return None
+
+        base = datetime.datetime.fromordinal(reference[0]) + datetime.timedelta(minutes=reference[1])
+        mean, std = stats.mean, stats.std
+        return {
+            'type': activity_type,
+            'predicted_at': (base + datetime.timedelta(minutes=mean)).isoformat(timespec='minutes'),
+            'earliest': (base + datetime.timedelta(minutes=max(0.0, mean - std))).isoformat(timespec='minutes'),
+            'latest': (base + datetime.timedelta(minutes=mean + std)).isoformat(timespec='minutes'),
+            'since': base.isoformat(timespec='minutes'),
+            'basis': basis,
+            'mean_minutes': round(mean, 1),
+            'std_minutes': round(std, 1),
+            'samples': stats.count,
+        }
@@ -0,0 +1,157 @@
+import os
+import re
+from services.event_model import duration_to_minutes, minutes_to_time, time_to_minutes
+from services.metrics import metrics as default_metrics
+
+# Words, numbers and single punctuation marks
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Characters per token of a word or number
+CHARS_PER_TOKEN = 4
+
+DEFAULT_MAX_TOKENS = 600
+
+def count_tokens(text):
+    """
+    Estimate the number of model tokens in a text without a tokenizer.
+
+    Each word or number counts one token per 4 characters, rounded up, and
+    every punctuation mark is a token of its own. That errs slightly high
+    on plain English, which keeps prompts inside their budget.
+
+    Args:
+        text (str): Text to count
+
+    Returns:
+        int: Estimated token count
+    """
+    return sum(-(-len(token) // CHARS_PER_TOKEN) for token in _TOKEN_PATTERN.findall(text))
+
+def format_activity(activity):
+    """
+    Format one routine activity as a prompt line.
+
+    Args:
+        activity (dict): Activity with a type, start time and optional actual time
+
+    Returns:
+        str: Prompt line
+    """
+    activity_type = activity.get('type', '')
+    start_time = activity.get('start_time', '')
+    actual_time = activity.get('actual_time', '')
+    if actual_time:
+        return f"- {activity_type} scheduled for {start_time}, actually happened at {actual_time}"
+    return f"- {activity_type} scheduled for {start_time}"
+
+def summarize_activities(activities):
+    """
+    Aggregate activities into one line of statistics per activity type.
+
+    Args:
+        activities (list): Activity dicts
+
+    Returns:
+        list: Lines with the count, time range and mean duration of each type
+    """
+    stats = {}
+    for activity in activities:
+        entry = stats.setdefault(activity.get('type') or 'other', {'count': 0, 'starts': [], 'durations': []})
+        entry['count'] += 1
+        start = time_to_minutes(activity.get('actual_time') or activity.get('start_time'))
+        if start is not None:
+            entry['starts'].append(start)
+        duration = duration_to_minutes(activity.get('duration'))
+        if duration:
+            entry['durations'].append(duration)
+
+    lines = []
+    for activity_type, entry in stats.items():
+        line = f"- {activity_type}: {entry['count']}x"
+        if entry['starts']:
+            line += f", {minutes_to_time(min(entry['starts']))}-{minutes_to_time(max(entry['starts']))}"
+        if entry['durations']:
+            line += f", avg {round(sum(entry['durations']) / len(entry['durations']))} min"
+        lines.append(line)
+    return lines
+
+class PromptBudget:
+    """
+    Fits the routine part of a prompt to a token budget.
+    Recent activities are listed one per line, newest kept first. When the
+    full history does not fit, older activities are replaced by per-type
+    statistics, so the prompt keeps their shape at a fraction of the tokens.
+    """
+
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, metrics=None):
+        """
+        Initialize the budget.
+
+        Args:
+            max_tokens (int, optional): Token budget of the routine context
+            metrics (MetricsRegistry, optional): Registry for token counters
+        """
+        self.max_tokens = max_tokens
+        self.metrics = metrics or default_metrics
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a budget configured by environment variables.
+
+        Returns:
+            PromptBudget: The budget
+        """
+        return cls(max_tokens=int(os.getenv('PROMPT_ROUTINE_TOKENS', str(DEFAULT_MAX_TOKENS))))
+
+    def routine_context(self, routine_data):
+        """
+        Build the routine context of a prompt within the token budget.
+
+        Args:
+            routine_data (dict): The baby's routine data
+
+        Returns:
+            tuple: (context text, report dict with original_tokens, tokens,
+                tokens_saved, activities and summarized activity counts)
+        """
+        baby_name = routine_data.get('baby_name', 'your baby')
+        header = f"The following is data about {baby_name}'s routine:"
+        activities = routine_data.get('routine') or []
+        lines = [format_activity(activity) for activity in activities]
+        line_tokens = [count_tokens(line) for line in lines]
+
+        original_tokens = count_tokens(header) + sum(line_tokens)
+        budget = self.max_tokens - count_tokens(header)
+
+        # Keep the newest activities verbatim, then fold the rest into statistics
+        kept = len(lines)
+        if original_tokens > self.max_tokens:
+            kept, used = 0, 0
+            while kept < len(lines) and used + line_tokens[-1 - kept] <= budget:
+                used += line_tokens[-1 - kept]
+                kept += 1
+
+            while True:
+                older = len(lines) - kept
+                summary = ["Earlier activities:"] + summarize_activities(activities[:older]) + ["Recent activities:"]
+                if kept == 0 or count_tokens('\n'.join(summary)) + sum(line_tokens[older:]) <= budget:
+                    break
+                kept -= 1
+            lines = summary + lines[older:]
+
+        context = '\n'.join([header] + lines) + '\n'
+        tokens = count_tokens(context)
+        report = {
+            'original_tokens': original_tokens,
+            'tokens': tokens,
+            'tokens_saved': max(original_tokens - tokens, 0),
+            'activities': len(activities),
+            'summarized': len(activities) - kept,
+        }
+
+        self.metrics.increment('prompt.routine_contexts')
+        if report['summarized']:
+            self.metrics.increment('prompt.compressed')
+            self.metrics.increment('prompt.tokens_saved', report['tokens_saved'])
+        return context, report
@@ -0,0 +1,368 @@
+import os
+import json
+import heapq
+import logging
+import datetime
+import itertools
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Rewrite the journal once it holds this many finished entries more than pending ones
+COMPACT_THRESHOLD = 1000
+
+class Reminder:
+    """A notification due at a point in time."""
+
+    __slots__ = ('id', 'user_id', 'message', 'due_at', 'key', 'data')
+
+    def __init__(self, id, user_id, message, due_at, key=None, data=None):
+        """
+        Initialize the reminder.
+
+        Args:
+            id (str): Reminder ID
+            user_id (str): User to notify
+            message (str): Notification text
+            due_at (float): Due time as a Unix timestamp
+            key (str, optional): Scheduling a reminder with the same key replaces this one
+            data (dict, optional): Extra payload for the dispatchers
+        """
+        self.id = id
+        self.user_id = user_id
+        self.message = message
+        self.due_at = due_at
+        self.key = key
+        self.data = data
+
+    def to_dict(self):
+        """Convert the reminder to a JSON-serializable dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class ReminderScheduler:
+    """
+    In-process scheduler for reminders across all users.
+    Pending reminders are kept in a min-heap ordered by due time, so scheduling
+    is O(log n) and the dispatch thread sleeps on a condition until the
+    earliest reminder is due, without polling. Every change is appended to a
+    JSON-lines journal that is replayed on start, so the queue survives restarts.
+    Only one process may use a journal; see file_lock.acquire_process_lock.
+    """
+
+    def __init__(self, journal_path, dispatchers=None, clock=time.time):
+        """
+        Initialize the scheduler and load the journal.
+
+        Args:
+            journal_path (str): Path of the journal file
+            dispatchers (list, optional): Callables taking a due Reminder
+            clock (callable, optional): Returns the current Unix time
+        """
+        self.journal_path = journal_path
+        self.dispatchers = list(dispatchers or [])
+        self.clock = clock
+        self._heap = []
+        self._pending = {}
+        self._by_key = {}
+        self._finished = 0
+        self._journal_file = None
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._load_journal()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _load_journal(self):
+        """Replay the journal into the heap."""
+        if not os.path.exists(self.journal_path):
+            return
+
+        pending = {}
+        last_id = 0
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A partially written last line
+                    continue
+                if entry['op'] == 'add':
+                    reminder = Reminder(**entry['reminder'])
+                    pending[reminder.id] = reminder
+                    last_id = max(last_id, int(reminder.id))
+                else:
+                    pending.pop(entry['id'], None)
+
+        for reminder in pending.values():
+            self._add(reminder)
+        self._ids = itertools.count(last_id + 1)
+        self._compact()
+
+    def _journal(self, entry):
+        """Append one entry to the journal."""
+        if self._journal_file is None:
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            self._journal_file = open(self.journal_path, 'a')
+        self._journal_file.write(json.dumps(entry) + '\n')
+        self._journal_file.flush()
+
+    def _compact(self):
+        """Rewrite the journal and the heap with only the pending reminders."""
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+        temp_path = self.journal_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            for reminder in self._pending.values():
+                f.write(json.dumps({'op': 'add', 'reminder': reminder.to_dict()}) + '\n')
+        os.replace(temp_path, self.journal_path)
+        self._finished = 0
+
+        # Drop the heap entries of finished reminders as well
+        self._heap = [(reminder.due_at, reminder.id) for reminder in self._pending.values()]
+        heapq.heapify(self._heap)
+
+    def _add(self, reminder):
+        """Add a reminder to the in-memory queue."""
+        self._pending[reminder.id] = reminder
+        if reminder.key:
+            self._by_key[reminder.key] = reminder.id
+        heapq.heappush(self._heap, (reminder.due_at, reminder.id))
+
+    def _finish(self, reminder_id, op):
+        """Remove a reminder from the queue; its heap entry is skipped when popped."""
+        reminder = self._pending.pop(reminder_id, None)
+        if reminder is None:
+            return None
+        if reminder.key and self._by_key.get(reminder.key) == reminder_id:
+            del self._by_key[reminder.key]
+        self._journal({'op': op, 'id': reminder_id})
+        self._finished += 1
+        if self._finished > len(self._pending) + COMPACT_THRESHOLD:
+            self._compact()
+        return reminder
+
+    def schedule(self, user_id, message, due_at, key=None, data=None):
+        """
+        Schedule a reminder.
+
+        Args:
+            user_id (str): User to notify
+            message (str): Notification text
+            due_at (float or datetime.datetime): When the reminder is due
+            key (str, optional): Replaces any pending reminder with the same key
+            data (dict, optional): Extra payload for the dispatchers
+
+        Returns:
+            Reminder: The scheduled reminder
+        """
+        if isinstance(due_at, datetime.datetime):
+            due_at = due_at.timestamp()
+
+        with self._condition:
+            if key and key in self._by_key:
+                self._finish(self._by_key[key], 'cancel')
+
+            reminder = Reminder(str(next(self._ids)), user_id, message, due_at, key, data)
+            self._journal({'op': 'add', 'reminder': reminder.to_dict()})
+            self._add(reminder)
+
+            # Let the dispatch thread recompute how long to sleep
+            self._condition.notify()
+            return reminder
+
+    def cancel(self, reminder_id):
+        """
+        Cancel a pending reminder.
+
+        Args:
+            reminder_id (str): Reminder ID
+
+        Returns:
+            bool: True if the reminder was pending
+        """
+        with self._condition:
+            return self._finish(reminder_id, 'cancel') is not None
+
+    def pop_due(self, now=None):
+        """
+        Remove and return all reminders that are due.
+
+        Args:
+            now (float, optional): Current Unix time; defaults to the clock
+
+        Returns:
+            list: Due reminders in due-time order
+        """
+        now = self.clock() if now is None else now
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                _, reminder_id = heapq.heappop(self._heap)
+                reminder = self._finish(reminder_id, 'done')
+                if reminder is not None:
+                    due.append(reminder)
+        return due
+
+    def dispatch_due(self, now=None):
+        """
+        Send all due reminders through the dispatchers.
+
+        Args:
+            now (float, optional): Current Unix time; defaults to the clock
+
+        Returns:
+            int: Number of reminders dispatched
+        """
+        due = self.pop_due(now)
+        for reminder in due:
+            for dispatcher in self.dispatchers:
+                try:
+                    dispatcher(reminder)
+                except Exception as e:
+                    logger.error(f"Error dispatching reminder {reminder.id}: {str(e)}")
+        return len(due)
+
+    def start(self):
+        """Start the dispatch thread."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the dispatch thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._condition:
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+
+    def _run(self):
+        """Dispatch reminders as they become due, sleeping until the earliest one."""
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                # Skip heap entries of cancelled reminders
+                while self._heap and self._heap[0][1] not in self._pending:
+                    heapq.heappop(self._heap)
+                timeout = self._heap[0][0] - self.clock() if self._heap else None
+                if timeout is None or timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+            self.dispatch_due()
+
+class RoutineReminders:
+    """
+    Schedules "nap due in 15 minutes" style reminders from routine predictions.
+    Runs next to the scheduler in a single process, but follows the stored
+    data rather than in-process writes, so updates handled by any gunicorn
+    worker reschedule the user's predicted next nap and feeding. Each poll
+    reads only the DataManager change log entries written since the last one,
+    so it costs nothing while there are no writes and only reschedules the
+    users listed.
+    """
+
+    def __init__(self, scheduler, predictor, data_manager, lead_minutes=15, activity_types=('nap', 'feeding'),
+                 poll_seconds=5):
+        """
+        Initialize the routine reminders, following writes logged from now on.
+
+        Args:
+            scheduler (ReminderScheduler): Scheduler to queue reminders in
+            predictor (RoutinePredictor): Predicts the next events
+            data_manager: DataManager instance
+            lead_minutes (int, optional): Minutes before the predicted time to remind
+            activity_types (tuple, optional): Activity types to remind about
+            poll_seconds (float, optional): Seconds between checks for new records
+        """
+        self.scheduler = scheduler
+        self.predictor = predictor
+        self.data_manager = data_manager
+        self.lead_minutes = lead_minutes
+        self.activity_types = activity_types
+        self.poll_seconds = poll_seconds
+        self._offset = data_manager.changes_offset()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        Reschedule the reminders of users with records stored since the last poll.
+
+        Returns:
+            list: IDs of the users whose reminders were rescheduled
+        """
+        changes, self._offset = self.data_manager.read_changes(self._offset)
+        changed = list(dict.fromkeys(user_id for user_id, kind in changes if kind in ('routine', 'caregiver_update')))
+
+        for user_id in changed:
+            try:
+                self.reschedule(user_id)
+            except Exception as e:
+                logger.error(f"Error rescheduling reminders for {user_id}: {str(e)}")
+        return changed
+
+    def reschedule(self, user_id):
+        """
+        Replace a user's reminders with ones for the predicted next events.
+
+        Args:
+            user_id (str): User ID
+        """
+        for activity_type in self.activity_types:
+            prediction = self.predictor.predict(user_id, activity_type)
+            if not prediction:
+                continue
+
+            predicted_at = datetime.datetime.fromisoformat(prediction['predicted_at'])
+            due_at = predicted_at - datetime.timedelta(minutes=self.lead_minutes)
+            if due_at.timestamp() <= self.scheduler.clock():
+                continue
+
+            name = 'Feeding' if activity_type == 'feeding' else activity_type.capitalize()
+            self.scheduler.schedule(
+                user_id,
+                f"{name} due in about {self.lead_minutes} minutes ({predicted_at.strftime('%I:%M %p').lstrip('0')}).",
+                due_at,
+                key=f"{user_id}:{activity_type}",
+                data={'type': activity_type, 'predicted_at': prediction['predicted_at']}
+            )
+
+    def start(self):
+        """Start polling for new records in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='routine-reminders', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        """Poll for new records until stopped."""
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error polling for routine reminders: {str(e)}")
@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from services.metrics import metrics as default_metrics
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Expired rows are purged from the disk tier once every this many writes
+DISK_PURGE_INTERVAL = 100
+
+def normalize_query(query):
+    """
+    Normalize a question so trivially different phrasings share a cache entry.
+
+    Args:
+        query (str): Question text
+
+    Returns:
+        str: Lowercased text with collapsed whitespace and no trailing punctuation
+    """
+    return _WHITESPACE.sub(' ', query.lower()).strip().rstrip('?!. ')
+
+def make_cache_key(query, system_message, model, temperature):
+    """
+    Build the cache key of a chat completion request.
+
+    Args:
+        query (str): User message
+        system_message (str): System message, including the routine context
+        model (str): Model name
+        temperature (float): Sampling temperature
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    context_hash = hashlib.sha256(system_message.encode('utf-8')).hexdigest()
+    payload = json.dumps([normalize_query(query), context_hash, model, temperature])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier cache of AI responses with a time-to-live.
+    The memory tier is a per-process LRU. The optional disk tier is a SQLite
+    file that every gunicorn worker on the host shares, so an answer fetched
+    by one worker is a hit in the others. Values must be JSON-serializable.
+    """
+
+    def __init__(self, max_entries=1000, ttl_seconds=3600, disk_path=None, metrics=None, clock=time.time):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int, optional): Entries kept in the memory tier
+            ttl_seconds (float, optional): Seconds an entry stays valid
+            disk_path (str, optional): SQLite file of the shared disk tier; memory only if None
+            metrics (MetricsRegistry, optional): Registry for hit and miss counters
+            clock (callable, optional): Returns the current Unix time
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.metrics = metrics or default_metrics
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or '.', exist_ok=True)
+            self._execute('PRAGMA journal_mode=WAL')
+            self._execute(
+                'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a cache configured by environment variables.
+
+        Returns:
+            ResponseCache: The cache, or None if RESPONSE_CACHE_ENABLED is false
+        """
+        if os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() != 'true':
+            return None
+        return cls(
+            max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '1000')),
+            ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', '3600')),
+            disk_path=os.getenv('RESPONSE_CACHE_FILE') or None,
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _execute(self, sql, params=()):
+        """
+        Run one statement against the disk tier in its own transaction.
+
+        Returns:
+            tuple: The first result row, or None
+        """
+        connection = sqlite3.connect(self.disk_path, timeout=5)
+        try:
+            with connection:
+                return connection.execute(sql, params).fetchone()
+        finally:
+            connection.close()
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.metrics.increment('response_cache.hits')
+                    return entry[0]
+                del self._entries[key]
+
+        if self.disk_path:
+            try:
+                row = self._execute(
+                    'SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?', (key, now)
+                )
+            except sqlite3.Error:
+                self.metrics.increment('response_cache.disk_errors')
+                row = None
+            if row is not None:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.metrics.increment('response_cache.hits')
+                self.metrics.increment('response_cache.disk_hits')
+                return value
+
+        self.metrics.increment('response_cache.misses')
+        return None
+
+    def set(self, key, value):
+        """
+        Store a value in both tiers.
+
+        Args:
+            key (str): Cache key
+            value: JSON-serializable value
+        """
+        now = self.clock()
+        expires_at = now + self.ttl_seconds
+        self._remember(key, value, expires_at)
+
+        if self.disk_path:
+            try:
+                self._execute(
+                    'INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(value), expires_at)
+                )
+                self._disk_writes += 1
+                if self._disk_writes % DISK_PURGE_INTERVAL == 0:
+                    self._execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+            except sqlite3.Error:
+                self.metrics.increment('response_cache.disk_errors')
+
+    def _remember(self, key, value, expires_at):
+        """Put an entry in the memory tier, evicting the least recently used ones."""
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics.increment('response_cache.evictions')
+
+    def clear(self):
+        """Remove all entries from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path:
+            self._execute('DELETE FROM responses')
@@ -0,0 +1,199 @@
+import re
+import datetime
+from services.event_model import time_to_minutes, minutes_to_time
+
+# Words in a question mapped to the activity type they ask about
+ACTIVITY_WORDS = {
+    'nap': 'nap', 'naps': 'nap', 'napped': 'nap', 'napping': 'nap',
+    'sleep': 'sleep', 'slept': 'sleep', 'asleep': 'sleep', 'bedtime': 'sleep',
+    'feed': 'feeding', 'feeds': 'feeding', 'fed': 'feeding', 'feeding': 'feeding', 'feedings': 'feeding',
+    'eat': 'feeding', 'ate': 'feeding', 'bottle': 'feeding', 'bottles': 'feeding', 'nursed': 'feeding',
+    'diaper': 'diaper', 'diapers': 'diaper', 'changed': 'diaper', 'change': 'diaper', 'changes': 'diaper',
+    'poop': 'diaper', 'poops': 'diaper', 'pee': 'diaper',
+    'bath': 'bath', 'baths': 'bath', 'bathed': 'bath',
+    'wake': 'wake', 'woke': 'wake', 'wake up': 'wake', 'woke up': 'wake',
+    'play': 'play', 'walk': 'walk', 'walks': 'walk',
+}
+
+# Readable names of activity types in answers
+ACTIVITY_NAMES = {
+    'nap': ('nap', 'naps'),
+    'sleep': ('sleep', 'sleeps'),
+    'feeding': ('feeding', 'feedings'),
+    'diaper': ('diaper change', 'diaper changes'),
+    'bath': ('bath', 'baths'),
+    'wake': ('wake-up', 'wake-ups'),
+    'play': ('play session', 'play sessions'),
+    'walk': ('walk', 'walks'),
+}
+
+# Activity types asked about mapped to the logged types that answer them; the
+# parser files daytime sleep ("went to sleep at 1pm") as a nap
+ACTIVITY_GROUPS = {
+    'sleep': ('nap', 'sleep'),
+}
+
+_ACTIVITY = r'(' + '|'.join(sorted(ACTIVITY_WORDS, key=len, reverse=True)) + r')\b'
+
+# Up to three words between the parts of a question, so a phrase and an
+# activity word far apart in a longer sentence are not read as one question
+_GAP = r'(?:\s+\S+){0,3}?\s+'
+
+# Fact questions, tried in order; each names the activity in its last group
+QUESTION_PATTERNS = [
+    ('next', re.compile(r'\bnext\s+(?:\S+\s+)?' + _ACTIVITY)),
+    ('time_since', re.compile(r'\b(?:how long (?:has it been )?since|time since)' + _GAP + _ACTIVITY)),
+    ('count', re.compile(r'\bhow many' + _GAP + _ACTIVITY)),
+    ('total_duration', re.compile(r'\bhow long' + _GAP + _ACTIVITY + _GAP + r'today\b')),
+    ('last', re.compile(r'\b(?:when|what time)' + _GAP + r'last' + _GAP + _ACTIVITY)),
+    ('last', re.compile(r'\b(?:when|what time)' + _GAP + _ACTIVITY + r'\s+last\b')),
+    ('last', re.compile(r'^\W*(?:(?:her|his|their|the)\s+)?last\s+' + _ACTIVITY + r'(?:\s+time)?\W*$')),
+    ('last', re.compile(r'\bwhen did' + _GAP + _ACTIVITY)),
+]
+
+# Words that make a question open-ended, e.g. "what's up with her last bottle? should I be worried?";
+# health questions and feeding amounts, which the daily summaries do not hold, also go to the AI
+OPEN_ENDED_PATTERN = re.compile(
+    r"\b(?:worr(?:y|ied|ying)|concern(?:ed|ing)?|normal|should|okay|ok|fine|advice|help|why|wrong|enough|too"
+    r"|what'?s up|vomit(?:s|ed|ing)?|(?:spit|spat|spitting)\s+up|thr(?:ow|ows|ew|own|owing)\s+up"
+    r"|ounces?|oz|ml|vaccin(?:e|es|ated|ation|ations))\b"
+)
+
+class RoutineQueryEngine:
+    """
+    Answers fact questions about a baby's day ("when did she last nap?",
+    "how many diapers today?") straight from the stored daily summaries,
+    so only open-ended questions need the AI assistant.
+    """
+
+    def __init__(self, data_manager, predictor=None):
+        """
+        Initialize the query engine.
+
+        Args:
+            data_manager: DataManager instance providing daily summaries
+            predictor (RoutinePredictor, optional): Answers "when is the next X" questions
+        """
+        self.data_manager = data_manager
+        self.predictor = predictor
+
+    def classify(self, message):
+        """
+        Recognize a fact question.
+
+        Args:
+            message (str): Question text
+
+        Returns:
+            tuple: (question kind, activity type), or None if it is not a fact question
+        """
+        message = message.lower()
+        if OPEN_ENDED_PATTERN.search(message):
+            return None
+        for kind, pattern in QUESTION_PATTERNS:
+            match = pattern.search(message)
+            if match:
+                return kind, ACTIVITY_WORDS[match.group(match.lastindex)]
+        return None
+
+    def answer(self, user_id, message, now=None):
+        """
+        Answer a fact question from the user's stored data.
+
+        Args:
+            user_id (str): User ID
+            message (str): Question text
+            now (datetime.datetime, optional): Current time; defaults to now
+
+        Returns:
+            str: The answer, or None if the question needs the AI assistant
+        """
+        question = self.classify(message)
+        if not question:
+            return None
+
+        kind, activity_type = question
+        now = now or datetime.datetime.now()
+
+        if kind == 'next':
+            return self._answer_next(user_id, activity_type)
+
+        summary = self.data_manager.get_daily_summary(user_id, now.date().isoformat())
+        singular, plural = ACTIVITY_NAMES.get(activity_type, (activity_type, activity_type + 's'))
+        types = ACTIVITY_GROUPS.get(activity_type, (activity_type,))
+
+        if kind == 'count':
+            count = sum(summary['counts'].get(logged_type, 0) for logged_type in types)
+            return f"{count} {singular if count == 1 else plural} so far today."
+
+        if kind == 'total_duration':
+            minutes = sum(summary['total_duration_minutes'].get(logged_type, 0) for logged_type in types)
+            count = sum(summary['counts'].get(logged_type, 0) for logged_type in types)
+            if not count:
+                return f"No {plural} logged today."
+            return f"{_format_minutes(minutes)} of {singular} across {count} {singular if count == 1 else plural} today."
+
+        # Last event questions fall back to yesterday's summary
+        day = 'today'
+        last_event = _latest_event(summary['last_event'], types)
+        if not last_event:
+            yesterday = (now.date() - datetime.timedelta(days=1)).isoformat()
+            last_event = _latest_event(self.data_manager.get_daily_summary(user_id, yesterday)['last_event'], types)
+            day = 'yesterday'
+        if not last_event:
+            return f"No {plural} logged today or yesterday."
+
+        start = time_to_minutes(last_event.get('start_time'))
+        if start is None:
+            return f"A {singular} was logged {day}, without a time."
+
+        if kind == 'time_since':
+            elapsed = now.hour * 60 + now.minute - start
+            if day == 'yesterday':
+                elapsed += 24 * 60
+            if elapsed < 0:
+                return f"The last {singular} is logged for {_format_time(start)} today, which is still ahead."
+            return f"{_format_minutes(elapsed)} since the last {singular} at {_format_time(start)}{'' if day == 'today' else ' yesterday'}."
+
+        answer = f"The last {singular} was at {_format_time(start)} {day}"
+        duration = last_event.get('duration')
+        if duration:
+            answer += f" ({duration})"
+        return answer + "."
+
+    def _answer_next(self, user_id, activity_type):
+        """Answer a "when is the next X" question from the predictor."""
+        prediction = self.predictor.predict(user_id, activity_type) if self.predictor else None
+        if not prediction:
+            return None
+
+        def clock(timestamp):
+            moment = datetime.datetime.fromisoformat(timestamp)
+            return _format_time(moment.hour * 60 + moment.minute)
+
+        singular = ACTIVITY_NAMES.get(activity_type, (activity_type,))[0]
+        basis = 'wake windows' if prediction['basis'] == 'wake_windows' else 'feeding intervals'
+        answer = f"The next {singular} is likely around {clock(prediction['predicted_at'])}"
+        if prediction['earliest'] != prediction['latest']:
+            answer += f" (between {clock(prediction['earliest'])} and {clock(prediction['latest'])})"
+        return answer + f", based on the last {prediction['samples']} {basis}."
+
+def _latest_event(last_events, types):
+    """Pick the latest of the last events of several types, preferring timed events."""
+    events = [last_events[logged_type] for logged_type in types if last_events.get(logged_type)]
+    if not events:
+        return None
+    return max(events, key=lambda event: (time_to_minutes(event.get('start_time')) is not None,
+                                          time_to_minutes(event.get('start_time')) or 0))
+
+def _format_time(minutes):
+    """Format minutes since midnight as a 12-hour clock time, e.g. "1:30pm"."""
+    hours, minutes = map(int, minutes_to_time(minutes).split(':'))
+    return f"{hours % 12 or 12}:{minutes:02d}{'am' if hours < 12 else 'pm'}"
+
+def _format_minutes(minutes):
+    """Format a number of minutes, e.g. "1 hr 30 min"."""
+    hours, minutes = divmod(int(minutes), 60)
+    if not hours:
+        return f"{minutes} min"
+    return f"{hours} hr {minutes} min" if minutes else f"{hours} hr"
@@ -0,0 +1,243 @@
+import os
+import re
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from services.metrics import metrics as default_metrics
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?|\d+")
+
+# Words that flip the meaning of a question; paraphrases must agree on them
+NEGATIONS = frozenset(["no", "not", "never", "don't", "doesn't", "didn't", "isn't", "won't", "can't", "shouldn't"])
+
+DEFAULT_DIM = 256
+
+# Rows allocated for a new context; blocks double as they fill
+INITIAL_CAPACITY = 64
+
+# Function words left out of the vectors, so the content words decide similarity
+STOP_WORDS = frozenset(
+    "a an the is it that this to of for in on at my her his she he we i our be do does did "
+    "should can could would how what when much many get you your".split()
+)
+
+# Abbreviations common in texted questions
+ABBREVIATIONS = {
+    'mo': 'month', 'mos': 'month', 'wk': 'week', 'wks': 'week', 'hr': 'hour', 'hrs': 'hour',
+    'min': 'minute', 'mins': 'minute', 'yr': 'year', 'yrs': 'year',
+}
+
+# Weight of a whole word relative to one of its character n-grams
+WORD_WEIGHT = 2.0
+
+def _hash(feature):
+    return zlib.crc32(feature.encode('utf-8'))
+
+def _content_words(text):
+    """Lowercased words of a text without function words, with abbreviations expanded and plurals trimmed."""
+    words = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        token = ABBREVIATIONS.get(token, token)
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        words.append(token)
+    return words
+
+class HashedVectorizer:
+    """
+    Embeds text locally as L2-normalized hashed counts of content words and
+    their character n-grams. Each feature is hashed into one of `dim` buckets
+    with a hash-derived sign, so no vocabulary has to be fitted or stored.
+    """
+
+    def __init__(self, dim=DEFAULT_DIM, ngram=3):
+        """
+        Initialize the vectorizer.
+
+        Args:
+            dim (int, optional): Vector dimension
+            ngram (int, optional): Character n-gram length
+        """
+        self.dim = dim
+        self.ngram = ngram
+
+    def embed(self, text):
+        """
+        Embed a text.
+
+        Args:
+            text (str): Text to embed
+
+        Returns:
+            numpy.ndarray: Unit-length float32 vector, or all zeros for text without content words
+        """
+        hashes, weights = [], []
+        for word in _content_words(text):
+            hashes.append(_hash(word))
+            weights.append(WORD_WEIGHT)
+            padded = f" {word} "
+            for i in range(len(padded) - self.ngram + 1):
+                hashes.append(_hash(padded[i:i + self.ngram]))
+                weights.append(1.0)
+
+        hashes = np.array(hashes, dtype=np.int64)
+        signed = np.where(hashes & (1 << 31), -1.0, 1.0) * np.array(weights)
+        vector = np.bincount(hashes % self.dim, weights=signed, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+def question_signature(text):
+    """
+    Hash the numbers and negations of a question.
+
+    "Naps 1 hour" and "naps 3 hours" embed almost identically, so answers are
+    only shared between questions with the same signature.
+
+    Args:
+        text (str): Question text
+
+    Returns:
+        int: Signature hash
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    return _hash(' '.join(sorted(token for token in tokens if token.isdigit() or token in NEGATIONS)))
+
+class _ContextBlock:
+    """Cached question vectors and answers that share one system message."""
+
+    __slots__ = ('vectors', 'signatures', 'answers', 'size', 'position')
+
+    def __init__(self, dim):
+        self.vectors = np.zeros((INITIAL_CAPACITY, dim), dtype=np.float32)
+        self.signatures = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.answers = [None] * INITIAL_CAPACITY
+        self.size = 0
+        self.position = 0
+
+    def add(self, vector, signature, answer, max_entries):
+        """Append an entry, growing the arrays or overwriting the oldest entry when full."""
+        if self.position == len(self.answers) and len(self.answers) < max_entries:
+            capacity = min(len(self.answers) * 2, max_entries)
+            self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+            self.signatures = np.resize(self.signatures, capacity)
+            self.answers.extend([None] * (capacity - len(self.answers)))
+        if self.position == len(self.answers):
+            self.position = 0
+
+        self.vectors[self.position] = vector
+        self.signatures[self.position] = signature
+        self.answers[self.position] = answer
+        self.position += 1
+        self.size = max(self.size, self.position)
+
+class SemanticCache:
+    """
+    Serves stored AI answers for paraphrased questions.
+    Questions are embedded with a HashedVectorizer and kept per routine
+    context, as rows of a NumPy matrix. A lookup scores every cached question
+    of the same context with one matrix-vector product and returns the best
+    answer if its cosine similarity reaches the threshold.
+    """
+
+    def __init__(self, threshold=0.85, max_entries=100000, dim=DEFAULT_DIM, metrics=None):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold (float, optional): Minimum cosine similarity of a hit
+            max_entries (int, optional): Entries kept across all contexts
+            dim (int, optional): Vector dimension
+            metrics (MetricsRegistry, optional): Registry for hit and miss counters
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.vectorizer = HashedVectorizer(dim)
+        self.metrics = metrics or default_metrics
+        self._blocks = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a cache configured by environment variables.
+
+        Returns:
+            SemanticCache: The cache, or None if SEMANTIC_CACHE_ENABLED is false
+        """
+        if os.getenv('SEMANTIC_CACHE_ENABLED', 'True').lower() != 'true':
+            return None
+        return cls(
+            threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.85')),
+            max_entries=int(os.getenv('SEMANTIC_CACHE_SIZE', '100000')),
+        )
+
+    def __len__(self):
+        return self._size
+
+    def _context_key(self, context):
+        return hashlib.sha256(context.encode('utf-8')).digest()
+
+    def lookup(self, query, context):
+        """
+        Find the stored answer of a similar question asked in the same context.
+
+        Args:
+            query (str): Question text
+            context (str): System message the answer was generated with
+
+        Returns:
+            The stored answer, or None on a miss
+        """
+        vector = self.vectorizer.embed(query)
+        signature = question_signature(query)
+        key = self._context_key(context)
+
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None and vector.any():
+                self._blocks.move_to_end(key)
+                scores = block.vectors[:block.size] @ vector
+                scores[block.signatures[:block.size] != signature] = -1.0
+                best = int(scores.argmax())
+                if scores[best] >= self.threshold:
+                    self.metrics.increment('semantic_cache.hits')
+                    return block.answers[best]
+
+        self.metrics.increment('semantic_cache.misses')
+        return None
+
+    def add(self, query, context, answer):
+        """
+        Store the answer to a question.
+
+        Args:
+            query (str): Question text
+            context (str): System message the answer was generated with
+            answer: Answer to store
+        """
+        vector = self.vectorizer.embed(query)
+        if not vector.any():
+            return
+        signature = question_signature(query)
+        key = self._context_key(context)
+
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                block = self._blocks[key] = _ContextBlock(self.vectorizer.dim)
+            self._blocks.move_to_end(key)
+
+            self._size -= block.size
+            block.add(vector, signature, answer, self.max_entries)
+            self._size += block.size
+
+            # Drop the least recently used contexts once the cache is full
+            while self._size > self.max_entries and len(self._blocks) > 1:
+                _, evicted = self._blocks.popitem(last=False)
+                self._size -= evicted.size
+                self.metrics.increment('semantic_cache.evictions', evicted.size)
@@ -0,0 +1,76 @@
+import threading
+from services.metrics import metrics as default_metrics
+
+class _Call:
+    """An in-flight call and, once it finishes, its outcome."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+    The first caller of a key runs the function; callers arriving while it
+    runs wait for it and receive the same result or exception.
+    """
+
+    def __init__(self, name='singleflight', metrics=None):
+        """
+        Initialize the group.
+
+        Args:
+            name (str, optional): Prefix of the recorded metrics
+            metrics (MetricsRegistry, optional): Registry for call counters
+        """
+        self.name = name
+        self.metrics = metrics or default_metrics
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        """
+        Run a function once for all concurrent callers with the same key.
+
+        Args:
+            key (str): Identifies calls that can share a result
+            function (callable): Called without arguments by the first caller
+
+        Returns:
+            The function's result
+
+        Raises:
+            Exception: Whatever the function raised, in every waiting caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self.metrics.increment(f"{self.name}.shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self.metrics.increment(f"{self.name}.executed")
+        try:
+            call.result = function()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """Get the number of keys currently executing."""
+        with self._lock:
+            return len(self._calls)
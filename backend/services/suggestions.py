@@ -0,0 +1,285 @@
+import os
+import json
+import hashlib
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.file_lock import file_lock
+from services.llm_dispatcher import BATCH
+from services.metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+def routine_version(routines):
+    """
+    Get a version stamp of a user's routines.
+
+    Routines are only ever appended, so the count and a hash of the latest
+    routine change whenever a routine is added.
+
+    Args:
+        routines (list): The user's routines
+
+    Returns:
+        str: Version stamp, or None if there are no routines
+    """
+    if not routines:
+        return None
+    latest = json.dumps(routines[-1], sort_keys=True, default=str)
+    return f"{len(routines)}-{hashlib.sha1(latest.encode('utf-8')).hexdigest()[:12]}"
+
+class SuggestionStore:
+    """
+    Precomputed routine suggestions per user, stamped with the routine
+    version they were generated from. The entries and each user's current
+    routine version are held in memory, so serving a fresh entry is a dict
+    lookup. Both are checked against the files, which every gunicorn worker
+    and the precompute job write: cached versions are only used while the
+    routines file is unchanged, and the entries are reloaded when the
+    suggestions file changes.
+    """
+
+    def __init__(self, data_manager, path):
+        """
+        Initialize the store and load the stored suggestions.
+
+        Args:
+            data_manager: DataManager instance
+            path (str): JSON file the suggestions are kept in
+        """
+        self.data_manager = data_manager
+        self.path = path
+        self._entries = {}
+        self._file_version = None
+        # User ID to (routines data version, routine version)
+        self._versions = {}
+        self._lock = threading.Lock()
+        with self._lock:
+            self._refresh()
+
+    def _stat(self):
+        """Get the (modification time, size) of the suggestions file, or None if missing."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self):
+        """Reload the suggestions if another process wrote them; call with the lock held."""
+        version = self._stat()
+        if version == self._file_version:
+            return
+        self._file_version = version
+        if version is None:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self._entries = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading suggestions: {str(e)}")
+
+    def _save(self):
+        """Write the suggestions; call with the lock and the file lock held."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a partial file
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(temp_path, self.path)
+        self._file_version = self._stat()
+
+    def current_version(self, user_id):
+        """
+        Get the version stamp of a user's routines, computed once per change.
+
+        Args:
+            user_id (str): User ID
+
+        Returns:
+            str: Version stamp, or None if the user has no routines
+        """
+        # Read before the routines, so a routine stored meanwhile makes the cached value stale
+        data_version = self.data_manager.data_version(('routine',))
+        with self._lock:
+            cached = self._versions.get(user_id)
+        if cached is not None and cached[0] == data_version:
+            return cached[1]
+        version = routine_version(self.data_manager.get_routines(user_id))
+        with self._lock:
+            self._versions[user_id] = (data_version, version)
+        return version
+
+    def get(self, user_id):
+        """
+        Get a user's precomputed suggestions if they match the current routines.
+
+        Args:
+            user_id (str): User ID
+
+        Returns:
+            dict: Entry with 'suggestions', 'version' and 'generated_at', or None if missing or stale
+        """
+        version = self.current_version(user_id)
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(user_id)
+        if entry is None or version is None or entry['version'] != version:
+            return None
+        return entry
+
+    def put(self, user_id, version, suggestions):
+        """
+        Store a user's suggestions.
+
+        The file is reloaded under a lock shared with other processes first,
+        so entries they stored are kept.
+
+        Args:
+            user_id (str): User ID
+            version (str): Routine version the suggestions were generated from
+            suggestions (list): Suggestions
+
+        Returns:
+            dict: The stored entry
+        """
+        entry = {
+            'version': version,
+            'suggestions': suggestions,
+            'generated_at': datetime.datetime.now().isoformat(),
+        }
+        with self._lock, file_lock(self.path + '.lock'):
+            self._refresh()
+            self._entries[user_id] = entry
+            self._save()
+        return entry
+
+    def stale_users(self):
+        """
+        Find the users whose suggestions are missing or older than their routines.
+
+        Returns:
+            dict: User ID to (current version, latest routine) for each stale user
+        """
+        stale = {}
+        data_version = self.data_manager.data_version(('routine',))
+        all_routines = self.data_manager.get_all_routines()
+        with self._lock:
+            self._refresh()
+        for user_id, routines in all_routines.items():
+            version = routine_version(routines)
+            with self._lock:
+                self._versions[user_id] = (data_version, version)
+                entry = self._entries.get(user_id)
+            if version is not None and (entry is None or entry['version'] != version):
+                stale[user_id] = (version, routines[-1])
+        return stale
+
+class SuggestionPrecomputer:
+    """
+    Batch job that regenerates suggestions for users whose routines changed.
+    Users are processed by a small thread pool. Each call goes through the
+    LLM dispatcher in the batch class, so the job stays within the rate
+    limit and yields to interactive and SMS requests. The job stops early
+    while the OpenAI circuit breaker is open, leaving the rest for the next
+    run. By default it runs nightly in a background thread.
+    """
+
+    def __init__(self, store, openai_service, max_workers=4, run_hour=3, metrics=None):
+        """
+        Initialize the job.
+
+        Args:
+            store (SuggestionStore): Where suggestions are kept
+            openai_service (OpenAIService): Generates the suggestions
+            max_workers (int, optional): Users processed at once
+            run_hour (int, optional): Local hour of the nightly run
+            metrics (MetricsRegistry, optional): Registry for job counters
+        """
+        self.store = store
+        self.openai_service = openai_service
+        self.max_workers = max_workers
+        self.run_hour = run_hour
+        self.metrics = metrics or default_metrics
+        self._stop = threading.Event()
+        self._thread = None
+
+    def generate(self, user_id, version, routine):
+        """
+        Generate and store one user's suggestions.
+
+        Args:
+            user_id (str): User ID
+            version (str): Routine version of the user
+            routine (dict): The user's latest routine
+
+        Returns:
+            dict: The stored entry, or None if generation failed
+        """
+        if not self.openai_service.available():
+            self.metrics.increment('suggestions.precompute.skipped')
+            return None
+        try:
+            suggestions = self.openai_service.compute_suggestions(routine, priority=BATCH)
+        except Exception as e:
+            logger.error(f"Error precomputing suggestions for {user_id}: {str(e)}")
+            self.metrics.increment('suggestions.precompute.failed')
+            return None
+        self.metrics.increment('suggestions.precompute.generated')
+        return self.store.put(user_id, version, suggestions)
+
+    def run_once(self):
+        """
+        Regenerate the suggestions of every stale user.
+
+        Returns:
+            int: Number of users whose suggestions were stored
+        """
+        stale = self.store.stale_users()
+        if not stale:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='suggestions') as executor:
+            results = list(executor.map(lambda item: self.generate(item[0], *item[1]), stale.items()))
+        generated = sum(1 for entry in results if entry is not None)
+        logger.info(f"Precomputed suggestions for {generated} of {len(stale)} users")
+        return generated
+
+    def seconds_until_next_run(self, now=None):
+        """
+        Get the time until the next nightly run.
+
+        Args:
+            now (datetime.datetime, optional): Current local time
+
+        Returns:
+            float: Seconds to wait
+        """
+        now = now or datetime.datetime.now()
+        next_run = now.replace(hour=self.run_hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += datetime.timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def start(self):
+        """Start the nightly job thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='suggestion-precomputer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the nightly job thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        """Run the job every night until stopped."""
+        while not self._stop.wait(self.seconds_until_next_run()):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error in suggestion precompute job: {str(e)}")
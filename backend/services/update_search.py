@@ -0,0 +1,165 @@
+import re
+import datetime
+import threading
+from array import array
+from bisect import bisect_left
+from services.event_model import record_date
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Update fields whose text is indexed
+TEXT_FIELDS = ('message', 'text', 'notes')
+
+def tokenize(text):
+    """
+    Split text into lowercase search terms.
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        list: Terms in order of appearance
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+class _UserIndex:
+    """Postings and documents of one user's caregiver updates."""
+
+    __slots__ = ('postings', 'updates', 'days', 'version')
+
+    def __init__(self):
+        self.postings = {}
+        self.updates = []
+        self.days = array('i')
+        # User version of the caregiver updates the index holds, or None if behind
+        self.version = None
+
+    def add(self, update):
+        """Index an update; document IDs increase, so every posting list stays sorted."""
+        doc_id = len(self.updates)
+        self.updates.append(update)
+        date = record_date(update)
+        try:
+            self.days.append(datetime.date.fromisoformat(date).toordinal() if date else 0)
+        except ValueError:
+            self.days.append(0)
+
+        text = ' '.join(update[field] for field in TEXT_FIELDS if isinstance(update.get(field), str))
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = array('I')
+            postings.append(doc_id)
+
+class UpdateSearchIndex:
+    """
+    Inverted index over the text of caregiver updates, with per-user postings.
+    A user's index is built from the stored updates on first search and kept
+    current by a DataManager write listener. Each index records the user's
+    version from the DataManager change log; when another gunicorn worker
+    stored updates for the user, the next search indexes just the updates
+    beyond those already indexed. Writes for other users never touch it, and
+    a search only touches the posting lists of its terms.
+    """
+
+    def __init__(self, data_manager):
+        """
+        Initialize the index and register it for new caregiver updates.
+
+        Args:
+            data_manager: DataManager instance
+        """
+        self.data_manager = data_manager
+        self._users = {}
+        self._lock = threading.Lock()
+        data_manager.add_write_listener(self.on_write, kinds=('caregiver_update',))
+
+    def _get_user_index(self, user_id):
+        """Get a user's index, building it on first use and catching up with missed updates."""
+        # Read before the updates, so a write made meanwhile is caught up next time
+        version = self.data_manager.user_version(user_id, ('caregiver_update',))
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None and index.version == version:
+                return index
+
+        # Read outside the lock, so searches of other users do not wait for it
+        updates = self.data_manager.get_caregiver_updates(user_id)
+        with self._lock:
+            index = self._users.get(user_id)
+            # Updates are only ever appended, so the stored list extends the indexed one
+            if index is None or len(updates) < len(index.updates):
+                index = self._users[user_id] = _UserIndex()
+            for update in updates[len(index.updates):]:
+                index.add(update)
+            index.version = version
+            return index
+
+    def on_write(self, update, user_id):
+        """
+        Add a newly stored caregiver update to a built user index.
+
+        If the index missed other updates for the user, it is left to catch
+        up from the stored updates on the next search instead.
+
+        Args:
+            update (dict): The stored update
+            user_id (str): User ID
+        """
+        version = self.data_manager.user_version(user_id, ('caregiver_update',))
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                return
+            if index.version is not None and (index.version[0] + 1,) == version:
+                index.add(update)
+                index.version = version
+            else:
+                index.version = None
+
+    def search(self, user_id, query, start_date=None, end_date=None, limit=50):
+        """
+        Find a user's updates containing all terms of a query.
+
+        Args:
+            user_id (str): User ID
+            query (str): Search terms
+            start_date (datetime.date, optional): Earliest update date to include
+            end_date (datetime.date, optional): Latest update date to include
+            limit (int, optional): Maximum number of updates returned
+
+        Returns:
+            dict: Total match count and the most recent matching updates
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return {'count': 0, 'results': []}
+
+        index = self._get_user_index(user_id)
+        with self._lock:
+            posting_lists = [index.postings.get(term) for term in terms]
+            if not all(posting_lists):
+                return {'count': 0, 'results': []}
+
+            # Look up each document of the shortest posting list in the others
+            posting_lists.sort(key=len)
+            matches = [
+                doc_id for doc_id in posting_lists[0]
+                if all(_contains(postings, doc_id) for postings in posting_lists[1:])
+            ]
+
+            if start_date or end_date:
+                first = start_date.toordinal() if start_date else 1
+                last = end_date.toordinal() if end_date else datetime.date.max.toordinal()
+                matches = [doc_id for doc_id in matches if first <= index.days[doc_id] <= last]
+
+            doc_ids = matches[::-1]
+            return {
+                'count': len(doc_ids),
+                'results': [index.updates[doc_id] for doc_id in doc_ids[:limit]],
+            }
+
+def _contains(postings, doc_id):
+    """Binary search for a document ID in a sorted posting list."""
+    position = bisect_left(postings, doc_id)
+    return position < len(postings) and postings[position] == doc_id
@@ -1,8 +1,11 @@
 import os
 import json
+import datetime
 from twilio.rest import Client
 from dotenv import load_dotenv
 from services.openai_service import OpenAIService
+from services.llm_dispatcher import SMS
+from services.routine_query import RoutineQueryEngine
 
 # Load environment variables
 load_dotenv()
@@ -13,12 +16,14 @@ class SMSService:
     Manages sending and receiving SMS messages via Twilio.
     """
     
-    def __init__(self, data_manager):
+    def __init__(self, data_manager, parser_sessions=None, predictor=None):
         """
         Initialize the SMS service with Twilio credentials and data manager.
         
         Args:
             data_manager: DataManager instance for data storage and retrieval
+            parser_sessions (ParserSessionManager, optional): Incremental parser for routine updates
+            predictor (RoutinePredictor, optional): Answers "when is the next nap" questions
         """
         self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
@@ -27,6 +32,8 @@ class SMSService:
         self.client = Client(self.account_sid, self.auth_token) if self.account_sid and self.auth_token else None
         self.data_manager = data_manager
         self.openai_service = OpenAIService()
+        self.parser_sessions = parser_sessions
+        self.query_engine = RoutineQueryEngine(data_manager, predictor)
     
     def process_sms(self, message, from_number, user_id):
         """
@@ -44,56 +51,68 @@ class SMSService:
         user = self.data_manager.get_user(user_id)
         if not user:
             # Create a new user with trial subscription if not exists
-            user = self.data_manager.save_user({
+            user = {
                 'id': user_id,
                 'phone_number': from_number,
                 'subscription_status': 'trial'
-            })
+            }
+            self.data_manager.update_user(user_id, user)
         
         # Create update object
         update = {
             'user_id': user_id,
             'from_number': from_number,
-            'message': message
+            'message': message,
+            'timestamp': datetime.datetime.now().isoformat()
         }
         
-        # Save the update
-        saved_update = self.data_manager.save_caregiver_update(update)
+        # Updates such as "nap at 1" contain the same words as parenting questions, so
+        # anything not phrased as a question is parsed first and only goes to the AI
+        # assistant if it holds no routine events
+        parsed_events = None
+        if self.parser_sessions and not self._is_explicit_question(message):
+            parsed_events = self.parser_sessions.ingest(user_id, message)
         
         # Check if this is a question for the AI assistant
-        if self._is_ai_question(message):
+        if not parsed_events and self._is_ai_question(message):
             # Process as AI question if subscription is active or trial
             if user.get('subscription_status') in ['active', 'trial']:
-                # Get user's routines for context
-                routines = self.data_manager.get_user_routines(user_id)
-                latest_routine = routines[-1] if routines else None
+                # Answer fact questions ("when did she last nap?") from stored data
+                response = None
+                if self._is_routine_question(message) and self.query_engine:
+                    response = self.query_engine.answer(user_id, message)
                 
-                # Check if it's a routine-specific question
-                if self._is_routine_question(message) and latest_routine:
-                    response = self.openai_service.get_routine_specific_response(message, latest_routine)
+                if response:
+                    update['answered_locally'] = True
                 else:
-                    response = self.openai_service.get_response(message, user, latest_routine)
+                    # Get user's routines for context
+                    routines = self.data_manager.get_routines(user_id)
+                    latest_routine = routines[-1] if routines else None
+                    
+                    # Check if it's a routine-specific question
+                    if self._is_routine_question(message) and latest_routine:
+                        response = self.openai_service.get_routine_specific_response(message, latest_routine, priority=SMS)
+                    else:
+                        response = self.openai_service.get_response(message, user, latest_routine, priority=SMS, semantic=True)
                 
                 # Send the response back via SMS
                 self._send_sms(response, from_number)
                 
-                # Add AI response to the saved update
-                saved_update['ai_response'] = response
-                self.data_manager.save_caregiver_update(saved_update)
+                # Add AI response to the update
+                update['ai_response'] = response
             else:
                 # Send subscription required message
                 subscription_message = "This feature requires an active Hatchling subscription. Please contact the account owner to upgrade."
                 self._send_sms(subscription_message, from_number)
                 
-                # Add subscription message to the saved update
-                saved_update['ai_response'] = subscription_message
-                self.data_manager.save_caregiver_update(saved_update)
-        else:
-            # Process as routine update
-            # This will be handled by the parser service in the main app.py
-            pass
-        
-        return saved_update
+                # Add subscription message to the update
+                update['ai_response'] = subscription_message
+        elif parsed_events is not None:
+            # Routine update: only this message was parsed into today's timeline
+            update['parsed_events'] = parsed_events
+        
+        # Save the update once it is complete
+        return self.data_manager.add_caregiver_update(update, user_id)
     
     def get_user_messages(self, user_id):
         """
@@ -105,7 +124,7 @@ class SMSService:
         Returns:
             list: List of messages for the user
         """
-        return self.data_manager.get_user_updates(user_id)
+        return self.data_manager.get_caregiver_updates(user_id)
     
     def _send_sms(self, message, to_number):
         """
@@ -142,6 +161,27 @@ class SMSService:
             print(f"Error sending SMS: {str(e)}")
             return False
     
+    def _is_explicit_question(self, message):
+        """
+        Determine if a message is phrased as a question.
+        
+        Args:
+            message (str): The message content
+            
+        Returns:
+            bool: True if it ends with a question mark or opens with a question word
+        """
+        interrogatives = [
+            'what', 'when', 'why', 'how', 'where', 'who', 'which',
+            'is', 'are', 'can', 'should', 'could', 'would', 'does', 'will'
+        ]
+        
+        message_lower = message.strip().lower()
+        if message_lower.endswith('?'):
+            return True
+        words = message_lower.split()
+        return bool(words) and words[0].strip(",.!'") in interrogatives
+    
     def _is_ai_question(self, message):
         """
         Determine if a message is a question for the AI assistant.
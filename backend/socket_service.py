@@ -207,6 +207,50 @@ class SocketService:
             except Exception as e:
                 logger.error(f"Error in send_message handler: {str(e)}")
     
+    def emit_to_user(self, user_id, event, data):
+        """Send an event to all of a user's connected clients.
+        
+        Args:
+            user_id: User ID whose room receives the event
+            event: Event name
+            data: Event payload
+        """
+        try:
+            self.socketio.emit(event, data, room=f"user_{user_id}")
+        except Exception as e:
+            logger.error(f"Error emitting {event} to user {user_id}: {str(e)}")
+    
+    def stream_to_user(self, user_id, request_id, chunks):
+        """Forward a streamed assistant response to a user's connected clients.
+        
+        Each chunk is sent as an assistant_chunk event as soon as it is
+        produced; an assistant_done event with the full message follows.
+        
+        Args:
+            user_id: User ID whose room receives the events
+            request_id: ID the client uses to match the events to its question
+            chunks: Iterable of response text chunks
+            
+        Returns:
+            The full response text
+        """
+        room = f"user_{user_id}"
+        parts = []
+        try:
+            for index, chunk in enumerate(chunks):
+                parts.append(chunk)
+                self.socketio.emit('assistant_chunk', {'request_id': request_id, 'index': index, 'content': chunk}, room=room)
+            self.socketio.emit('assistant_done', {'request_id': request_id, 'message': ''.join(parts), 'status': 'success'}, room=room)
+        except Exception as e:
+            logger.error(f"Error streaming assistant response to user {user_id}: {str(e)}")
+            self.socketio.emit('assistant_done', {
+                'request_id': request_id,
+                'message': ''.join(parts),
+                'error': str(e),
+                'status': 'error'
+            }, room=room)
+        return ''.join(parts)
+    
     def run(self, host='0.0.0.0', port=8000, debug=False):
         """Run the Socket.IO server.
         
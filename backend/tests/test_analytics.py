@@ -0,0 +1,120 @@
+import unittest
+import sys
+import os
+import time
+import datetime
+import tempfile
+import shutil
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from services.analytics import RoutineAnalytics
+
+class TestRoutineAnalytics(unittest.TestCase):
+    """Test cases for the vectorized routine analytics."""
+
+    def setUp(self):
+        """Set up a data manager in a temporary directory."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.analytics = RoutineAnalytics(self.data_manager)
+        self.user_id = "test_user_123"
+        self.end_date = datetime.date(2025, 1, 15)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_window_statistics(self):
+        """Test nap totals, wake windows, feeding intervals and diaper counts."""
+        self.data_manager.add_routine({
+            'parsed_at': '2025-01-15T20:00:00',
+            'routine': [
+                {'type': 'nap', 'start_time': '09:00', 'duration': '60 minutes'},
+                {'type': 'nap', 'start_time': '13:00', 'end_time': '14:30', 'duration': '90 minutes'},
+                {'type': 'sleep', 'start_time': '19:00'},
+                {'type': 'feeding', 'start_time': '07:00'},
+                {'type': 'feeding', 'start_time': '10:00'},
+                {'type': 'feeding', 'start_time': '14:00'},
+                {'type': 'diaper'},
+            ],
+        }, self.user_id)
+        self.data_manager.add_caregiver_update({
+            'timestamp': '2025-01-05T12:00:00',
+            'parsed_events': [{'type': 'nap', 'start_time': '12:00', 'duration': '30 minutes'}, {'type': 'diaper'}],
+        }, self.user_id)
+        self.data_manager.add_caregiver_update({'timestamp': '2024-12-01T08:00:00', 'type': 'diaper'}, self.user_id)
+        self.data_manager.add_caregiver_update({'message': 'undated', 'type': 'diaper'}, self.user_id)
+
+        result = self.analytics.summarize(self.user_id, end_date=self.end_date)
+        week = result['windows']['7d']
+
+        self.assertEqual(result['event_count'], 10)
+        self.assertEqual(week['days_with_data'], 1)
+        self.assertEqual(week['nap_minutes_per_day'], 150.0)
+        # 10:00 -> 13:00 and 14:30 -> 19:00
+        self.assertEqual(week['mean_wake_window_minutes'], 225.0)
+        self.assertEqual(week['mean_feeding_interval_minutes'], 210.0)
+        self.assertEqual(week['diaper_count'], 1)
+
+        month = result['windows']['30d']
+        self.assertEqual(month['nap_minutes_by_day'], [
+            {'date': '2025-01-05', 'minutes': 30},
+            {'date': '2025-01-15', 'minutes': 150},
+        ])
+        self.assertEqual(month['nap_minutes_per_day'], 90.0)
+        self.assertEqual(month['diaper_count'], 2)
+        self.assertEqual(result['windows']['90d']['diaper_count'], 3)
+
+    def test_empty_history(self):
+        """Test that a user without data gets empty statistics."""
+        week = self.analytics.summarize(self.user_id, end_date=self.end_date)['windows']['7d']
+
+        self.assertEqual(week['event_count'], 0)
+        self.assertIsNone(week['nap_minutes_per_day'])
+        self.assertIsNone(week['diapers_per_day'])
+
+    def test_malformed_events_are_skipped(self):
+        """Test that events stored as something other than objects do not break the statistics."""
+        self.data_manager.add_routine({
+            'date': '2025-01-15',
+            'routine': ['nap at 9', None, {'type': 'diaper', 'start_time': '10:00'}]
+        }, self.user_id)
+
+        week = self.analytics.summarize(self.user_id, end_date=self.end_date)['windows']['7d']
+        self.assertEqual(week['event_count'], 1)
+
+    def test_multi_year_history_is_fast(self):
+        """Test that statistics over a three-year history are computed in milliseconds."""
+        start = self.end_date - datetime.timedelta(days=3 * 365)
+        routines = [
+            {
+                'date': (start + datetime.timedelta(days=offset)).isoformat(),
+                'routine': [
+                    {'type': 'nap', 'start_time': '09:00', 'duration': '60 minutes'},
+                    {'type': 'nap', 'start_time': '13:00', 'duration': '90 minutes'},
+                    {'type': 'feeding', 'start_time': '07:00'},
+                    {'type': 'feeding', 'start_time': '11:00'},
+                    {'type': 'diaper'},
+                ],
+            }
+            for offset in range(3 * 365)
+        ]
+        columns = self.analytics._columns_from_records(routines)
+        self.assertEqual(len(columns), 5 * 3 * 365)
+
+        started = time.perf_counter()
+        stats = self.analytics._window_stats(columns, self.end_date.toordinal() - 89, self.end_date.toordinal())
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(stats['nap_minutes_per_day'], 150.0)
+        self.assertLess(elapsed, 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
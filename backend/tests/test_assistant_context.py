@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+import datetime
+import tempfile
+import shutil
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from services.circuit_breaker import CircuitBreaker
+from services.analytics import RoutineAnalytics
+from services.assistant_context import AssistantContext
+from services.metrics import MetricsRegistry
+from services.openai_service import OpenAIService, SYSTEM_PROMPT
+from services.response_cache import ResponseCache
+
+class TestAssistantContext(unittest.TestCase):
+    """Test cases for the cached per-user assistant context."""
+
+    def setUp(self):
+        """Set up a data manager with a day of routines."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.context = AssistantContext(self.data_manager, RoutineAnalytics(self.data_manager))
+        self.user_id = "test_user_123"
+        self.today = datetime.date(2025, 1, 15)
+
+        self.data_manager.add_routine({
+            'baby_name': 'Emma',
+            'date': '2025-01-15',
+            'routine': [
+                {'type': 'wake', 'start_time': '07:00'},
+                {'type': 'feeding', 'start_time': '07:30', 'feeding_type': 'bottle'},
+                {'type': 'nap', 'start_time': '09:00', 'duration': '90 minutes'},
+                {'type': 'diaper', 'start_time': '10:45', 'diaper_type': 'wet'},
+            ]
+        }, self.user_id)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_context_contents(self):
+        """Test that the context holds the name, today's rollup, statistics and recent activities."""
+        context = self.context.get_context(self.user_id, self.today)
+        self.assertIn("Baby: Emma", context)
+        self.assertIn("Today: 1 nap (1 hr 30 min), last at 09:00; 1 feeding, last at 07:30", context)
+        self.assertIn("Last 7 days: naps 1 hr 30 min/day", context)
+        self.assertIn("- 01-15 10:45 diaper (wet)", context)
+        self.assertIn("- 01-15 09:00 nap (1 hr 30 min)", context)
+
+        # Recent activities are listed oldest first
+        self.assertLess(context.index("07:00 wake"), context.index("10:45 diaper"))
+        self.assertEqual(self.context.get_context("unknown_user", self.today), "")
+
+    def test_cached_until_the_users_next_write(self):
+        """Test that the context is reused until a write for the same user."""
+        context = self.context.get_context(self.user_id, self.today)
+        self.data_manager.get_routines = None  # Any rebuild would fail
+        self.assertIs(self.context.get_context(self.user_id, self.today), context)
+
+        # Another user's write leaves the cached context in place
+        self.data_manager.add_routine({'date': '2025-01-15', 'routine': [{'type': 'nap', 'start_time': '10:00'}]}, "other_user")
+        self.data_manager.update_user("other_user", {'id': "other_user", 'email': 'other@example.com'})
+        self.assertIs(self.context.get_context(self.user_id, self.today), context)
+        del self.data_manager.get_routines
+
+        self.data_manager.add_caregiver_update({
+            'date': '2025-01-15',
+            'parsed_events': [{'type': 'nap', 'start_time': '13:00', 'duration': '45 minutes'}]
+        }, self.user_id)
+        context = self.context.get_context(self.user_id, self.today)
+        self.assertIn("2 naps (2 hr 15 min), last at 13:00", context)
+
+        # A new day rebuilds the context
+        self.assertNotIn("Today:", self.context.get_context(self.user_id, self.today + datetime.timedelta(days=1)))
+
+    def test_user_update_invalidates(self):
+        """Test that changing the user record rebuilds the context."""
+        self.data_manager.update_user(self.user_id, {'id': self.user_id, 'email': 'parent@example.com', 'baby_name': 'Emmy'})
+        self.assertIn("Baby: Emmy", self.context.get_context(self.user_id, self.today))
+        self.data_manager.update_user(self.user_id, {'id': self.user_id, 'email': 'parent@example.com', 'baby_name': 'Em'})
+        self.assertIn("Baby: Em\n", self.context.get_context(self.user_id, self.today))
+
+    def test_writes_by_other_processes_invalidate(self):
+        """Test that a write through another worker's data manager rebuilds the context."""
+        self.assertIn("Today: 1 nap (1 hr 30 min)", self.context.get_context(self.user_id, self.today))
+
+        other_manager = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file
+        )
+        other_manager.add_caregiver_update({
+            'date': '2025-01-15',
+            'parsed_events': [{'type': 'nap', 'start_time': '13:00', 'duration': '45 minutes'}]
+        }, self.user_id)
+        self.assertIn("Today: 2 naps (2 hr 15 min), last at 13:00", self.context.get_context(self.user_id, self.today))
+
+    def test_token_budget(self):
+        """Test that the oldest activities are dropped to stay within the budget."""
+        for hour in range(11, 23):
+            self.data_manager.add_routine({
+                'date': '2025-01-15',
+                'routine': [{'type': 'feeding', 'start_time': f'{hour}:00', 'feeding_type': 'breast milk'}]
+            }, self.user_id)
+
+        context = AssistantContext(self.data_manager, max_tokens=60, recent_count=20).get_context(self.user_id, self.today)
+        self.assertLessEqual(len(context), 240)
+        self.assertIn("22:00 feeding", context)
+        self.assertNotIn("07:00 wake", context)
+
+    def test_system_message_uses_context(self):
+        """Test that a prebuilt context replaces the routine data in the system message."""
+        service = OpenAIService(cache=ResponseCache(metrics=MetricsRegistry()), breaker=CircuitBreaker(metrics=MetricsRegistry()))
+        context = self.context.get_context(self.user_id, self.today)
+
+        message = service._build_system_message(None, None, context)
+        self.assertTrue(message.startswith(SYSTEM_PROMPT))
+        self.assertTrue(message.rstrip().endswith(context.splitlines()[-1]))
+
+        # A list of routines uses the latest routine
+        routines = self.data_manager.get_routines(self.user_id)
+        message = service._build_system_message(None, routines)
+        self.assertIn("- Name: Emma", message)
+        self.assertIn("  * nap at 09:00", message)
+        self.assertEqual(service._build_system_message(None, []), SYSTEM_PROMPT)
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from flask import Flask
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from socket_service import SocketService
+from services.circuit_breaker import CircuitBreaker
+from services.llm_client import LLMError
+from services.metrics import MetricsRegistry
+from services.response_cache import ResponseCache
+from services.openai_service import OpenAIService
+
+class ScriptedLLMClient:
+    """LLM client that streams a fixed list of chunks."""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.calls = 0
+
+    def stream_chat_completion(self, messages, model, max_tokens=None, temperature=None, deadline=None):
+        self.calls += 1
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+class RecordingSocketIO:
+    """Records emitted events in place of a Socket.IO server."""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, data, room=None):
+        self.events.append((event, data, room))
+
+class TestAssistantStreaming(unittest.TestCase):
+    """Test cases for streamed assistant responses."""
+
+    def setUp(self):
+        """Set up a data manager and a Socket.IO service that records its events."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.app = Flask(__name__)
+        self.socket_service = SocketService(self.app, self.data_manager)
+        self.socket_service.socketio = RecordingSocketIO()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def make_service(self, llm_client):
+        service = OpenAIService(cache=ResponseCache(metrics=MetricsRegistry()), llm_client=llm_client,
+                                breaker=CircuitBreaker(metrics=MetricsRegistry()))
+        service.api_key = 'test-key'
+        return service
+
+    def test_stream_response_yields_disclaimer_then_tokens(self):
+        """Test that the disclaimer comes first and a repeated question is served whole from the cache."""
+        llm_client = ScriptedLLMClient([' Yes', ', that', ' is normal.'])
+        service = self.make_service(llm_client)
+
+        chunks = list(service.stream_response("Is it normal?"))
+        self.assertEqual(chunks[0], f"{service.disclaimer}\n\n")
+        self.assertEqual(chunks[1:], ['Yes', ', that', ' is normal.'])
+
+        self.assertEqual(list(service.stream_response("is it normal")), [''.join(chunks)])
+        self.assertEqual(llm_client.calls, 1)
+
+    def test_chunks_are_forwarded_to_the_user_room(self):
+        """Test that assistant_chunk events precede one assistant_done event."""
+        service = self.make_service(ScriptedLLMClient(['Yes', ' it is.']))
+        message = self.socket_service.stream_to_user('u1', 'r1', service.stream_response("Is it normal?"))
+
+        events = self.socket_service.socketio.events
+        self.assertEqual([event for event, _, _ in events], ['assistant_chunk'] * 3 + ['assistant_done'])
+        self.assertEqual({room for _, _, room in events}, {'user_u1'})
+        self.assertEqual([data['index'] for _, data, _ in events[:3]], [0, 1, 2])
+        done = events[-1][1]
+        self.assertEqual((done['request_id'], done['status'], done['message']), ('r1', 'success', message))
+        self.assertTrue(message.endswith('Yes it is.'))
+
+    def test_stream_errors_finish_the_stream(self):
+        """Test that a broken stream still ends with assistant_done, and is not cached."""
+        llm_client = ScriptedLLMClient(['Yes'], error=LLMError("Chat completion stream failed", retryable=True))
+        service = self.make_service(llm_client)
+        self.socket_service.stream_to_user('u1', 'r2', service.stream_response("Is it normal?"))
+
+        event, done, _ = self.socket_service.socketio.events[-1]
+        self.assertEqual(event, 'assistant_done')
+        self.assertEqual(done['status'], 'error')
+        self.assertIn('stream failed', done['error'])
+
+        with self.assertRaises(LLMError):
+            list(service.stream_response("Is it normal?"))
+        self.assertEqual(llm_client.calls, 2)
+if __name__ == '__main__':
+    unittest.main()
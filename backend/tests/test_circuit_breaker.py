@@ -0,0 +1,147 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parser_service import ParserService
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+from services.llm_client import LLMError
+from services.metrics import MetricsRegistry
+from services.response_cache import ResponseCache
+from services.openai_service import OpenAIService, FALLBACK_SUGGESTIONS, UNAVAILABLE_MESSAGE
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for the circuit breaker states."""
+
+    def setUp(self):
+        """Set up a breaker that opens at half of 4 calls failing."""
+        self.clock = FakeClock()
+        self.metrics = MetricsRegistry()
+        self.breaker = CircuitBreaker(failure_rate=0.5, slow_call_seconds=5, window=4, min_calls=4,
+                                      open_seconds=30, metrics=self.metrics, clock=self.clock)
+
+    def call(self, error=None, latency=0.1):
+        self.breaker.before_call()
+        if error is not None:
+            self.breaker.record_failure(error)
+        else:
+            self.breaker.record_success(latency)
+
+    def test_opens_on_failure_rate(self):
+        """Test that the circuit opens once half of the recent calls failed."""
+        self.call()
+        self.call(RuntimeError("timeout"))
+        self.call()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.call(LLMError("503", status=503, retryable=True))
+        self.assertEqual(self.breaker.state, OPEN)
+
+        with self.assertRaises(CircuitOpenError) as context:
+            self.breaker.before_call()
+        self.assertEqual(context.exception.retry_in, 30)
+        self.assertTrue(self.breaker.is_open())
+        self.assertEqual(self.breaker.snapshot(), {'state': OPEN, 'recent_calls': 0, 'recent_bad_calls': 0, 'retry_in': 30})
+        self.assertEqual(self.metrics.snapshot()['counters']['circuit.openai.rejected'], 1)
+
+    def test_slow_calls_count_as_bad(self):
+        """Test that calls reaching the latency threshold open the circuit too."""
+        for latency in (0.1, 0.2, 6, 7):
+            self.call(latency=latency)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_rejected_requests_do_not_count(self):
+        """Test that non-retryable errors are the caller's fault, not the upstream's."""
+        for _ in range(4):
+            self.call(LLMError("400", status=400))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_trial(self):
+        """Test that one trial call is let through after the wait and decides the state."""
+        for _ in range(4):
+            self.call(RuntimeError("timeout"))
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        # A failed trial opens the circuit for another full wait
+        self.breaker.before_call()
+        self.assertRaises(CircuitOpenError, self.breaker.before_call)
+        self.breaker.record_failure(RuntimeError("timeout"))
+        self.assertEqual(self.breaker.state, OPEN)
+
+        # A trial that was never made is given back
+        self.clock.now += 30
+        self.breaker.before_call()
+        self.breaker.release()
+        self.breaker.before_call()
+        self.breaker.record_success(0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.metrics.snapshot()['counters']['circuit.openai.opened'], 2)
+
+class TestOpenAIServiceFallbacks(unittest.TestCase):
+    """Test cases for failing fast while the circuit is open."""
+
+    def setUp(self):
+        """Set up a service whose breaker opens after 2 failures."""
+        self.metrics = MetricsRegistry()
+        self.breaker = CircuitBreaker(window=2, min_calls=2, metrics=self.metrics)
+        self.service = OpenAIService(cache=ResponseCache(metrics=self.metrics), breaker=self.breaker)
+        self.service.api_key = 'test-key'
+
+    def test_fast_fallbacks(self):
+        """Test that an open circuit answers without calling the API."""
+        with mock.patch.object(self.service.llm_client, 'chat_completion', side_effect=LLMError("timeout", retryable=True)) as create:
+            self.service.get_response("Why won't she nap?")
+            self.service.get_response("Why won't he eat?")
+            self.assertFalse(self.service.available())
+
+            response = self.service.get_response("Is this normal?")
+            self.assertTrue(response.endswith(UNAVAILABLE_MESSAGE))
+            self.assertEqual(self.service.get_suggestions({'routine': []}), FALLBACK_SUGGESTIONS)
+            self.assertEqual(''.join(self.service.stream_response("Is this normal?")), response)
+            self.assertEqual(create.call_count, 2)
+
+    def test_parser_skips_ai_enhancement(self):
+        """Test that the parser keeps its own result while the circuit is open."""
+        parser = ParserService()
+        parser.openai_service = self.service
+        parser.use_ai_assist = True
+        self.breaker._open()
+
+        with mock.patch.object(self.service, 'get_response') as get_response:
+            routine = parser.parse_routine("Nap at 2pm", "test_user_123")
+        get_response.assert_not_called()
+        self.assertNotIn('ai_enhanced', routine)
+
+    def test_stream_closed_after_disclaimer_releases_trial(self):
+        """Test that a half-open trial is given back when the consumer stops after the disclaimer."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(window=2, min_calls=2, open_seconds=30, metrics=self.metrics, clock=clock)
+        self.service.breaker = breaker
+        breaker._open()
+        clock.now += 30
+        self.assertEqual(breaker.state, HALF_OPEN)
+
+        with mock.patch.object(self.service.llm_client, 'stream_chat_completion') as stream:
+            chunks = self.service.stream_response("Is this normal?")
+            self.assertEqual(next(chunks), f"{self.service.disclaimer}\n\n")
+            self.assertTrue(breaker.is_open())
+            chunks.close()
+        stream.assert_not_called()
+
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.is_open())
+        self.assertTrue(self.service.available())
+if __name__ == '__main__':
+    unittest.main()
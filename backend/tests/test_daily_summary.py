@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import datetime
+import threading
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+
+class TestDailySummary(unittest.TestCase):
+    """Test cases for the incrementally maintained daily summaries."""
+
+    def setUp(self):
+        """Set up a data manager in a temporary directory."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.user_id = "test_user_123"
+        self.date = "2025-01-15"
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_rollup_is_updated_on_every_write(self):
+        """Test counts, total durations and last events across routines and updates."""
+        self.data_manager.add_routine({
+            'parsed_at': f'{self.date}T20:00:00',
+            'routine': [
+                {'type': 'nap', 'start_time': '13:00', 'duration': '90 minutes'},
+                {'type': 'nap', 'start_time': '09:00', 'duration': '60 minutes'},
+                {'type': 'feeding', 'start_time': '07:00'},
+            ],
+        }, self.user_id)
+        self.data_manager.add_caregiver_update({
+            'timestamp': f'{self.date}T16:00:00',
+            'parsed_events': [{'type': 'feeding', 'start_time': '15:30', 'feeding_type': 'bottle'}],
+        }, self.user_id)
+        self.data_manager.add_caregiver_update({'date': self.date, 'type': 'diaper', 'diaper_type': 'wet'}, self.user_id)
+
+        summary = self.data_manager.get_daily_summary(self.user_id, self.date)
+
+        self.assertEqual(summary['counts'], {'nap': 2, 'feeding': 2, 'diaper': 1})
+        self.assertEqual(summary['total_duration_minutes'], {'nap': 150})
+        self.assertEqual(summary['last_event']['nap']['start_time'], '13:00')
+        self.assertEqual(summary['last_event']['feeding']['feeding_type'], 'bottle')
+        self.assertEqual(summary['event_count'], 5)
+
+    def test_days_are_separate(self):
+        """Test that records only count towards their own day."""
+        self.data_manager.add_caregiver_update({'date': self.date, 'type': 'diaper'}, self.user_id)
+        self.data_manager.add_caregiver_update({'date': '2025-01-16', 'type': 'diaper'}, self.user_id)
+        self.data_manager.add_caregiver_update({'date': self.date, 'type': 'diaper'}, 'other_user')
+
+        self.assertEqual(self.data_manager.get_daily_summary(self.user_id, self.date)['counts'], {'diaper': 1})
+        self.assertEqual(self.data_manager.get_daily_summary(self.user_id, '2025-01-17')['event_count'], 0)
+
+    def test_invalid_dates_count_towards_today(self):
+        """Test that a record date that is not an ISO date never becomes part of a file name."""
+        # Nested, so the path the date points at is still inside the temporary directory
+        data_manager = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file,
+            summaries_dir=os.path.join(self.data_dir, 'nested', 'deeper', 'summaries')
+        )
+        data_manager.add_caregiver_update({'date': '../../../x', 'type': 'nap'}, self.user_id)
+
+        today = datetime.date.today().isoformat()
+        self.assertEqual(data_manager.get_daily_summary(self.user_id, today)['counts'], {'nap': 1})
+        self.assertFalse(os.path.exists(os.path.join(data_manager.summaries_dir, self.user_id, '../../../x.json')))
+        self.assertEqual(data_manager.get_daily_summary(self.user_id, '../../../x')['event_count'], 0)
+
+    def test_concurrent_writes_are_all_counted(self):
+        """Test that rollup updates for the same day from several workers do not overwrite each other."""
+        managers = [self.data_manager] + [
+            DataManager(self.data_manager.routines_file, self.data_manager.caregiver_updates_file, self.data_manager.users_file)
+            for _ in range(3)
+        ]
+
+        def write(data_manager):
+            for _ in range(25):
+                data_manager._update_summary({'date': self.date, 'type': 'diaper'}, self.user_id)
+
+        threads = [threading.Thread(target=write, args=(data_manager,)) for data_manager in managers for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.data_manager.get_daily_summary(self.user_id, self.date)['counts'], {'diaper': 200})
+        summary_dir = os.path.dirname(self.data_manager._summary_path(self.user_id, self.date))
+        self.assertFalse([name for name in os.listdir(summary_dir) if name.endswith('.tmp')])
+
+if __name__ == '__main__':
+    unittest.main()
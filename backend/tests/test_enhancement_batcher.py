@@ -0,0 +1,114 @@
+import unittest
+import sys
+import os
+import re
+import json
+import threading
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parser_service import ParserService
+from services.enhancement_batcher import EnhancementBatcher
+from services.metrics import MetricsRegistry
+
+DISCLAIMER = "This is an AI assistant and may not always be accurate."
+
+class FakeOpenAIService:
+    """Answers parsing prompts with one nap per description; batch answers can be made to drop items."""
+
+    def __init__(self, drop_ids=()):
+        self.prompts = []
+        self.drop_ids = set(drop_ids)
+        self.lock = threading.Lock()
+
+    def available(self):
+        return True
+
+    def get_response(self, prompt, priority=None, max_tokens=500):
+        with self.lock:
+            self.prompts.append(prompt)
+        batch = re.findall(r'^\[(\d+)\] Baby: (\w+)\. Description: (.*)$', prompt, re.MULTILINE)
+        if batch:
+            answer = {
+                number: [{'type': 'Nap', 'start_time': '2pm', 'note': text}]
+                for number, _, text in batch if number not in self.drop_ids
+            }
+            return f"{DISCLAIMER}\n\n```json\n{json.dumps(answer)}\n```"
+        text = re.search(r'^Description: (.*)$', prompt, re.MULTILINE).group(1)
+        return f"{DISCLAIMER}\n\n{json.dumps([{'type': 'nap', 'start_time': '14:00', 'note': text}])}"
+
+class TestEnhancementBatcher(unittest.TestCase):
+    """Test cases for batched AI enhancement."""
+
+    def setUp(self):
+        """Set up a batcher of 4 descriptions per call."""
+        self.service = FakeOpenAIService()
+        self.metrics = MetricsRegistry()
+        self.batcher = EnhancementBatcher(self.service, ParserService()._normalize_time, batch_size=4, metrics=self.metrics)
+
+    def test_round_trips_drop_by_batch_factor(self):
+        """Test that 10 descriptions take 3 calls and answers go back to their items."""
+        items = [(f"text {index}", 'Emma') for index in range(10)]
+        results = self.batcher.enhance_many(items)
+
+        self.assertEqual(len(self.service.prompts), 3)
+        self.assertEqual([events[0]['note'] for events in results], [text for text, _ in items])
+        self.assertEqual(results[0][0]['type'], 'nap')
+        self.assertEqual(results[0][0]['start_time'], '14:00')
+        self.assertTrue(results[0][0]['ai_generated'])
+        self.assertEqual(self.metrics.snapshot()['counters']['ai_enhancement.batched_items'], 10)
+
+    def test_invalid_items_fall_back_to_single_calls(self):
+        """Test that an item missing from the batch answer is retried on its own."""
+        self.service.drop_ids = {'2'}
+        results = self.batcher.enhance_many([("text a", 'Emma'), ("text b", 'Emma'), ("text c", 'Emma')])
+
+        self.assertEqual([events[0]['note'] for events in results], ["text a", "text b", "text c"])
+        self.assertEqual(len(self.service.prompts), 2)
+        self.assertEqual(self.metrics.snapshot()['counters']['ai_enhancement.fallbacks'], 1)
+
+    def test_validation(self):
+        """Test that unknown activity types and malformed answers are rejected."""
+        self.assertIsNone(self.batcher._validate([{'type': 'teleport'}]))
+        self.assertIsNone(self.batcher._validate({'type': 'nap'}))
+        self.assertIsNone(self.batcher._validate([]))
+        self.assertEqual(self.batcher._validate([{'type': 'Feeding'}]), [{'type': 'feeding', 'ai_generated': True}])
+
+    def test_concurrent_callers_share_a_call(self):
+        """Test that enhance calls arriving together are sent as one batch."""
+        self.batcher.max_delay = 1.0
+        results = {}
+
+        def enhance(index):
+            results[index] = self.batcher.enhance(f"text {index}", 'Emma')
+
+        threads = [threading.Thread(target=enhance, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(self.service.prompts), 1)
+        self.assertEqual({index: events[0]['note'] for index, events in results.items()},
+                         {index: f"text {index}" for index in range(4)})
+
+    def test_parser_bulk_parse(self):
+        """Test that parse_routines enhances all weak parses in batched calls."""
+        parser = ParserService()
+        parser.openai_service = self.service
+        parser.enhancer = self.batcher
+        parser.use_ai_assist = True
+
+        texts = [f"Mia napped for a bit, day {index}" for index in range(6)] + [
+            "Mia woke up at 7am, fed at 7:30am, napped at 9am and had a bath at 6pm"
+        ]
+        routines = parser.parse_routines(texts, "test_user_123")
+
+        self.assertEqual(len(routines), 7)
+        self.assertEqual(len(self.service.prompts), 2)
+        self.assertTrue(all(routine.get('ai_enhanced') for routine in routines[:6]))
+        self.assertEqual(routines[3]['routine'][0]['note'], texts[3])
+        self.assertNotIn('ai_enhanced', routines[6])
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.event_model import ActivityType, Event, minutes_to_time, time_to_minutes
+
+class TestEventModel(unittest.TestCase):
+    """Test cases for the Event model."""
+
+    def test_round_trip(self):
+        """Test that API dicts survive conversion to an Event and back."""
+        data = {
+            'type': 'nap',
+            'start_time': '13:00',
+            'end_time': '15:30',
+            'duration': '150 minutes',
+            'location': 'crib',
+            'source_text': 'nap from 1pm to 3:30pm',
+            'notes': 'kept unchanged',
+        }
+        event = Event.from_dict(data)
+
+        self.assertIs(event.type, ActivityType.NAP)
+        self.assertEqual((event.start, event.end, event.duration), (780, 930, 150))
+        self.assertEqual(event.to_dict(), data)
+
+    def test_time_conversion(self):
+        """Test minute conversion, including wrap-around past midnight."""
+        self.assertEqual(time_to_minutes('07:05'), 425)
+        self.assertIsNone(time_to_minutes('later'))
+        self.assertEqual(minutes_to_time(425), '07:05')
+        self.assertEqual(minutes_to_time(-30), '23:30')
+        self.assertEqual(minutes_to_time(24 * 60 + 15), '00:15')
+
+    def test_merge_and_sort(self):
+        """Test that merging fills missing details and untimed events sort last."""
+        event = Event('nap', start=780)
+        event.merge(Event('nap', duration=120, start=600))
+
+        self.assertEqual((event.start, event.duration), (780, 120))
+        ordered = sorted([Event('diaper'), event, Event('feeding', start=420)], key=Event.sort_key)
+        self.assertEqual([e.type.value for e in ordered], ['feeding', 'nap', 'diaper'])
+
+    def test_unknown_type_is_rejected(self):
+        """Test that an unknown activity type raises ValueError."""
+        with self.assertRaises(ValueError):
+            Event.from_dict({'type': 'juggling'})
+
+if __name__ == '__main__':
+    unittest.main()
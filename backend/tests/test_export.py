@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import io
+import csv
+import tempfile
+import shutil
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from services.export import EXPORT_COLUMNS, iter_export_rows, iter_csv, iter_parquet, parquet_available
+
+class TestExport(unittest.TestCase):
+    """Test cases for the streaming history export."""
+
+    def setUp(self):
+        """Set up a data manager with a routine and caregiver updates."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.user_id = "test_user_123"
+        self.data_manager.add_routine({
+            'parsed_at': '2025-01-15T20:00:00',
+            'routine': [
+                {'type': 'nap', 'start_time': '13:00', 'duration': '90 minutes'},
+                {'type': 'feeding', 'start_time': '07:00', 'feeding_type': 'bottle'},
+            ],
+        }, self.user_id)
+        self.data_manager.add_caregiver_update({'message': 'Fussy, "very" tired', 'timestamp': '2025-01-16T09:00:00'}, self.user_id)
+        self.data_manager.add_caregiver_update({
+            'message': 'Diaper at 10am',
+            'timestamp': '2025-01-16T10:05:00',
+            'parsed_events': [{'type': 'diaper', 'start_time': '10:00', 'diaper_type': 'wet'}],
+        }, self.user_id)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_rows(self):
+        """Test that events are flattened to one row each and free text gets its own row."""
+        rows = list(iter_export_rows(self.data_manager, self.user_id))
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(len(row) == len(EXPORT_COLUMNS) for row in rows))
+
+        nap = dict(zip(EXPORT_COLUMNS, rows[0]))
+        self.assertEqual((nap['source'], nap['date'], nap['type'], nap['duration_minutes']), ('routine', '2025-01-15', 'nap', 90))
+
+        note = dict(zip(EXPORT_COLUMNS, rows[2]))
+        self.assertEqual((note['source'], note['type'], note['text']), ('caregiver_update', None, 'Fussy, "very" tired'))
+
+        diaper = dict(zip(EXPORT_COLUMNS, rows[3]))
+        self.assertEqual((diaper['type'], diaper['diaper_type'], diaper['text']), ('diaper', 'wet', 'Diaper at 10am'))
+
+    def test_csv_is_streamed_in_chunks(self):
+        """Test that CSV output is chunked and parses back to the rows."""
+        rows = list(iter_export_rows(self.data_manager, self.user_id))
+        chunks = list(iter_csv(iter(rows), chunk_rows=2))
+        self.assertEqual(len(chunks), 3)
+
+        parsed = list(csv.reader(io.StringIO(''.join(chunks))))
+        self.assertEqual(tuple(parsed[0]), EXPORT_COLUMNS)
+        self.assertEqual(len(parsed), 5)
+        self.assertEqual(parsed[3][EXPORT_COLUMNS.index('text')], 'Fussy, "very" tired')
+
+    @unittest.skipUnless(parquet_available(), "pyarrow is not installed")
+    def test_parquet_row_groups(self):
+        """Test that Parquet output is written one row group at a time."""
+        import pyarrow.parquet as pq
+
+        rows = list(iter_export_rows(self.data_manager, self.user_id)) * 5
+        chunks = list(iter_parquet(iter(rows), row_group_size=6))
+        self.assertEqual(len(chunks), 4)
+
+        parquet_file = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(parquet_file.metadata.num_row_groups, 4)
+        table = parquet_file.read()
+        self.assertEqual(table.num_rows, 20)
+        self.assertEqual(table.column('duration_minutes')[0].as_py(), 90)
+
+    @unittest.skipUnless(parquet_available(), "pyarrow is not installed")
+    def test_empty_parquet(self):
+        """Test that an empty history is still a valid Parquet file."""
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(b''.join(iter_parquet(iter([])))))
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(tuple(table.column_names), EXPORT_COLUMNS)
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+import sys
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.llm_client import LLMClient, LLMError
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers chat completion requests with the server's scripted responses."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append((self.client_address, self.headers.get('Authorization'), body))
+        status, delay, headers = self.server.script.pop(0) if self.server.script else (200, 0, {})
+        if delay:
+            time.sleep(delay)
+
+        if status == 200 and body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for word in f"Echo: {body['messages'][-1]['content']}".split(' '):
+                chunk = {'choices': [{'delta': {'content': word + ' '}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+
+        if status == 200:
+            payload = {'choices': [{'message': {'role': 'assistant', 'content': f"Echo: {body['messages'][-1]['content']}"}}]}
+        else:
+            payload = {'error': {'message': f"Stub error {status}"}}
+        data = json.dumps(payload).encode('utf-8')
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+class TestLLMClient(unittest.TestCase):
+    """Test cases for the pooled chat completion client against a local stub server."""
+
+    def setUp(self):
+        """Start the stub server and a client with short timeouts."""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.script = []
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        self.sleeps = []
+        self.client = LLMClient(
+            'test-key',
+            api_base=f'http://127.0.0.1:{self.server.server_port}/v1',
+            read_timeout=0.5,
+            deadline=5,
+            backoff_base=0.01,
+            sleep=self.sleeps.append
+        )
+        self.messages = [{'role': 'user', 'content': 'Is it normal?'}]
+
+    def tearDown(self):
+        """Stop the stub server and close the client."""
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_completion_reuses_connections(self):
+        """Test that calls succeed over one keep-alive connection."""
+        for _ in range(3):
+            response = self.client.chat_completion(self.messages, model='gpt-3.5-turbo', max_tokens=50, temperature=0.7)
+            self.assertEqual(response['choices'][0]['message']['content'], 'Echo: Is it normal?')
+
+        addresses = {address for address, _, _ in self.server.requests}
+        self.assertEqual(len(addresses), 1)
+        _, authorization, body = self.server.requests[0]
+        self.assertEqual(authorization, 'Bearer test-key')
+        self.assertEqual((body['model'], body['max_tokens'], body['temperature']), ('gpt-3.5-turbo', 50, 0.7))
+
+    def test_retries_transient_failures(self):
+        """Test that 429 and 5xx responses are retried with backoff, honoring Retry-After."""
+        self.server.script = [(429, 0, {'Retry-After': '0.2'}), (503, 0, {}), (200, 0, {})]
+        response = self.client.chat_completion(self.messages, model='gpt-3.5-turbo')
+
+        self.assertEqual(response['choices'][0]['message']['content'], 'Echo: Is it normal?')
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertGreaterEqual(self.sleeps[0], 0.2)
+        self.assertLessEqual(self.sleeps[1], 0.02)
+
+    def test_client_errors_are_not_retried(self):
+        """Test that a 400 response fails at once."""
+        self.server.script = [(400, 0, {})]
+        with self.assertRaises(LLMError) as context:
+            self.client.chat_completion(self.messages, model='gpt-3.5-turbo')
+        self.assertEqual(context.exception.status, 400)
+        self.assertFalse(context.exception.retryable)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_gives_up_after_max_retries(self):
+        """Test that a persistently failing upstream raises after the last retry."""
+        self.server.script = [(500, 0, {})] * 4
+        with self.assertRaises(LLMError) as context:
+            self.client.chat_completion(self.messages, model='gpt-3.5-turbo')
+        self.assertEqual(context.exception.status, 500)
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_read_timeout_and_deadline(self):
+        """Test that a slow upstream times out and the call stops at its deadline."""
+        self.client.sleep = time.sleep
+        self.server.script = [(200, 2, {})] * 4
+        started = time.monotonic()
+        with self.assertRaises(LLMError) as context:
+            self.client.chat_completion(self.messages, model='gpt-3.5-turbo', deadline=1.2)
+        elapsed = time.monotonic() - started
+
+        self.assertTrue(context.exception.retryable)
+        self.assertLess(elapsed, 1.8)
+        self.assertIn(len(self.server.requests), (2, 3))
+
+    def test_streaming(self):
+        """Test that a streamed completion yields its content chunks in order."""
+        chunks = list(self.client.stream_chat_completion(self.messages, model='gpt-3.5-turbo'))
+        self.assertEqual(chunks, ['Echo: ', 'Is ', 'it ', 'normal? '])
+        self.assertTrue(self.server.requests[0][2]['stream'])
+
+    def test_streaming_retries_before_the_first_chunk(self):
+        """Test that opening a stream is retried like a plain completion."""
+        self.server.script = [(503, 0, {}), (200, 0, {})]
+        self.assertEqual(''.join(self.client.stream_chat_completion(self.messages, model='gpt-3.5-turbo')), 'Echo: Is it normal? ')
+        self.assertEqual(len(self.sleeps), 1)
+if __name__ == '__main__':
+    unittest.main()
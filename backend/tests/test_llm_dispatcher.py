@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.llm_client import LLMError
+from services.llm_dispatcher import LLMDispatcher, TokenBucket, BATCH, INTERACTIVE, SMS
+from services.metrics import MetricsRegistry
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for the token bucket."""
+
+    def test_refill_and_debt(self):
+        """Test that the bucket refills at its rate and carries debts."""
+        clock = FakeClock()
+        bucket = TokenBucket(60, capacity=10, clock=clock)
+        self.assertEqual(bucket.wait_time(10), 0)
+
+        bucket.take(10)
+        self.assertAlmostEqual(bucket.wait_time(2), 2.0)
+        clock.now += 2
+        self.assertEqual(bucket.wait_time(2), 0)
+
+        # Oversized amounts only need a full bucket; the excess becomes a debt
+        bucket.take(2)
+        clock.now += 10
+        self.assertEqual(bucket.wait_time(50), 0)
+        bucket.take(50)
+        self.assertAlmostEqual(bucket.wait_time(1), 41.0)
+
+class TestLLMDispatcher(unittest.TestCase):
+    """Test cases for priority admission of upstream calls."""
+
+    def setUp(self):
+        """Set up a dispatcher allowing 20 requests per second once drained."""
+        self.metrics = MetricsRegistry()
+        self.dispatcher = LLMDispatcher(requests_per_minute=1200, tokens_per_minute=1000000, max_queue=5, metrics=self.metrics)
+
+    def wait_for_queue(self, count):
+        deadline = time.monotonic() + 5
+        while self.dispatcher.queued() < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_priority_order(self):
+        """Test that waiting interactive requests go before SMS replies and batch work."""
+        self.dispatcher.requests.level = -1
+        order = []
+
+        def request(priority):
+            self.dispatcher.acquire(priority)
+            order.append(priority)
+
+        threads = []
+        for count, priority in enumerate([BATCH, BATCH, SMS, INTERACTIVE], 1):
+            thread = threading.Thread(target=request, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            self.wait_for_queue(count)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order, [INTERACTIVE, SMS, BATCH, BATCH])
+        timers = self.metrics.snapshot()['timers']
+        self.assertEqual(timers['llm.queue.batch']['count'], 2)
+        self.assertGreater(timers['llm.queue.batch']['mean_ms'], timers['llm.queue.interactive']['mean_ms'])
+
+    def test_bounded_queue_and_max_wait(self):
+        """Test that a full class queue rejects requests and waits are bounded."""
+        dispatcher = LLMDispatcher(requests_per_minute=1, max_queue=1, max_wait={BATCH: 0.2}, metrics=self.metrics)
+        dispatcher.acquire(BATCH)
+
+        errors = []
+
+        def waiting_request():
+            try:
+                dispatcher.acquire(BATCH)
+            except LLMError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=waiting_request)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while dispatcher.queued(BATCH) < 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+        with self.assertRaises(LLMError):
+            dispatcher.acquire(BATCH)
+        thread.join()
+        self.assertEqual(len(errors), 1)
+
+        counters = self.metrics.snapshot()['counters']
+        self.assertEqual((counters['llm.queue.batch.rejected'], counters['llm.queue.batch.timeouts']), (1, 1))
+        self.assertEqual(dispatcher.queued(), 0)
+
+    def test_token_limit_and_usage(self):
+        """Test that token estimates are charged and corrected by actual usage."""
+        dispatcher = LLMDispatcher(requests_per_minute=1000, tokens_per_minute=600, metrics=self.metrics)
+        dispatcher.acquire(INTERACTIVE, tokens=500)
+        dispatcher.record_usage(500, 300)
+        self.assertGreaterEqual(dispatcher.tokens.level, 300)
+
+        with self.assertRaises(ValueError):
+            dispatcher.acquire('urgent')
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import sys
+import os
+import time
+import requests
+from unittest import mock
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.circuit_breaker import CircuitBreaker
+from services.llm_client import LLMClient, LLMError
+from services.llm_stub import LLMStub
+from services.metrics import MetricsRegistry
+from services.openai_service import OpenAIService
+from services.response_cache import ResponseCache
+
+class TestLLMStub(unittest.TestCase):
+    """Test cases for the local OpenAI-compatible stub server."""
+
+    def setUp(self):
+        """Record backoff delays and the stubs started."""
+        self.sleeps = []
+        self.messages = [{'role': 'user', 'content': 'Is it normal?'}]
+        self.stubs = []
+
+    def tearDown(self):
+        """Stop the stub servers."""
+        for stub in self.stubs:
+            stub.stop()
+
+    def start_stub(self, **kwargs):
+        """Start a stub on a free port and return it with a client pointed at it."""
+        kwargs.setdefault('latency_ms', 0)
+        kwargs.setdefault('token_ms', 0)
+        stub = LLMStub(port=0, seed=1, **kwargs).start()
+        self.stubs.append(stub)
+        client = LLMClient('test-key', api_base=stub.api_base, read_timeout=2, deadline=5, sleep=self.sleeps.append)
+        return stub, client
+
+    def test_echo_completion(self):
+        """Test that a completion echoes the last user message with usage counts."""
+        stub, client = self.start_stub()
+        response = client.chat_completion(self.messages, model='gpt-3.5-turbo', max_tokens=50)
+
+        self.assertEqual(response['choices'][0]['message']['content'], 'Echo: Is it normal?')
+        self.assertEqual(response['model'], 'gpt-3.5-turbo')
+        self.assertGreater(response['usage']['prompt_tokens'], 0)
+        self.assertEqual(stub.snapshot(), {'requests': 1, 'streams': 0, 'errors': 0})
+
+    def test_canned_streaming(self):
+        """Test that a canned answer streams word by word after the first-chunk latency."""
+        stub, client = self.start_stub(mode='canned', canned_response='Keep naps regular.', latency_ms=100)
+        started = time.monotonic()
+        chunks = list(client.stream_chat_completion(self.messages, model='gpt-3.5-turbo'))
+
+        self.assertEqual(chunks, ['Keep ', 'naps ', 'regular.'])
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual(stub.snapshot()['streams'], 1)
+
+    def test_errors_are_retried_by_the_client(self):
+        """Test that injected errors carry Retry-After on 429 and fail the call once retries run out."""
+        stub, client = self.start_stub(error_rate=1.0, error_statuses=(429,), retry_after=2)
+        with self.assertRaises(LLMError) as context:
+            client.chat_completion(self.messages, model='gpt-3.5-turbo')
+
+        self.assertEqual(context.exception.status, 429)
+        self.assertEqual(stub.snapshot()['errors'], client.max_retries + 1)
+        self.assertTrue(all(delay >= 2 for delay in self.sleeps))
+
+    def test_latency_distributions(self):
+        """Test that latencies stay within their configured bounds."""
+        uniform = LLMStub(latency='uniform', latency_ms=100, latency_max_ms=300, seed=1)
+        samples = [uniform.sample_latency() for _ in range(200)]
+        self.assertTrue(all(0.1 <= sample <= 0.3 for sample in samples))
+
+        lognormal = LLMStub(latency='lognormal', latency_ms=100, latency_max_ms=1000, seed=1)
+        samples = sorted(lognormal.sample_latency() for _ in range(2000))
+        self.assertAlmostEqual(samples[1000], 0.1, delta=0.02)
+        self.assertAlmostEqual(samples[1980], 1.0, delta=0.35)
+
+        with self.assertRaises(ValueError):
+            LLMStub(latency='gaussian')
+
+    def test_stats_endpoint(self):
+        """Test that the request counters are served over HTTP."""
+        stub, client = self.start_stub()
+        client.chat_completion(self.messages, model='gpt-3.5-turbo')
+        stats = requests.get(stub.api_base[:-len('/v1')] + '/stats', timeout=2).json()
+        self.assertEqual(stats['requests'], 1)
+
+    def test_openai_service_uses_stub_url(self):
+        """Test that OPENAI_STUB_URL sends the service's calls to the stub without an API key."""
+        stub, _ = self.start_stub()
+        environment = {key: value for key, value in os.environ.items() if key != 'OPENAI_API_KEY'}
+        environment['OPENAI_STUB_URL'] = stub.api_base
+        with mock.patch.dict(os.environ, environment, clear=True):
+            service = OpenAIService(cache=ResponseCache(metrics=MetricsRegistry()), breaker=CircuitBreaker(metrics=MetricsRegistry()))
+
+        self.assertEqual(service.llm_client.api_base, stub.api_base)
+        response = service.get_response('How long should naps be?')
+        self.assertIn('Echo:', response)
+        self.assertEqual(stub.snapshot()['requests'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.parser_corpus import generate_corpus
+from benchmarks.parser_benchmark import run_benchmark, compare_to_baseline, STAGES
+
+class TestParserBenchmark(unittest.TestCase):
+    """Test cases for the parser benchmark suite."""
+
+    def setUp(self):
+        """Set up a small corpus."""
+        self.corpus = generate_corpus(seed=1, short_count=10, journal_count=2, journal_events=5, adversarial_size=200)
+
+    def test_corpus_is_deterministic(self):
+        """Test that the same seed produces the same corpus."""
+        again = generate_corpus(seed=1, short_count=10, journal_count=2, journal_events=5, adversarial_size=200)
+        self.assertEqual(self.corpus, again)
+        self.assertEqual(set(self.corpus), {'short_sms', 'daily_journal', 'adversarial'})
+
+    def test_run_benchmark_reports_stages_and_accuracy(self):
+        """Test that results include per-stage timings and accuracy."""
+        results = run_benchmark(self.corpus)
+
+        for kind in ('short_sms', 'daily_journal'):
+            self.assertEqual(set(results[kind]['stages_ms']), set(STAGES))
+            self.assertGreater(results[kind]['recall'], 0)
+            self.assertLessEqual(results[kind]['precision'], 1)
+
+        # Adversarial inputs have no ground truth
+        self.assertNotIn('recall', results['adversarial'])
+
+    def test_compare_flags_regressions(self):
+        """Test that slowdowns and accuracy drops are flagged."""
+        baseline = {'short_sms': {'mean_ms': 1.0, 'p95_ms': 2.0, 'precision': 1.0, 'recall': 0.9}}
+        results = {'short_sms': {'mean_ms': 2.0, 'p95_ms': 2.1, 'precision': 1.0, 'recall': 0.8}}
+
+        rows = {row['metric']: row for row in compare_to_baseline(results, baseline)}
+
+        self.assertTrue(rows['mean_ms']['regression'])
+        self.assertFalse(rows['p95_ms']['regression'])
+        self.assertFalse(rows['precision']['regression'])
+        self.assertTrue(rows['recall']['regression'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import sys
+import os
+import time
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parser_service import ParserService
+from benchmarks.parser_corpus import ADVERSARIAL_GENERATORS
+
+class TestParserHardening(unittest.TestCase):
+    """Test cases for the hardened ParserService mode."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.parser = ParserService(hardened=True, max_input_length=200, chunk_size=60)
+        self.parser.use_ai_assist = False
+        self.user_id = "test_user_123"
+
+    def test_long_input_is_truncated_on_sentence_boundary(self):
+        """Test that input over the limit is cut at a sentence boundary."""
+        text = "Baby naps at 1pm. " * 30
+        result = self.parser.parse_routine(text, self.user_id)
+
+        self.assertTrue(result['truncated'])
+        self.assertLessEqual(len(result['text']), 200)
+        self.assertTrue(result['text'].endswith('.'))
+
+    def test_short_input_is_not_truncated(self):
+        """Test that input under the limit is left alone."""
+        result = self.parser.parse_routine("Baby naps at 1pm.", self.user_id)
+
+        self.assertNotIn('truncated', result)
+
+    def test_chunked_parsing_keeps_events(self):
+        """Test that chunked parsing finds the same events as a single pass."""
+        text = "Baby wakes at 7am. Bottle at 8am. Nap at 10am in her crib. Bath at 6:30pm. Bedtime at 7:30pm."
+        unchunked = ParserService(hardened=False)
+        unchunked.use_ai_assist = False
+
+        chunked_events = self.parser.parse_routine(text, self.user_id)['routine']
+        unchunked_events = unchunked.parse_routine(text, self.user_id)['routine']
+
+        self.assertEqual(
+            [(e['type'], e.get('start_time')) for e in chunked_events],
+            [(e['type'], e.get('start_time')) for e in unchunked_events]
+        )
+
+    def test_split_into_chunks_respects_size(self):
+        """Test that chunks stay within the size limit and cover the text."""
+        text = "nap at 1pm. " * 20 + "x" * 150
+        chunks = self.parser._split_into_chunks(text, 60)
+
+        self.assertEqual(''.join(chunks), text)
+        self.assertTrue(all(len(chunk) <= 60 for chunk in chunks))
+
+    def test_abbreviations_expand_whole_tokens_only(self):
+        """Test that abbreviations do not corrupt longer words."""
+        normalized = self.parser._normalize_text("30 mins nap, 2hrs later approx. three minutes")
+
+        self.assertEqual(normalized, "30 minutes nap, 2hours later approximately three minutes")
+
+    def test_worst_case_inputs_scale_linearly(self):
+        """Benchmark adversarial inputs and fail if parse time grows super-linearly."""
+        parser = ParserService(hardened=False)
+        parser.use_ai_assist = False
+
+        def best_time(text):
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                parser.parse_routine(text, self.user_id)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        for name, make_input in ADVERSARIAL_GENERATORS.items():
+            small = best_time(make_input(4000))
+            large = best_time(make_input(16000))
+
+            # Linear growth gives a ratio near 4, quadratic growth near 16
+            self.assertLess(large, max(small, 0.001) * 8, f"{name} scaled super-linearly")
+            self.assertLess(large, 1.0, f"{name} took {large:.3f}s")
+
+    def test_long_journals_scale_linearly(self):
+        """Benchmark journals with many events and fail on super-linear growth."""
+        parser = ParserService(hardened=False)
+        parser.use_ai_assist = False
+        sentence = "Nap at 1pm in the crib. 30 minutes after nap, bottle. "
+
+        def best_time(text):
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                parser.parse_routine(text, self.user_id)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        small = best_time(sentence * 100)
+        large = best_time(sentence * 400)
+
+        self.assertLess(large, small * 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parser_service import ParserService
+from services.metrics import MetricsRegistry, NULL_TRACE
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test cases for the MetricsRegistry."""
+
+    def test_counters_and_timers(self):
+        """Test that counters add up and timers aggregate."""
+        registry = MetricsRegistry()
+        registry.increment('a')
+        registry.increment('a', 2)
+        registry.observe('t', 0.002)
+        registry.observe('t', 0.004)
+
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot['counters']['a'], 3)
+        self.assertEqual(snapshot['timers']['t']['count'], 2)
+        self.assertAlmostEqual(snapshot['timers']['t']['total_ms'], 6.0)
+        self.assertAlmostEqual(snapshot['timers']['t']['max_ms'], 4.0)
+
+    def test_sampling_switch(self):
+        """Test that sample rate 0 never traces and 1 always does."""
+        registry = MetricsRegistry()
+        self.assertIs(registry.trace('x', 0), NULL_TRACE)
+        self.assertIsNot(registry.trace('x', 1), NULL_TRACE)
+        self.assertEqual(registry.snapshot()['counters']['x.sampled'], 1)
+
+class TestParserInstrumentation(unittest.TestCase):
+    """Test cases for the ParserService instrumentation."""
+
+    def setUp(self):
+        """Set up a parser recording into a private registry."""
+        self.registry = MetricsRegistry()
+        self.parser = ParserService(metrics_sample_rate=1.0)
+        self.parser.metrics = self.registry
+        self.parser.use_ai_assist = False
+
+    def test_records_stage_timings_and_matches(self):
+        """Test that every parse stage is timed and matches are counted."""
+        self.parser.parse_routine("Bottle at 8am. Nap in the afternoon. 2 hours after nap, bath.", "test_user_123")
+
+        snapshot = self.registry.snapshot()
+        for stage in ('parse_routine', 'normalize', 'absolute', 'relative', 'relative.time_of_day',
+                      'duration', 'location', 'normalize_time', 'baby_name', 'confidence'):
+            self.assertIn(f'parser.{stage}', snapshot['timers'])
+        self.assertEqual(snapshot['counters']['parser.absolute.matches'], 1)
+        self.assertEqual(snapshot['counters']['parser.ai_fallback.unavailable'], 1)
+
+    def test_confidence_calculated_once(self):
+        """Test that the confidence score is only computed once per parse."""
+        self.parser.parse_routine("Bottle at 8am.", "test_user_123")
+
+        self.assertEqual(self.registry.snapshot()['timers']['parser.confidence']['count'], 1)
+
+    def test_unsampled_parse_records_nothing(self):
+        """Test that a zero sample rate leaves the registry empty."""
+        self.parser.metrics_sample_rate = 0
+        self.parser.parse_routine("Bottle at 8am.", "test_user_123")
+
+        self.assertEqual(self.registry.snapshot(), {'counters': {}, 'timers': {}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import unittest
+from unittest import mock
+import sys
+import os
+import datetime
+import tempfile
+import shutil
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parser_service import ParserService
+from data_manager import DataManager
+from services.event_index import EventIndex
+from services.event_model import Event
+from services.parser_session import ParserSessionManager
+from sms_service import SMSService
+
+class TestEventIndex(unittest.TestCase):
+    """Test cases for the EventIndex."""
+
+    def test_latest_by_type_and_time(self):
+        """Test lookups of the latest event of a type."""
+        index = EventIndex([
+            Event('nap', start=13 * 60),
+            Event('nap', start=9 * 60 + 30),
+            Event('feeding', start=11 * 60),
+            Event('diaper'),
+        ])
+
+        self.assertEqual(index.latest('nap').start, 13 * 60)
+        self.assertEqual(index.latest('nap', before=12 * 60).start, 9 * 60 + 30)
+        self.assertIsNone(index.latest('nap', before=9 * 60))
+        self.assertIsNone(index.latest('bath'))
+        self.assertEqual([e.start for e in index.events()], [570, 660, 780, None])
+        self.assertEqual(len(index), 4)
+
+    def test_span_lookups(self):
+        """Test overlap checks and nearest-earlier-mention lookups by text offset."""
+        index = EventIndex()
+        first = Event('wake', start=6 * 60)
+        second = Event('wake', start=7 * 60)
+        untimed = Event('diaper')
+        index.add(first, (0, 12))
+        index.add(second, (14, 26))
+        index.add(untimed, (40, 46))
+
+        self.assertEqual(index.overlapping((10, 15)), [first, second])
+        self.assertEqual(index.overlapping((26, 40)), [])
+        self.assertEqual(index.span_of(second), (14, 26))
+        self.assertIs(index.latest_mention('wake', 14), first)
+        self.assertIs(index.latest_mention('wake', 30), second)
+        self.assertIsNone(index.latest_mention('wake', 0))
+        self.assertIsNone(index.latest_mention('diaper', 50))
+
+class TestParserSession(unittest.TestCase):
+    """Test cases for incremental per-user parser sessions."""
+
+    def setUp(self):
+        """Set up a data manager in a temporary directory."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.parser = ParserService()
+        self.parser.use_ai_assist = False
+        self.sessions = ParserSessionManager(self.parser, self.data_manager)
+        self.user_id = "test_user_123"
+        self.date = "2025-01-15"
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_relative_reference_resolves_against_earlier_message(self):
+        """Test that "after nap" resolves against a nap from an earlier message."""
+        self.sessions.ingest(self.user_id, "nap at 1pm", self.date)
+        self.sessions.ingest(self.user_id, "up at 2:30pm", self.date)
+        events = self.sessions.ingest(self.user_id, "2 hours after nap, bottle", self.date)
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['type'], 'feeding')
+        self.assertEqual(events[0]['start_time'], '15:00')
+        self.assertEqual(events[0]['reference'], 'relative to nap at 13:00')
+
+    def test_timeline_is_persisted_incrementally(self):
+        """Test that a new manager reloads the stored day timeline."""
+        self.sessions.ingest(self.user_id, "nap at 1pm", self.date)
+        self.sessions.ingest(self.user_id, "bottle at 11am", self.date)
+
+        self.assertEqual(len(self.data_manager.get_timeline(self.user_id, self.date)), 2)
+
+        reloaded = ParserSessionManager(self.parser, self.data_manager)
+        timeline = reloaded.get_timeline(self.user_id, self.date)
+        self.assertEqual([e['start_time'] for e in timeline], ['11:00', '13:00'])
+
+        events = reloaded.ingest(self.user_id, "30 minutes after nap, diaper change", self.date)
+        self.assertEqual(events[0]['start_time'], '13:30')
+
+    def test_sessions_follow_appends_by_other_processes(self):
+        """Test that a cached session sees events another worker appended to the stored timeline."""
+        other_manager = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file
+        )
+        other_sessions = ParserSessionManager(self.parser, other_manager)
+        self.assertEqual(other_sessions.get_timeline(self.user_id, self.date), [])
+
+        self.sessions.ingest(self.user_id, "nap at 13:00", self.date)
+        events = other_sessions.ingest(self.user_id, "2 hours after nap fed", self.date)
+
+        self.assertEqual([e['start_time'] for e in events], ['15:00'])
+        self.assertEqual([e['type'] for e in other_sessions.get_timeline(self.user_id, self.date)], ['nap', 'feeding'])
+        self.assertEqual([e['type'] for e in self.sessions.get_timeline(self.user_id, self.date)], ['nap', 'feeding'])
+        self.assertEqual(len(self.data_manager.get_timeline(self.user_id, self.date)), 2)
+
+    def test_timeline_paths_stay_in_the_data_directory(self):
+        """Test that dates must be ISO dates and user IDs cannot name a parent directory."""
+        result = self.data_manager.append_timeline_events([{'type': 'nap'}], 'u', '../../../escape')
+        self.assertIn('error', result)
+        self.assertEqual(self.data_manager.get_timeline('u', '../../../escape'), [])
+
+        self.data_manager.append_timeline_events([{'type': 'nap'}], '..', self.date)
+        path = self.data_manager._timeline_path('..', self.date)
+        self.assertTrue(os.path.abspath(path).startswith(os.path.abspath(self.data_manager.timelines_dir) + os.sep))
+        self.assertEqual(os.path.basename(os.path.dirname(path)), '__')
+        self.assertFalse(os.path.exists(os.path.join(self.data_manager.timelines_dir, 'u', '../../../escape.jsonl')))
+
+    def test_sessions_are_separate_per_day(self):
+        """Test that references do not cross days."""
+        self.sessions.ingest(self.user_id, "nap at 1pm", self.date)
+        events = self.sessions.ingest(self.user_id, "2 hours after nap, bottle", "2025-01-16")
+
+        self.assertEqual(events, [])
+
+class TestSMSRoutineUpdates(unittest.TestCase):
+    """Test cases for routine updates sent by SMS."""
+
+    def setUp(self):
+        """Set up an SMS service whose AI assistant must not be called."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        parser = ParserService()
+        parser.use_ai_assist = False
+        self.sms_service = SMSService(self.data_manager, parser_sessions=ParserSessionManager(parser, self.data_manager))
+        self.sms_service.openai_service = None
+        self.user_id = "test_user_123"
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_updates_with_parenting_words_are_parsed(self):
+        """Test that updates mentioning naps and feeds go to the timeline, not the AI assistant."""
+        first = self.sms_service.process_sms("nap at 1", "+15550000000", self.user_id)
+        second = self.sms_service.process_sms("2 hours after nap fed", "+15550000000", self.user_id)
+
+        self.assertNotIn('ai_response', first)
+        self.assertNotIn('ai_response', second)
+        timeline = self.data_manager.get_timeline(self.user_id, datetime.date.today().isoformat())
+        self.assertEqual([event['type'] for event in timeline], ['nap', 'feeding'])
+        self.assertTrue(timeline[1]['reference'].startswith('relative to nap'))
+
+    def test_questions_are_not_parsed(self):
+        """Test that a message phrased as a question is not parsed as an update."""
+        self.sms_service.query_engine = None
+        self.sms_service.openai_service = mock.Mock()
+        self.sms_service.openai_service.get_response.return_value = "Answer"
+
+        result = self.sms_service.process_sms("Is a nap at 1 too late?", "+15550000000", self.user_id)
+
+        self.assertEqual(result['ai_response'], "Answer")
+        self.assertNotIn('parsed_events', result)
+        self.assertEqual(self.data_manager.get_timeline(self.user_id, datetime.date.today().isoformat()), [])
+
+if __name__ == '__main__':
+    unittest.main()
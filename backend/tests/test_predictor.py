@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from services.analytics import RoutineAnalytics
+from services.predictor import RollingStats, RoutinePredictor
+from services.routine_query import RoutineQueryEngine
+
+class TestRollingStats(unittest.TestCase):
+    """Test cases for the O(1) rolling statistics."""
+
+    def test_window_drops_oldest_values(self):
+        """Test that mean and deviation only cover the most recent values."""
+        stats = RollingStats([100, 200], window=3)
+        stats.add(130)
+        stats.add(170)
+
+        self.assertEqual(stats.count, 3)
+        self.assertAlmostEqual(stats.mean, 500 / 3)
+        self.assertAlmostEqual(stats.std, 28.674, places=3)
+
+class TestRoutinePredictor(unittest.TestCase):
+    """Test cases for next-event predictions."""
+
+    def setUp(self):
+        """Set up three days of history."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.user_id = "test_user_123"
+        for day in ('2025-01-13', '2025-01-14'):
+            self.data_manager.add_caregiver_update({
+                'date': day,
+                'parsed_events': [
+                    {'type': 'nap', 'start_time': '09:00', 'duration': '60 minutes'},
+                    {'type': 'nap', 'start_time': '12:00', 'duration': '90 minutes'},
+                    {'type': 'feeding', 'start_time': '07:00'},
+                    {'type': 'feeding', 'start_time': '10:00'},
+                    {'type': 'feeding', 'start_time': '13:00'},
+                ],
+            }, self.user_id)
+        self.predictor = RoutinePredictor(self.data_manager, RoutineAnalytics(self.data_manager))
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_prediction_from_history(self):
+        """Test predictions from the stored history."""
+        self.assertIsNone(self.predictor.predict(self.user_id, 'nap'))
+
+        prediction = self.predictor.predict(self.user_id, 'feeding')
+        self.assertEqual(prediction['predicted_at'], '2025-01-14T16:00')
+        self.assertEqual(prediction['samples'], 4)
+        self.assertIsNone(self.predictor.predict(self.user_id, 'bath'))
+
+    def test_model_updates_incrementally(self):
+        """Test that new updates refine a cached model without a rebuild."""
+        self.predictor.predict(self.user_id, 'nap')
+        self.predictor._build_model = None
+
+        self.data_manager.add_caregiver_update({
+            'date': '2025-01-15',
+            'parsed_events': [
+                {'type': 'nap', 'start_time': '09:30', 'duration': '60 minutes'},
+                {'type': 'nap', 'start_time': '12:30', 'duration': '60 minutes'},
+                {'type': 'feeding', 'start_time': '07:00'},
+                {'type': 'feeding', 'start_time': '11:00'},
+            ],
+        }, self.user_id)
+
+        nap = self.predictor.predict(self.user_id, 'nap')
+        self.assertEqual(nap['samples'], 3)
+        self.assertEqual(nap['since'], '2025-01-15T13:30')
+        self.assertEqual(nap['predicted_at'], '2025-01-15T15:30')
+
+        feeding = self.predictor.predict(self.user_id, 'feeding')
+        self.assertEqual(feeding['samples'], 5)
+        self.assertEqual(feeding['predicted_at'], '2025-01-15T14:12')
+
+    def test_model_follows_writes_by_other_processes(self):
+        """Test that a model is rebuilt after another worker stores records it did not see."""
+        self.assertEqual(self.predictor.predict(self.user_id, 'feeding')['samples'], 4)
+
+        other_manager = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file
+        )
+        other_manager.add_caregiver_update({
+            'date': '2025-01-15',
+            'parsed_events': [{'type': 'feeding', 'start_time': '07:00'}, {'type': 'feeding', 'start_time': '11:00'}],
+        }, self.user_id)
+        # This worker's own write reaches the model through the listener, but the counts show one missed
+        self.data_manager.add_caregiver_update({'date': '2025-01-15', 'parsed_events': [{'type': 'feeding', 'start_time': '14:00'}]}, self.user_id)
+
+        feeding = self.predictor.predict(self.user_id, 'feeding')
+        self.assertEqual(feeding['samples'], 6)
+        self.assertEqual(feeding['since'], '2025-01-15T14:00')
+
+    def test_writes_for_other_users_keep_the_model(self):
+        """Test that records stored for another user, here or by another worker, do not rebuild a model."""
+        self.predictor.predict(self.user_id, 'feeding')
+        self.predictor._build_model = None  # Any rebuild would fail
+
+        other_manager = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file
+        )
+        other_manager.add_caregiver_update({'date': '2025-01-15', 'type': 'feeding', 'start_time': '07:00'}, 'other_user')
+        self.data_manager.add_routine({'date': '2025-01-15', 'routine': [{'type': 'nap', 'start_time': '09:00'}]}, 'other_user')
+
+        self.assertEqual(self.predictor.predict(self.user_id, 'feeding')['samples'], 4)
+
+    def test_next_question_is_answered(self):
+        """Test that the query engine answers "when is the next feed" questions."""
+        engine = RoutineQueryEngine(self.data_manager, self.predictor)
+
+        self.assertEqual(
+            engine.answer(self.user_id, "When is the next feed likely?"),
+            "The next feeding is likely around 4:00pm, based on the last 4 feeding intervals."
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import MetricsRegistry
+from services.openai_service import OpenAIService
+from services.prompt_budget import PromptBudget, count_tokens, summarize_activities
+from services.response_cache import ResponseCache
+
+def make_routine(days):
+    """Build routine data with a nap, a feeding and a diaper change every hour of several days."""
+    activities = []
+    for day in range(days):
+        for hour in range(7, 19):
+            activities.append({'type': 'nap', 'start_time': f'{hour:02d}:00', 'duration': f'{30 + day} minutes'})
+            activities.append({'type': 'feeding', 'start_time': f'{hour:02d}:20', 'actual_time': f'{hour:02d}:25'})
+            activities.append({'type': 'diaper', 'start_time': f'{hour:02d}:40'})
+    return {'baby_name': 'Emma', 'routine': activities}
+
+class TestPromptBudget(unittest.TestCase):
+    """Test cases for fitting routine prompts to a token budget."""
+
+    def setUp(self):
+        """Set up a budget with its own metrics."""
+        self.metrics = MetricsRegistry()
+        self.budget = PromptBudget(max_tokens=200, metrics=self.metrics)
+
+    def test_count_tokens(self):
+        """Test that words, punctuation and long words are counted."""
+        self.assertEqual(count_tokens(""), 0)
+        self.assertEqual(count_tokens("- nap scheduled for 09:00"), 9)
+        self.assertEqual(count_tokens("understanding"), 4)
+
+    def test_short_history_is_unchanged(self):
+        """Test that a history within the budget is listed in full."""
+        context, report = self.budget.routine_context({'baby_name': 'Emma', 'routine': [
+            {'type': 'nap', 'start_time': '09:00'},
+            {'type': 'feeding', 'start_time': '10:00', 'actual_time': '10:15'},
+        ]})
+        self.assertEqual(context, (
+            "The following is data about Emma's routine:\n"
+            "- nap scheduled for 09:00\n"
+            "- feeding scheduled for 10:00, actually happened at 10:15\n"
+        ))
+        self.assertEqual(report['tokens_saved'], 0)
+        self.assertEqual(report['summarized'], 0)
+        self.assertNotIn('prompt.compressed', self.metrics.snapshot()['counters'])
+
+    def test_long_history_is_compressed(self):
+        """Test that older activities become statistics and the newest are kept verbatim."""
+        context, report = self.budget.routine_context(make_routine(7))
+        self.assertLessEqual(count_tokens(context), 200)
+        self.assertEqual(report['tokens'], count_tokens(context))
+        self.assertEqual(report['activities'], 252)
+        self.assertGreater(report['summarized'], 200)
+        self.assertGreater(report['tokens_saved'], 2000)
+
+        self.assertIn("Earlier activities:\n- nap: ", context)
+        self.assertTrue(context.endswith("- diaper scheduled for 18:40\n"))
+        self.assertEqual(self.metrics.snapshot()['counters']['prompt.tokens_saved'], report['tokens_saved'])
+
+    def test_summarize_activities(self):
+        """Test the per-type counts, time ranges and mean durations."""
+        lines = summarize_activities(make_routine(2)['routine'])
+        self.assertEqual(lines, [
+            "- nap: 24x, 07:00-18:00, avg 30 min",
+            "- feeding: 24x, 07:25-18:25",
+            "- diaper: 24x, 07:40-18:40",
+        ])
+
+    def test_suggestions_prompt_is_bounded(self):
+        """Test that get_suggestions sends the compressed history."""
+        service = OpenAIService(cache=ResponseCache(metrics=MetricsRegistry()), prompt_budget=self.budget,
+                                breaker=CircuitBreaker(metrics=MetricsRegistry()))
+        service.api_key = 'test-key'
+        response = {'choices': [{'message': {'content': "One.\nTwo.\nThree."}}], 'usage': {'total_tokens': 10}}
+
+        with mock.patch.object(service.llm_client, 'chat_completion', return_value=response) as completion:
+            self.assertEqual(service.get_suggestions(make_routine(30)), ["One.", "Two.", "Three."])
+
+        prompt = completion.call_args[0][0][1]['content']
+        self.assertLess(count_tokens(prompt), 260)
+        self.assertIn("Earlier activities:", prompt)
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import sys
+import os
+import time
+import datetime
+import tempfile
+import shutil
+import threading
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from services.analytics import RoutineAnalytics
+from services.file_lock import acquire_process_lock
+from services.predictor import RoutinePredictor
+from services.reminders import ReminderScheduler, RoutineReminders
+
+class TestReminderScheduler(unittest.TestCase):
+    """Test cases for the heap-based reminder scheduler."""
+
+    def setUp(self):
+        """Set up a scheduler with a journal in a temporary directory."""
+        self.data_dir = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.data_dir, 'reminders.jsonl')
+        self.sent = []
+        self.scheduler = ReminderScheduler(self.journal_path, [self.sent.append])
+
+    def tearDown(self):
+        """Stop the scheduler and remove the temporary directory."""
+        self.scheduler.stop()
+        shutil.rmtree(self.data_dir)
+
+    def test_due_reminders_in_order(self):
+        """Test that only due reminders are dispatched, earliest first."""
+        self.scheduler.schedule('a', 'third', 300)
+        self.scheduler.schedule('b', 'first', 100)
+        self.scheduler.schedule('c', 'second', 200)
+
+        self.assertEqual(self.scheduler.dispatch_due(now=250), 2)
+        self.assertEqual([r.message for r in self.sent], ['first', 'second'])
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_key_replaces_pending_reminder(self):
+        """Test that rescheduling with a key replaces the earlier reminder."""
+        self.scheduler.schedule('a', 'old', 100, key='a:nap')
+        self.scheduler.schedule('a', 'new', 200, key='a:nap')
+
+        self.assertEqual(len(self.scheduler), 1)
+        self.scheduler.dispatch_due(now=1000)
+        self.assertEqual([r.message for r in self.sent], ['new'])
+
+    def test_queue_survives_restart(self):
+        """Test that pending reminders are reloaded from the journal."""
+        kept = self.scheduler.schedule('a', 'kept', 200)
+        cancelled = self.scheduler.schedule('a', 'cancelled', 150)
+        self.scheduler.schedule('a', 'done', 100)
+        self.scheduler.cancel(cancelled.id)
+        self.scheduler.dispatch_due(now=120)
+        self.scheduler.stop()
+
+        restarted = ReminderScheduler(self.journal_path)
+        self.assertEqual(len(restarted), 1)
+        self.assertEqual([r.id for r in restarted.pop_due(now=1000)], [kept.id])
+        self.assertNotEqual(restarted.schedule('a', 'next', 300).id, kept.id)
+        restarted.stop()
+
+    def test_dispatch_thread_wakes_for_due_reminders(self):
+        """Test that the background thread dispatches a reminder when it is due."""
+        dispatched = threading.Event()
+        self.scheduler.dispatchers = [lambda reminder: dispatched.set()]
+        self.scheduler.start()
+        self.scheduler.schedule('a', 'soon', time.time() + 0.05)
+
+        self.assertTrue(dispatched.wait(2))
+
+    def test_many_pending_reminders(self):
+        """Test scheduling and draining 100k reminders."""
+        started = time.perf_counter()
+        for i in range(100000):
+            self.scheduler.schedule(f"user_{i % 1000}", 'reminder', (i * 7919) % 100000)
+        self.assertEqual(len(self.scheduler), 100000)
+
+        due = self.scheduler.pop_due(now=100000)
+        self.assertEqual(len(due), 100000)
+        self.assertEqual([r.due_at for r in due[:3]], [0, 1, 2])
+        self.assertLess(time.perf_counter() - started, 10)
+
+class TestRoutineReminders(unittest.TestCase):
+    """Test cases for reminders scheduled from predictions."""
+
+    def setUp(self):
+        """Set up a data manager with a predictor and routine reminders."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        now = datetime.datetime(2025, 1, 15, 8, 0).timestamp()
+        self.scheduler = ReminderScheduler(os.path.join(self.data_dir, 'reminders.jsonl'), clock=lambda: now)
+        predictor = RoutinePredictor(self.data_manager, RoutineAnalytics(self.data_manager))
+        self.reminders = RoutineReminders(self.scheduler, predictor, self.data_manager, lead_minutes=15)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.scheduler.stop()
+        shutil.rmtree(self.data_dir)
+
+    def test_feeding_reminder_follows_latest_update(self):
+        """Test that each update replaces the user's feeding reminder."""
+        for start in ('07:00', '08:30', '10:00'):
+            self.data_manager.add_caregiver_update({'date': '2025-01-15', 'type': 'feeding', 'start_time': start}, 'u')
+        self.data_manager.add_caregiver_update({'date': '2025-01-15', 'type': 'feeding', 'start_time': '11:30'}, 'u')
+
+        self.assertEqual(self.reminders.poll(), ['u'])
+        self.assertEqual(self.reminders.poll(), [])
+        self.assertEqual(len(self.scheduler), 1)
+        reminder = self.scheduler.pop_due(now=float('inf'))[0]
+        self.assertEqual(reminder.message, "Feeding due in about 15 minutes (1:00 PM).")
+        self.assertEqual(reminder.due_at, datetime.datetime(2025, 1, 15, 12, 45).timestamp())
+
+    def test_updates_from_other_processes_are_seen(self):
+        """Test that records stored by another worker's data manager reschedule reminders."""
+        other_worker = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file
+        )
+        for start in ('07:00', '08:30', '10:00', '11:30'):
+            other_worker.add_caregiver_update({'date': '2025-01-15', 'type': 'feeding', 'start_time': start}, 'u')
+
+        self.assertEqual(self.reminders.poll(), ['u'])
+        reminder = self.scheduler.pop_due(now=float('inf'))[0]
+        self.assertEqual(reminder.message, "Feeding due in about 15 minutes (1:00 PM).")
+
+    def test_poll_reschedules_only_the_users_written(self):
+        """Test that a poll follows the change log instead of reloading every user's records."""
+        self.data_manager.get_all_routines = None
+        self.data_manager.get_all_caregiver_updates = None
+        self.assertEqual(self.reminders.poll(), [])
+
+        self.data_manager.add_caregiver_update({'date': '2025-01-15', 'type': 'feeding', 'start_time': '07:00'}, 'a')
+        self.data_manager.add_routine({'date': '2025-01-15', 'routine': [{'type': 'nap', 'start_time': '09:00'}]}, 'b')
+        self.data_manager.add_caregiver_update({'date': '2025-01-15', 'type': 'diaper'}, 'a')
+        self.data_manager.update_user('c', {'id': 'c', 'email': 'c@example.com'})
+
+        self.assertEqual(self.reminders.poll(), ['a', 'b'])
+        self.assertEqual(self.reminders.poll(), [])
+
+class TestProcessLock(unittest.TestCase):
+    """Test cases for running background jobs in one process only."""
+
+    def test_only_one_holder(self):
+        """Test that a second claim fails until the holder lets go."""
+        data_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(data_dir, 'reminders.jsonl.lock')
+            holder = acquire_process_lock(path)
+            self.assertIsNotNone(holder)
+            self.assertIsNone(acquire_process_lock(path))
+
+            holder.close()
+            successor = acquire_process_lock(path)
+            self.assertIsNotNone(successor)
+            successor.close()
+        finally:
+            shutil.rmtree(data_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from unittest import mock
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import MetricsRegistry
+from services.response_cache import ResponseCache, make_cache_key, normalize_query
+from services.openai_service import OpenAIService
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for the two-tier AI response cache."""
+
+    def setUp(self):
+        """Set up a temporary directory, a clock and a metrics registry."""
+        self.cache_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.metrics = MetricsRegistry()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.cache_dir)
+
+    def make_cache(self, **kwargs):
+        return ResponseCache(metrics=self.metrics, clock=self.clock, **kwargs)
+
+    def test_keys(self):
+        """Test that keys ignore case and spacing but not context, model or temperature."""
+        self.assertEqual(normalize_query("  Is it normal   that she naps a lot?? "), "is it normal that she naps a lot")
+
+        key = make_cache_key("Is it normal?", "context", "gpt-3.5-turbo", 0.7)
+        self.assertEqual(key, make_cache_key("is it  normal", "context", "gpt-3.5-turbo", 0.7))
+        self.assertNotEqual(key, make_cache_key("Is it normal?", "other context", "gpt-3.5-turbo", 0.7))
+        self.assertNotEqual(key, make_cache_key("Is it normal?", "context", "gpt-4", 0.7))
+        self.assertNotEqual(key, make_cache_key("Is it normal?", "context", "gpt-3.5-turbo", 0.2))
+
+    def test_ttl_and_lru(self):
+        """Test that entries expire after the TTL and the least recently used is evicted."""
+        cache = self.make_cache(max_entries=2, ttl_seconds=60)
+        cache.set('a', 'answer a')
+        cache.set('b', 'answer b')
+        self.assertEqual(cache.get('a'), 'answer a')
+
+        cache.set('c', 'answer c')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'answer a')
+
+        self.clock.now += 61
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 1)
+
+        counters = self.metrics.snapshot()['counters']
+        self.assertEqual(counters['response_cache.hits'], 2)
+        self.assertEqual(counters['response_cache.misses'], 2)
+        self.assertEqual(counters['response_cache.evictions'], 1)
+
+    def test_disk_tier_is_shared(self):
+        """Test that a value stored by one worker's cache is a hit in another's."""
+        path = os.path.join(self.cache_dir, 'responses.sqlite')
+        first = self.make_cache(disk_path=path, ttl_seconds=60)
+        second = self.make_cache(disk_path=path, ttl_seconds=60)
+
+        first.set('key', ['one', 'two'])
+        self.assertEqual(second.get('key'), ['one', 'two'])
+        self.assertEqual(self.metrics.snapshot()['counters']['response_cache.disk_hits'], 1)
+
+        self.clock.now += 61
+        self.assertIsNone(self.make_cache(disk_path=path).get('key'))
+
+class TestOpenAIServiceCache(unittest.TestCase):
+    """Test cases for response caching in OpenAIService."""
+
+    def setUp(self):
+        """Set up a service with a memory cache and a fake API key."""
+        self.service = OpenAIService(cache=ResponseCache(metrics=MetricsRegistry()), breaker=CircuitBreaker(metrics=MetricsRegistry()))
+        self.service.api_key = 'test-key'
+
+    def completion(self, text):
+        return {'choices': [{'message': {'role': 'assistant', 'content': text}}]}
+
+    def test_repeated_question_skips_the_api(self):
+        """Test that a repeated question with unchanged context costs no API call."""
+        baby_data = {'baby_name': 'Emma', 'routine': [{'type': 'nap', 'start_time': '13:00'}]}
+        with mock.patch.object(self.service.llm_client, 'chat_completion', return_value=self.completion("Yes, that's normal.")) as create:
+            first = self.service.get_response("Is it normal that she naps a lot?", baby_data=baby_data)
+            second = self.service.get_response("is it normal that she naps a lot", baby_data=baby_data)
+            self.assertEqual(first, second)
+            self.assertEqual(create.call_count, 1)
+
+            # New routine context is a different question
+            baby_data['routine'].append({'type': 'feeding', 'start_time': '15:00'})
+            self.service.get_response("Is it normal that she naps a lot?", baby_data=baby_data)
+            self.assertEqual(create.call_count, 2)
+
+    def test_errors_are_not_cached(self):
+        """Test that failed calls are retried rather than served from the cache."""
+        with mock.patch.object(self.service.llm_client, 'chat_completion', side_effect=RuntimeError("timeout")) as create:
+            self.service.get_response("Is it normal?")
+            self.service.get_response("Is it normal?")
+            self.assertEqual(create.call_count, 2)
+
+    def test_suggestions_are_cached(self):
+        """Test that suggestions for the same routine are generated once."""
+        routine_data = {'baby_name': 'Emma', 'routine': [{'type': 'nap', 'start_time': '13:00'}]}
+        with mock.patch.object(self.service.llm_client, 'chat_completion', return_value=self.completion("One.\nTwo.\nThree.\nFour.")) as create:
+            self.assertEqual(self.service.get_suggestions(routine_data), ['One.', 'Two.', 'Three.'])
+            self.assertEqual(self.service.get_suggestions(routine_data), ['One.', 'Two.', 'Three.'])
+            self.assertEqual(create.call_count, 1)
+if __name__ == '__main__':
+    unittest.main()
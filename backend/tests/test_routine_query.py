@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import datetime
+import tempfile
+import shutil
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from services.routine_query import RoutineQueryEngine
+from sms_service import SMSService
+
+class TestRoutineQueryEngine(unittest.TestCase):
+    """Test cases for answering fact questions from stored data."""
+
+    def setUp(self):
+        """Set up a data manager with one logged day."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.user_id = "test_user_123"
+        self.now = datetime.datetime(2025, 1, 15, 16, 45)
+        self.data_manager.add_caregiver_update({
+            'timestamp': '2025-01-15T15:00:00',
+            'parsed_events': [
+                {'type': 'nap', 'start_time': '09:00', 'duration': '60 minutes'},
+                {'type': 'nap', 'start_time': '13:00', 'duration': '90 minutes'},
+                {'type': 'feeding', 'start_time': '14:30'},
+                {'type': 'diaper'},
+                {'type': 'diaper'},
+            ],
+        }, self.user_id)
+        self.data_manager.add_caregiver_update({'date': '2025-01-14', 'type': 'bath', 'start_time': '18:30'}, self.user_id)
+        self.engine = RoutineQueryEngine(self.data_manager)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def ask(self, question):
+        return self.engine.answer(self.user_id, question, now=self.now)
+
+    def test_fact_questions(self):
+        """Test last event, count, duration and time-since answers."""
+        self.assertEqual(self.ask("When did she last nap?"), "The last nap was at 1:00pm today (90 minutes).")
+        self.assertEqual(self.ask("how many diapers today?"), "2 diaper changes so far today.")
+        self.assertEqual(self.ask("How long did he nap today?"), "2 hr 30 min of nap across 2 naps today.")
+        self.assertEqual(self.ask("How long since she ate?"), "2 hr 15 min since the last feeding at 2:30pm.")
+        self.assertEqual(self.ask("When was the last bath?"), "The last bath was at 6:30pm yesterday.")
+        self.assertEqual(self.ask("When did she last poop?"), "A diaper change was logged today, without a time.")
+        self.assertEqual(self.ask("last walk?"), "No walks logged today or yesterday.")
+
+    def test_open_ended_questions_are_not_answered(self):
+        """Test that open-ended questions are left to the AI assistant."""
+        self.assertIsNone(self.ask("Is it normal for a 6 month old to nap this much?"))
+        self.assertIsNone(self.ask("What should I do about teething?"))
+        self.assertIsNone(self.ask("what's up with her last bottle? should I be worried?"))
+        self.assertIsNone(self.ask("When was her last nap, and is that enough?"))
+
+    def test_health_and_amount_questions_are_not_answered(self):
+        """Test that questions about spit-up, amounts and vaccines are not read as activity questions."""
+        for question in (
+            "How many times has she thrown up today?",
+            "how many times did she spit up after her bottle",
+            "how long since she threw up",
+            "Has he vomited since his last feed?",
+            "How many ounces did she eat today?",
+            "how many ml was her last bottle",
+            "When is the next vaccine due for feeding clinic",
+            "how many times did we stop at the store on the walk",
+        ):
+            self.assertIsNone(self.engine.classify(question), question)
+
+        self.assertEqual(self.engine.classify("When did she wake up?"), ('last', 'wake'))
+
+    def test_sleep_questions_include_naps(self):
+        """Test that sleep questions are answered from naps too, as the parser files daytime sleep as a nap."""
+        self.assertEqual(self.ask("when did she last sleep?"), "The last sleep was at 1:00pm today (90 minutes).")
+        self.assertEqual(self.ask("how many times did she sleep today?"), "2 sleeps so far today.")
+        self.assertEqual(self.ask("How long did she sleep today?"), "2 hr 30 min of sleep across 2 sleeps today.")
+
+class TestSMSLocalAnswers(unittest.TestCase):
+    """Test cases for the SMSService use of the query engine."""
+
+    def setUp(self):
+        """Set up an SMS service whose AI assistant must not be called."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.sms_service = SMSService(self.data_manager)
+        self.sms_service.openai_service = None
+        self.user_id = "test_user_123"
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_fact_question_is_answered_without_ai(self):
+        """Test that a fact question is answered locally and stored once."""
+        self.data_manager.add_caregiver_update({'type': 'diaper', 'start_time': '10:00'}, self.user_id)
+
+        result = self.sms_service.process_sms("How many diapers today?", "+15550000000", self.user_id)
+
+        self.assertTrue(result['answered_locally'])
+        self.assertEqual(result['ai_response'], "1 diaper change so far today.")
+        self.assertEqual(len(self.data_manager.get_caregiver_updates(self.user_id)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
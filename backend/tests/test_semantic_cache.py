@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import MetricsRegistry
+from services.enhancement_batcher import ACTIVITY_FIELDS, SINGLE_PROMPT
+from services.semantic_cache import HashedVectorizer, SemanticCache, question_signature
+from services.response_cache import ResponseCache
+from services.openai_service import OpenAIService
+
+CONTEXT = "You are a helpful parenting assistant."
+
+class TestSemanticCache(unittest.TestCase):
+    """Test cases for the paraphrase cache of AI answers."""
+
+    def setUp(self):
+        """Set up a cache with its own metrics registry."""
+        self.metrics = MetricsRegistry()
+        self.cache = SemanticCache(metrics=self.metrics)
+
+    def test_vectors(self):
+        """Test that vectors are unit length and paraphrases are close."""
+        vectorizer = HashedVectorizer()
+        vector = vectorizer.embed("How much should a 6 month old sleep?")
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        self.assertFalse(vectorizer.embed("is it?").any())
+
+        similar = vectorizer.embed("how many hours should a 6 month old sleep") @ vectorizer.embed("6mo sleep hours")
+        different = vectorizer.embed("is it normal that she naps a lot") @ vectorizer.embed("is it normal that she cries a lot")
+        self.assertGreater(similar, 0.85)
+        self.assertLess(different, 0.85)
+
+    def test_paraphrase_hits(self):
+        """Test that a paraphrased question gets the stored answer."""
+        self.cache.add("Is it normal that my baby spits up after feeding?", CONTEXT, "Spit-up answer")
+        self.cache.add("When should we start solids?", CONTEXT, "Solids answer")
+
+        self.assertEqual(self.cache.lookup("is it normal for my baby to spit up after feedings", CONTEXT), "Spit-up answer")
+        self.assertEqual(self.cache.lookup("when to start solids", CONTEXT), "Solids answer")
+        self.assertIsNone(self.cache.lookup("how do I sleep train", CONTEXT))
+
+        counters = self.metrics.snapshot()['counters']
+        self.assertEqual((counters['semantic_cache.hits'], counters['semantic_cache.misses']), (2, 1))
+
+    def test_context_numbers_and_negations_must_match(self):
+        """Test that answers are not shared across contexts or different numbers and negations."""
+        self.cache.add("Is it normal that she naps 1 hour?", CONTEXT, "One hour answer")
+
+        self.assertIsNone(self.cache.lookup("Is it normal that she naps 1 hour?", CONTEXT + " Baby: Emma"))
+        self.assertIsNone(self.cache.lookup("Is it normal that she naps 3 hours?", CONTEXT))
+        self.assertIsNone(self.cache.lookup("Is it not normal that she naps 1 hour?", CONTEXT))
+        self.assertNotEqual(question_signature("naps 1 hour"), question_signature("naps 3 hours"))
+
+    def test_eviction(self):
+        """Test that full contexts overwrite their oldest entries and old contexts are dropped."""
+        cache = SemanticCache(max_entries=100, metrics=self.metrics)
+        for i in range(150):
+            cache.add(f"question number {i} about naps", CONTEXT, i)
+        self.assertEqual(len(cache), 100)
+        self.assertIsNone(cache.lookup("question number 10 about naps", CONTEXT))
+        self.assertEqual(cache.lookup("question number 140 about naps", CONTEXT), 140)
+
+        cache.add("when should we start solids", "another context", "Solids answer")
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(self.metrics.snapshot()['counters']['semantic_cache.evictions'], 100)
+
+    def test_openai_service_uses_semantic_cache(self):
+        """Test that a paraphrase of an answered question costs no API call."""
+        service = OpenAIService(cache=ResponseCache(metrics=self.metrics), semantic_cache=self.cache,
+                                breaker=CircuitBreaker(metrics=self.metrics))
+        service.api_key = 'test-key'
+        completion = {'choices': [{'message': {'role': 'assistant', 'content': "About 14 hours."}}]}
+
+        with mock.patch.object(service.llm_client, 'chat_completion', return_value=completion) as create:
+            first = service.get_response("How many hours should a 6 month old sleep?", semantic=True)
+            second = service.get_response("6mo sleep hours", semantic=True)
+            self.assertEqual(first, second)
+            self.assertEqual(create.call_count, 1)
+
+    def test_templated_prompts_bypass_semantic_cache(self):
+        """Test that parser and routine prompts sharing a template never get each other's answers."""
+        service = OpenAIService(cache=ResponseCache(metrics=self.metrics), semantic_cache=self.cache,
+                                breaker=CircuitBreaker(metrics=self.metrics))
+        service.api_key = 'test-key'
+        routine = {'baby_name': 'Emma', 'routine': [{'type': 'nap', 'start_time': '13:00'}]}
+        answers = iter(["Nap answer", "Rash answer", "Morning events", "Evening events"])
+
+        def complete(*args, **kwargs):
+            return {'choices': [{'message': {'role': 'assistant', 'content': next(answers)}}]}
+
+        with mock.patch.object(service.llm_client, 'chat_completion', side_effect=complete) as create:
+            nap = service.get_routine_specific_response("is her nap schedule normal?", routine)
+            rash = service.get_routine_specific_response("should I worry about rash on her feet?", routine)
+            morning = service.get_response(SINGLE_PROMPT.format(
+                baby_name='Emma', text="Nap in the morning, feed in the afternoon", fields=ACTIVITY_FIELDS))
+            evening = service.get_response(SINGLE_PROMPT.format(
+                baby_name='Emma', text="Bath in the evening and a walk outside", fields=ACTIVITY_FIELDS))
+
+        self.assertEqual(create.call_count, 4)
+        self.assertIn("Nap answer", nap)
+        self.assertIn("Rash answer", rash)
+        self.assertIn("Morning events", morning)
+        self.assertIn("Evening events", evening)
+        self.assertEqual(len(self.cache), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import MetricsRegistry
+from services.response_cache import ResponseCache
+from services.singleflight import SingleFlight
+from services.openai_service import OpenAIService
+
+class BlockingLLMClient:
+    """LLM client whose completions wait until released."""
+
+    def __init__(self, content):
+        self.content = content
+        self.release = threading.Event()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def chat_completion(self, messages, model, max_tokens=None, temperature=None, deadline=None):
+        with self.lock:
+            self.calls += 1
+        self.release.wait(5)
+        return {'choices': [{'message': {'role': 'assistant', 'content': self.content}}]}
+
+def run_concurrently(function, count):
+    """Call a function from several threads and collect the results."""
+    results = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = function()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for coalescing identical concurrent calls."""
+
+    def setUp(self):
+        """Set up a group with its own metrics registry."""
+        self.metrics = MetricsRegistry()
+        self.group = SingleFlight('test', metrics=self.metrics)
+
+    def wait_for_waiters(self, count):
+        """Wait until the expected number of callers have joined the in-flight call."""
+        deadline = time.monotonic() + 5
+        while self.metrics.snapshot()['counters'].get('test.shared', 0) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that callers arriving during a call receive its result."""
+        release = threading.Event()
+        executions = []
+
+        def work():
+            executions.append(1)
+            release.wait(5)
+            return 'result'
+
+        threads, results = run_concurrently(lambda: self.group.do('key', work), 5)
+        self.wait_for_waiters(4)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(self.group.in_flight(), 0)
+        counters = self.metrics.snapshot()['counters']
+        self.assertEqual((counters['test.executed'], counters['test.shared']), (1, 4))
+
+    def test_errors_are_shared_and_not_remembered(self):
+        """Test that waiters receive the leader's exception and the next call runs again."""
+        release = threading.Event()
+
+        def fail():
+            release.wait(5)
+            raise ValueError("upstream failed")
+
+        threads, results = run_concurrently(lambda: self.group.do('key', fail), 3)
+        self.wait_for_waiters(2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(self.group.do('key', lambda: 'retried'), 'retried')
+
+    def test_different_keys_run_separately(self):
+        """Test that calls with different keys do not wait for each other."""
+        self.assertEqual(self.group.do('a', lambda: 1), 1)
+        self.assertEqual(self.group.do('b', lambda: 2), 2)
+        self.assertEqual(self.metrics.snapshot()['counters']['test.executed'], 2)
+
+    def test_openai_service_coalesces_duplicate_questions(self):
+        """Test that a double-tapped question costs one completion."""
+        llm_client = BlockingLLMClient("Yes, that's normal.")
+        service = OpenAIService(cache=ResponseCache(metrics=self.metrics), llm_client=llm_client,
+                                breaker=CircuitBreaker(metrics=self.metrics))
+        service.api_key = 'test-key'
+        service.semantic_cache = None
+        service.singleflight = self.group
+
+        threads, results = run_concurrently(lambda: service.get_response("Is it normal that she naps a lot?"), 3)
+        self.wait_for_waiters(2)
+        llm_client.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(llm_client.calls, 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertTrue(results[0].endswith("Yes, that's normal."))
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+import datetime
+import tempfile
+import shutil
+import threading
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from services.llm_client import LLMError
+from services.llm_dispatcher import BATCH
+from services.metrics import MetricsRegistry
+from services.suggestions import SuggestionPrecomputer, SuggestionStore, routine_version
+
+class FakeOpenAIService:
+    """Returns one suggestion naming the routine, failing for chosen babies."""
+
+    def __init__(self, failing=()):
+        self.calls = []
+        self.failing = set(failing)
+        self.lock = threading.Lock()
+        self.open = False
+
+    def available(self):
+        return not self.open
+
+    def compute_suggestions(self, routine_data, priority=None):
+        with self.lock:
+            self.calls.append((routine_data['baby_name'], priority))
+        if routine_data['baby_name'] in self.failing:
+            raise LLMError("upstream failed", status=503, retryable=True)
+        return [f"Keep {routine_data['baby_name']}'s naps regular."]
+
+class TestSuggestions(unittest.TestCase):
+    """Test cases for precomputed suggestions."""
+
+    def setUp(self):
+        """Set up a data manager with routines for two users."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.path = os.path.join(self.data_dir, 'suggestions.json')
+        self.store = SuggestionStore(self.data_manager, self.path)
+        self.service = FakeOpenAIService()
+        self.metrics = MetricsRegistry()
+        self.job = SuggestionPrecomputer(self.store, self.service, max_workers=2, metrics=self.metrics)
+
+        self.data_manager.add_routine({'baby_name': 'Emma', 'routine': [{'type': 'nap', 'start_time': '09:00'}]}, 'user_1')
+        self.data_manager.add_routine({'baby_name': 'Noah', 'routine': [{'type': 'feeding', 'start_time': '08:00'}]}, 'user_2')
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_routine_version(self):
+        """Test that the version changes when a routine is added."""
+        routines = [{'routine': []}]
+        self.assertIsNone(routine_version([]))
+        self.assertEqual(routine_version(routines), routine_version([{'routine': []}]))
+        self.assertNotEqual(routine_version(routines), routine_version(routines + [{'routine': []}]))
+
+    def test_only_changed_users_are_regenerated(self):
+        """Test that a run regenerates missing and stale suggestions only."""
+        self.assertEqual(self.job.run_once(), 2)
+        self.assertEqual(sorted(self.service.calls), [('Emma', BATCH), ('Noah', BATCH)])
+        self.assertEqual(self.store.get('user_1')['suggestions'], ["Keep Emma's naps regular."])
+
+        self.assertEqual(self.job.run_once(), 0)
+
+        # A new routine makes the stored suggestions stale until the next run
+        self.data_manager.add_routine({'baby_name': 'Emmy', 'routine': [{'type': 'nap', 'start_time': '13:00'}]}, 'user_1')
+        self.assertIsNone(self.store.get('user_1'))
+        self.assertIsNotNone(self.store.get('user_2'))
+
+        self.assertEqual(self.job.run_once(), 1)
+        self.assertEqual(self.service.calls[-1], ('Emmy', BATCH))
+        self.assertEqual(self.store.get('user_1')['version'], routine_version(self.data_manager.get_routines('user_1')))
+
+    def test_suggestions_survive_restarts(self):
+        """Test that stored suggestions are loaded by a new store."""
+        self.job.run_once()
+        store = SuggestionStore(self.data_manager, self.path)
+        self.assertEqual(store.get('user_2')['suggestions'], ["Keep Noah's naps regular."])
+        self.assertEqual(store.stale_users(), {})
+
+    def test_stores_in_other_processes_stay_in_step(self):
+        """Test that a worker sees routines and suggestions stored by another worker."""
+        other_manager = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file
+        )
+        other_store = SuggestionStore(other_manager, self.path)
+
+        self.job.run_once()
+        self.assertIsNotNone(other_store.get('user_1'))
+
+        # A routine stored through the other worker makes this worker's entry stale
+        other_manager.add_routine({'baby_name': 'Emmy', 'routine': [{'type': 'nap', 'start_time': '13:00'}]}, 'user_1')
+        self.assertIsNone(self.store.get('user_1'))
+
+        # Storing through one worker keeps the entries stored by the other
+        other_store.put('user_1', other_store.current_version('user_1'), ["Keep Emmy's naps regular."])
+        self.store.put('user_3', None, ["Start a routine."])
+        self.assertEqual(self.store.get('user_1')['suggestions'], ["Keep Emmy's naps regular."])
+        self.assertEqual(SuggestionStore(self.data_manager, self.path).get('user_2')['suggestions'], ["Keep Noah's naps regular."])
+
+    def test_failures_are_retried_next_run(self):
+        """Test that failed users and users skipped while the circuit is open stay stale."""
+        self.service.failing = {'Noah'}
+        self.assertEqual(self.job.run_once(), 1)
+        self.assertIsNone(self.store.get('user_2'))
+        self.assertEqual(self.metrics.snapshot()['counters']['suggestions.precompute.failed'], 1)
+
+        self.service.failing = set()
+        self.service.open = True
+        self.assertEqual(self.job.run_once(), 0)
+        self.service.open = False
+        self.assertEqual(self.job.run_once(), 1)
+        self.assertIsNotNone(self.store.get('user_2'))
+
+    def test_seconds_until_next_run(self):
+        """Test that the nightly run is scheduled for the next occurrence of its hour."""
+        self.assertEqual(self.job.seconds_until_next_run(datetime.datetime(2025, 1, 15, 1, 30)), 5400)
+        self.assertEqual(self.job.seconds_until_next_run(datetime.datetime(2025, 1, 15, 3, 0)), 86400)
+if __name__ == '__main__':
+    unittest.main()
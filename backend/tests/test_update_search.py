@@ -0,0 +1,120 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import datetime
+
+# Add the backend directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_manager import DataManager
+from services.update_search import UpdateSearchIndex, tokenize
+
+class TestUpdateSearch(unittest.TestCase):
+    """Test cases for the inverted index over caregiver updates."""
+
+    def setUp(self):
+        """Set up a data manager with a few caregiver updates."""
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(
+            os.path.join(self.data_dir, 'routines.json'),
+            os.path.join(self.data_dir, 'caregiver_updates.json'),
+            os.path.join(self.data_dir, 'users.json')
+        )
+        self.user_id = "test_user_123"
+        self.search_index = UpdateSearchIndex(self.data_manager)
+
+        self.data_manager.add_caregiver_update({'message': 'Fussy after her bottle, lots of spit up', 'timestamp': '2025-01-10T09:00:00'}, self.user_id)
+        self.data_manager.add_caregiver_update({'message': 'Short nap, woke up fussy', 'timestamp': '2025-01-12T14:00:00'}, self.user_id)
+        self.data_manager.add_caregiver_update({'message': 'Took the whole bottle', 'timestamp': '2025-01-15T08:00:00'}, self.user_id)
+        self.data_manager.add_caregiver_update({'message': 'Fussy all morning', 'timestamp': '2025-01-15T11:00:00'}, "other_user")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.data_dir)
+
+    def test_tokenize(self):
+        """Test that terms are lowercased and punctuation is dropped."""
+        self.assertEqual(tokenize("Didn't nap, SPIT-UP at 3pm!"), ["didn't", 'nap', 'spit', 'up', 'at', '3pm'])
+
+    def test_all_terms_must_match(self):
+        """Test that a search returns the user's updates containing every term, newest first."""
+        result = self.search_index.search(self.user_id, 'fussy')
+        self.assertEqual(result['count'], 2)
+        self.assertEqual([update['timestamp'][:10] for update in result['results']], ['2025-01-12', '2025-01-10'])
+
+        result = self.search_index.search(self.user_id, 'Fussy BOTTLE')
+        self.assertEqual(result['count'], 1)
+        self.assertIn('spit up', result['results'][0]['message'])
+
+        self.assertEqual(self.search_index.search(self.user_id, 'fussy bath')['count'], 0)
+        self.assertEqual(self.search_index.search(self.user_id, '!!')['count'], 0)
+
+    def test_date_filters_and_limit(self):
+        """Test that from and to dates are inclusive and the limit keeps the newest results."""
+        result = self.search_index.search(self.user_id, 'fussy', start_date=datetime.date(2025, 1, 11))
+        self.assertEqual(result['count'], 1)
+
+        result = self.search_index.search(self.user_id, 'bottle', end_date=datetime.date(2025, 1, 15))
+        self.assertEqual(result['count'], 2)
+
+        result = self.search_index.search(self.user_id, 'bottle', datetime.date(2025, 1, 11), datetime.date(2025, 1, 14))
+        self.assertEqual(result['count'], 0)
+
+        result = self.search_index.search(self.user_id, 'bottle', limit=1)
+        self.assertEqual(result['count'], 2)
+        self.assertEqual(result['results'][0]['message'], 'Took the whole bottle')
+
+    def test_new_updates_are_indexed_incrementally(self):
+        """Test that updates stored after the index is built are found without a rebuild."""
+        self.assertEqual(self.search_index.search(self.user_id, 'fussy')['count'], 2)
+        index = self.search_index._users[self.user_id]
+        postings = index.postings['fussy']
+
+        self.data_manager.get_caregiver_updates = None  # Any reload would fail
+        self.data_manager.add_caregiver_update({'message': 'Fussy before bath', 'timestamp': '2025-01-16T18:00:00'}, self.user_id)
+        self.data_manager.add_routine({'notes': 'fussy', 'routine': []}, self.user_id)
+
+        result = self.search_index.search(self.user_id, 'fussy')
+        self.assertEqual(result['count'], 3)
+        self.assertEqual(result['results'][0]['message'], 'Fussy before bath')
+        self.assertIs(self.search_index._users[self.user_id], index)
+        self.assertEqual(list(postings), [0, 1, 3])
+
+    def test_updates_from_other_processes_are_indexed(self):
+        """Test that updates stored by another worker are found by this worker's index."""
+        self.assertEqual(self.search_index.search(self.user_id, 'bath')['count'], 0)
+
+        other_manager = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file
+        )
+        other_manager.add_caregiver_update({'message': 'Loved her bath', 'timestamp': '2025-01-16T18:00:00'}, self.user_id)
+
+        result = self.search_index.search(self.user_id, 'bath')
+        self.assertEqual(result['count'], 1)
+        self.assertEqual(result['results'][0]['message'], 'Loved her bath')
+
+        # Another worker's update followed by one of this worker's is caught up from the stored updates
+        other_manager.add_caregiver_update({'message': 'Bath before bed', 'timestamp': '2025-01-16T19:00:00'}, self.user_id)
+        self.data_manager.add_caregiver_update({'message': 'Short bath tonight', 'timestamp': '2025-01-16T20:00:00'}, self.user_id)
+        result = self.search_index.search(self.user_id, 'bath')
+        self.assertEqual([update['message'] for update in result['results']], ['Short bath tonight', 'Bath before bed', 'Loved her bath'])
+
+    def test_writes_for_other_users_keep_the_index(self):
+        """Test that updates stored for another user do not reload this user's updates."""
+        self.assertEqual(self.search_index.search(self.user_id, 'fussy')['count'], 2)
+
+        other_manager = DataManager(
+            self.data_manager.routines_file,
+            self.data_manager.caregiver_updates_file,
+            self.data_manager.users_file
+        )
+        other_manager.add_caregiver_update({'message': 'Fussy at daycare', 'timestamp': '2025-01-16T10:00:00'}, "other_user")
+        self.data_manager.get_caregiver_updates = None  # Any reload would fail
+
+        self.assertEqual(self.search_index.search(self.user_id, 'fussy')['count'], 2)
+if __name__ == '__main__':
+    unittest.main()